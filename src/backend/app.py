@@ -1,24 +1,38 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager, create_access_token,
     jwt_required, get_jwt_identity
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 from datetime import timedelta
 import os
-import sqlite3
+import io
+import csv
 import json
-try:
-    import psycopg2
-    from psycopg2.extras import RealDictCursor
-except ImportError:
-    psycopg2 = None
-    RealDictCursor = None
-from functools import wraps
+import base64
 from urllib.parse import urlparse
 
+import db
+from db import get_db, get_db_connection
+import auth
+from auth import admin_required, student_required
+import stats
+import search
+import catalog
+import static_assets
+import uploads
+import metrics
+import migrations
+import passwords
+import jobs
+import changes
+import bulk
+import capacity
+import applied
+import limits
+import serialize
+from passwords import HashingBusy
+
 # ------------------ APP CONFIG ------------------
 
 # Configuration to serve frontend from the backend
@@ -26,153 +40,99 @@ from urllib.parse import urlparse
 FRONTEND_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
 UPLOAD_FOLDER = os.path.join(FRONTEND_FOLDER, 'uploads')
 
-app = Flask(__name__, static_folder=FRONTEND_FOLDER, static_url_path='')
-CORS(app)
-
-app.config['JWT_SECRET_KEY'] = os.environ.get("JWT_SECRET_KEY", "dev-secret-key")
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
-app.config['UPLOAD_FOLDER'] = "uploads" # Relative to where the script runs, but we'll specific full path
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
-
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-jwt = JWTManager(app)
-
-# ------------------ DATABASE CONFIG ------------------
-
-def get_db_connection():
-    database_url = os.environ.get('DATABASE_URL')
-    
-    if database_url:
-        # Use PostgreSQL (Railway/Production)
-        try:
-            conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-            return conn
-        except Exception as e:
-            print("PostgreSQL Connection Error:", e)
-            return None
-    else:
-        # Use SQLite (Local Development)
-        try:
-            db_path = os.path.join(os.path.dirname(__file__), 'internship_portal.db')
-            conn = sqlite3.connect(db_path)
-            conn.row_factory = sqlite3.Row
-            return conn
-        except Exception as e:
-            print("SQLite Connection Error:", e)
-            return None
+# Every route lives on this blueprint; create_app() attaches it to an app
+portal = Blueprint("portal", __name__)
+
+def create_app():
+    """Build the Flask app. Nothing here touches the database, so it is safe
+    to call in a gunicorn master before workers fork (preload_app)."""
+    # Flask's own static route is disabled: serve_static below owns every frontend path
+    app = Flask(__name__, static_folder=None)
+    app.request_class = uploads.UploadRequest
+    CORS(app)
+
+    app.config['JWT_SECRET_KEY'] = os.environ.get("JWT_SECRET_KEY", "dev-secret-key")
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+    app.config['UPLOAD_FOLDER'] = "uploads" # Relative to where the script runs, but we'll specific full path
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    app.config['BODY_LIMITS'] = {"portal.import_rows": bulk.IMPORT_MAX_BYTES}
+
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    JWTManager(app)
+    db.init_app(app)
+    metrics.init_app(app)
+    limits.init_app(app)
+    jobs.init_app(app)
+
+    # Frontend files are indexed (and compressed) once per app. The debug
+    # server reads from disk instead so edits show up without a restart.
+    app.extensions["static_assets"] = static_assets.AssetIndex(FRONTEND_FOLDER).build()
+
+    app.register_blueprint(portal)
+    app.cli.command("init-db")(init_db)
+    return app
+
+_app = None
+
+def __getattr__(name):
+    # `from app import app` and gunicorn's "app:app" keep working, but the
+    # default app is only built the first time someone asks for it
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ------------------ METRICS ------------------
+
+metrics.register(metrics.Gauge(
+    "db_pool", "Connection pool counters", lambda: {k: v for k, v in db.pool_stats().items() if k != "backend"}, "field"))
+metrics.register(metrics.Gauge(
+    "auth_account_cache", "Role/account cache counters", lambda: auth.account_cache.snapshot(), "field"))
+metrics.register(metrics.Gauge(
+    "auth_unknown_emails", "Login negative cache counters", lambda: auth.unknown_emails.snapshot(), "field"))
+metrics.register(metrics.Gauge(
+    "applied_index", "Per-student applied-internship index counters", lambda: applied.index.snapshot(), "field"))
+metrics.register(metrics.Gauge(
+    "admission", "In-flight requests and recent database wait seen by load shedding", lambda: limits.snapshot(), "field"))
+metrics.register(metrics.Gauge(
+    "job_queue", "Background jobs by status and age of the oldest queued job", lambda: jobs.depth(), "field"))
+metrics.register(metrics.Gauge(
+    "sqlite_writer", "SQLite writer queue and group-commit counters", lambda: db.writer_stats(), "field"))
 
 def init_db():
+    """Apply pending migrations, then make sure the seed data and derived tables are current."""
     conn = get_db_connection()
     if not conn:
         print("Failed to connect to database during initialization.")
         return
 
-    # Check if using PostgreSQL or SQLite
-    is_postgres = hasattr(conn, 'itersize') # psycopg2 objects have this, sqlite3 do not (sort of)
-
-    if is_postgres: 
-        # PostgreSQL Queries
-        schema_queries = [
-            '''CREATE TABLE IF NOT EXISTS students (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                course VARCHAR(255),
-                year INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )''',
-            '''CREATE TABLE IF NOT EXISTS admins (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )''',
-            '''CREATE TABLE IF NOT EXISTS internships (
-                id SERIAL PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                company VARCHAR(255) NOT NULL,
-                description TEXT,
-                duration VARCHAR(100),
-                slots INTEGER DEFAULT 0,
-                date_posted TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                admin_id INTEGER REFERENCES admins(id)
-            )''',
-            '''CREATE TABLE IF NOT EXISTS applications (
-                id SERIAL PRIMARY KEY,
-                student_id INTEGER REFERENCES students(id),
-                internship_id INTEGER REFERENCES internships(id),
-                cv_file TEXT,
-                cover_letter TEXT,
-                status VARCHAR(50) DEFAULT 'Pending',
-                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(student_id, internship_id)
-            )'''
-        ]
-        placeholder = "%s"
-    else:
-        # SQLite Queries
-        schema_queries = [
-            '''CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                course TEXT,
-                year INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )''',
-            '''CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )''',
-            '''CREATE TABLE IF NOT EXISTS internships (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                company TEXT NOT NULL,
-                description TEXT,
-                duration TEXT,
-                slots INTEGER DEFAULT 0,
-                date_posted TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                admin_id INTEGER,
-                FOREIGN KEY (admin_id) REFERENCES admins(id)
-            )''',
-            '''CREATE TABLE IF NOT EXISTS applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                internship_id INTEGER NOT NULL,
-                cv_file TEXT,
-                cover_letter TEXT,
-                status TEXT DEFAULT 'Pending',
-                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students(id),
-                FOREIGN KEY (internship_id) REFERENCES internships(id),
-                UNIQUE(student_id, internship_id)
-            )'''
-        ]
-        placeholder = "?"
+    is_postgres = db.is_postgres(conn)
+    placeholder = db.placeholder(conn)
 
     try:
+        applied = migrations.migrate(conn)
+        if applied:
+            print("Applied migrations:", applied)
         cur = conn.cursor()
-        for query in schema_queries:
-            cur.execute(query)
-        
+        search.rebuild(cur, is_postgres)
+
         # Check for default admin
         email = "admin@example.com"
         cur.execute(f"SELECT id FROM admins WHERE email = {placeholder}", (email,))
         if not cur.fetchone():
-            hashed_password = generate_password_hash("admin123")
+            hashed_password = passwords.hash_password("admin123")
             cur.execute(
                 f"INSERT INTO admins (name, email, password) VALUES ({placeholder}, {placeholder}, {placeholder})",
                 ("Admin User", email, hashed_password)
             )
             print("Default admin created.")
 
+        stats.rebuild(cur, placeholder)
+        capacity.rebuild(cur)
+        catalog.seed(cur, placeholder)
         conn.commit()
         cur.close()
         conn.close()
@@ -194,79 +154,132 @@ def dict_from_row(row):
         return None
     return dict(row)
 
-def admin_required(f):
-    @wraps(f)
-    @jwt_required()
-    def wrapper(*args, **kwargs):
-        user = json.loads(get_jwt_identity())
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "DB error"}), 500
-
-        try:
-            placeholder = "%s" if hasattr(conn, 'itersize') else "?"
-            cur = conn.cursor()
-            cur.execute(f"SELECT id FROM admins WHERE id={placeholder}", (user["id"],))
-            admin = cur.fetchone()
-            cur.close()
-            conn.close()
-
-            if not admin:
-                return jsonify({"error": "Admin access required"}), 403
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
-    return wrapper
-
-def student_required(f):
-    @wraps(f)
-    @jwt_required()
-    def wrapper(*args, **kwargs):
-        user = json.loads(get_jwt_identity())
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "DB error"}), 500
-
-        try:
-            placeholder = "%s" if hasattr(conn, 'itersize') else "?"
-            cur = conn.cursor()
-            cur.execute(f"SELECT id FROM students WHERE id={placeholder}", (user["id"],))
-            student = cur.fetchone()
-            cur.close()
-            conn.close()
-
-            if not student:
-                return jsonify({"error": "Student access required"}), 403
-            return f(*args, **kwargs)
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
-    return wrapper
+APPLICATION_STATUSES = ("Pending", "Approved", "Rejected")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(applied_at, row_id):
+    """Opaque keyset cursor for the (applied_at, id) position of the last row"""
+    if hasattr(applied_at, "isoformat"):
+        applied_at = applied_at.isoformat(sep=" ")
+    raw = json.dumps([applied_at, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    applied_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    return applied_at, int(row_id)
+
+def page_size(value):
+    limit = int(value) if value else DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def application_filters(placeholder, status=None, internship_id=None, student_id=None, alias="a."):
+    """WHERE conditions and params for the admin application filters"""
+    conditions, params = [], []
+    if status:
+        conditions.append(f"{alias}status = {placeholder}")
+        params.append(status)
+    if internship_id is not None:
+        conditions.append(f"{alias}internship_id = {placeholder}")
+        params.append(internship_id)
+    if student_id is not None:
+        conditions.append(f"{alias}student_id = {placeholder}")
+        params.append(student_id)
+    return conditions, params
+
+# One admin listing row per application; also the payload of "application created" changes
+# The stored CV path stays internal; clients only learn whether there is one
+HAS_CV = "CASE WHEN a.cv_file IS NULL THEN 0 ELSE 1 END"
+
+APPLICATION_FIELDS = serialize.Projection([
+    ("id", "a.id"), ("student_id", "a.student_id"), ("internship_id", "a.internship_id"),
+    ("status", "a.status"), ("applied_at", "a.applied_at"), ("cv_status", "a.cv_status"),
+    ("has_cv", HAS_CV), ("cover_letter", "a.cover_letter"),
+    ("student_name", "s.name"), ("student_email", "s.email"), ("course", "s.course"), ("year", "s.year"),
+    ("title", "i.title"), ("company", "i.company"),
+], required=("id", "applied_at"))
+
+APPLICATION_JOINS = """
+        FROM applications a
+        JOIN students s ON a.student_id = s.id
+        JOIN internships i ON a.internship_id = i.id"""
+
+APPLICATION_ROWS = f"SELECT {APPLICATION_FIELDS.select()} {APPLICATION_JOINS}"
+
+def applications_query(placeholder, status=None, internship_id=None, student_id=None, after=None,
+                       projection=APPLICATION_FIELDS):
+    """Admin listing query (without LIMIT), newest first, starting after the keyset position `after`"""
+    conditions, params = application_filters(placeholder, status, internship_id, student_id)
+    if after:
+        conditions.append(f"(a.applied_at, a.id) < ({placeholder}, {placeholder})")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT {projection.select()} {APPLICATION_JOINS}
+        {where}
+        ORDER BY a.applied_at DESC, a.id DESC
+    """
+    return query, params
+
+def applications_page(rows, limit):
+    """Trim the limit + 1 fetched rows to a page and the cursor for the next one"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["applied_at"], rows[-1]["id"])
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+def wants_stream():
+    """Opt-in streaming: ?format=ndjson or Accept: application/x-ndjson"""
+    return request.args.get("format") == "ndjson" or request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def wants_columnar():
+    """?format=columnar: {"columns": [...], "rows": [[...], ...]} instead of one object per row"""
+    return request.args.get("format") == serialize.COLUMNAR
+
+def ndjson_response(rows):
+    """One JSON object per line, encoded as rows come off the cursor"""
+    def generate():
+        for row in rows:
+            yield current_app.json.dumps(dict_from_row(row)) + "\n"
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
 
 # ------------------ STATIC ROUTES ------------------
 
-@app.route('/')
+@portal.route('/')
 def serve_index():
-    return send_from_directory(app.static_folder, 'index.html')
+    return serve_static('index.html')
+
+@portal.route('/asset-manifest.json')
+def serve_asset_manifest():
+    return jsonify(current_app.extensions["static_assets"].manifest), 200
 
-@app.route('/<path:path>')
+@portal.route('/<path:path>')
 def serve_static(path):
-    if os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    return send_from_directory(app.static_folder, 'index.html')
+    if current_app.debug:
+        if os.path.exists(os.path.join(FRONTEND_FOLDER, path)):
+            return send_from_directory(FRONTEND_FOLDER, path)
+        return send_from_directory(FRONTEND_FOLDER, 'index.html')
+
+    assets = current_app.extensions["static_assets"]
+    asset, immutable = assets.lookup(path)
+    return assets.response(request, asset, immutable)
 
 
 # ------------------ API ROUTES ------------------
 
-@app.route("/api/register/student", methods=["POST"])
+@portal.route("/api/register/student", methods=["POST"])
 def register_student():
     data = request.get_json()
     if not data or not data.get("email") or not data.get("password"):
         return jsonify({"error": "Missing data"}), 400
 
-    conn = get_db_connection()
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
     
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
+    placeholder = db.placeholder(conn)
     
     try:
         cur = conn.cursor()
@@ -274,28 +287,40 @@ def register_student():
         if cur.fetchone():
             return jsonify({"error": "Email already exists"}), 400
 
-        hashed = generate_password_hash(data["password"])
-        cur.execute(
-            f"INSERT INTO students (name, email, password, course, year) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})",
-            (data.get("name"), data["email"], hashed, data.get("course"), data.get("year"))
-        )
-        conn.commit()
+        hashed = passwords.hash_password(data["password"])
+
+        def insert(cur):
+            # Checked again inside the write: the email may have been taken while hashing
+            cur.execute(f"SELECT id FROM students WHERE email={placeholder}", (data["email"],))
+            if cur.fetchone():
+                return False
+            cur.execute(
+                f"INSERT INTO students (name, email, password, course, year) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})",
+                (data.get("name"), data["email"], hashed, data.get("course"), data.get("year"))
+            )
+            stats.bump(cur, placeholder, total_students=1)
+            return True
+
+        if not db.run_write(conn, insert):
+            return jsonify({"error": "Email already exists"}), 400
+        stats.invalidate()
+        auth.unknown_emails.discard(data["email"])
         return jsonify({"message": "Student registered successfully"}), 201
+    except (HashingBusy, db.WriteTimeout):
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
-@app.route("/api/register/admin", methods=["POST"])
+@portal.route("/api/register/admin", methods=["POST"])
 def register_admin():
     data = request.get_json()
     if not data or not data.get("email") or not data.get("password"):
         return jsonify({"error": "Missing data"}), 400
 
-    conn = get_db_connection()
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
     
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
+    placeholder = db.placeholder(conn)
 
     try:
         cur = conn.cursor()
@@ -303,86 +328,180 @@ def register_admin():
         if cur.fetchone():
             return jsonify({"error": "Email already exists"}), 400
 
-        hashed = generate_password_hash(data["password"])
-        cur.execute(
-            f"INSERT INTO admins (name, email, password) VALUES ({placeholder}, {placeholder}, {placeholder})",
-            (data.get("name"), data["email"], hashed)
-        )
-        conn.commit()
+        hashed = passwords.hash_password(data["password"])
+
+        def insert(cur):
+            cur.execute(f"SELECT id FROM admins WHERE email={placeholder}", (data["email"],))
+            if cur.fetchone():
+                return False
+            cur.execute(
+                f"INSERT INTO admins (name, email, password) VALUES ({placeholder}, {placeholder}, {placeholder})",
+                (data.get("name"), data["email"], hashed)
+            )
+            return True
+
+        if not db.run_write(conn, insert):
+            return jsonify({"error": "Email already exists"}), 400
+        auth.unknown_emails.discard(data["email"])
         return jsonify({"message": "Admin registered successfully"}), 201
+    except (HashingBusy, db.WriteTimeout):
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
-@app.route("/api/login", methods=["POST"])
+def busy_response():
+    response = jsonify({"error": "Server busy, please retry"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+@portal.errorhandler(db.WriteTimeout)
+def write_timeout(e):
+    # Routes without their own handler (approve, reject, imports, exact stats)
+    return busy_response()
+
+def store_password(conn, role, user_id, hashed):
+    placeholder = db.placeholder(conn)
+    db.run_write(conn, lambda cur: cur.execute(
+        f"UPDATE {auth.ROLE_TABLES[role]} SET password = {placeholder} WHERE id = {placeholder}",
+        (hashed, user_id)
+    ))
+
+def rehash_password(conn, role, user_id, password):
+    """Upgrade a stored hash made with outdated parameters; never fails the login"""
+    try:
+        store_password(conn, role, user_id, passwords.hash_password(password))
+    except Exception as e:
+        print("Password rehash failed:", e)
+
+@portal.route("/api/login", methods=["POST"])
 def login():
     data = request.get_json()
-    conn = get_db_connection()
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
-    
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
 
     try:
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM students WHERE email={placeholder}", (data["email"],))
-        user_row = cur.fetchone()
-        user = dict_from_row(user_row)
-        role = "student"
-
-        if not user:
-            cur.execute(f"SELECT * FROM admins WHERE email={placeholder}", (data["email"],))
-            user_row = cur.fetchone()
-            user = dict_from_row(user_row)
-            role = "admin"
-
-        if not user or not check_password_hash(user["password"], data["password"]):
+        account = auth.find_account(conn, data["email"])
+        if not account:
             return jsonify({"error": "Invalid credentials"}), 401
 
-        token = create_access_token(identity=json.dumps({"id": user["id"], "email": user["email"], "role": role}))
+        user_id, role, stored = account
+        if not passwords.verify_password(stored, data["password"]):
+            return jsonify({"error": "Invalid credentials"}), 401
+
+        if passwords.needs_rehash(stored):
+            rehash_password(conn, role, user_id, data["password"])
+
+        token = create_access_token(identity=json.dumps({"id": user_id, "email": data["email"], "role": role}))
         return jsonify({"access_token": token, "role": role}), 200
+    except (HashingBusy, db.WriteTimeout):
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
-@app.route("/api/internships", methods=["GET"])
+INTERNSHIP_FIELDS = serialize.Projection([
+    ("id", "i.id"), ("title", "i.title"), ("company", "i.company"), ("description", "i.description"),
+    ("duration", "i.duration"), ("slots", "i.slots"), ("remaining", "COALESCE(i.slots, 0) - i.approved_count"),
+    ("date_posted", "i.date_posted"),
+])
+
+INTERNSHIPS_QUERY = f"SELECT {INTERNSHIP_FIELDS.select()} FROM internships i ORDER BY i.date_posted DESC"
+
+def render_internships(conn):
+    cur = conn.cursor()
+    cur.execute(INTERNSHIPS_QUERY)
+    internships = [dict_from_row(row) for row in cur.fetchall()]
+    return (current_app.json.dumps(internships) + "\n").encode()
+
+@portal.route("/api/internships", methods=["GET"])
 def get_internships():
-    conn = get_db_connection()
+    """Public catalog, served from a pre-encoded body with ETag/304 support"""
+    if wants_stream():
+        conn = get_db()
+        if not conn: return jsonify({"error": "DB error"}), 500
+        return ndjson_response(db.iter_rows(conn, INTERNSHIPS_QUERY))
+
+    entry = catalog.get(get_db, db.placeholder, render_internships)
+    if entry is None:
+        return jsonify({"error": "DB error"}), 500
+
+    use_gzip = "gzip" in request.accept_encodings
+    etag = entry.gzip_etag if use_gzip else entry.etag
+    if request.if_none_match.contains(entry.etag) or request.if_none_match.contains(entry.gzip_etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.gzipped if use_gzip else entry.body, mimetype="application/json")
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+@portal.route("/api/internships/search", methods=["GET"])
+def search_internships():
+    """Relevance-ranked search over title, company and description: ?q=...&limit=20"""
+    text = request.args.get("q", "")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), search.MAX_RESULTS))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
 
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM internships ORDER BY date_posted DESC")
-        internships = [dict_from_row(row) for row in cur.fetchall()]
-        return jsonify(internships), 200
-    finally:
-        conn.close()
+    built = search.search_query(conn, db.is_postgres(conn), text, limit, INTERNSHIP_FIELDS.select())
+    if built is None:
+        return jsonify([]), 200
+    query, params = built
+    cur = conn.cursor()
+    cur.execute(query, params)
+    results = [dict_from_row(row) for row in cur.fetchall()]
+    return jsonify(results), 200
 
-@app.route("/api/internships", methods=["POST"])
+@portal.route("/api/internships", methods=["POST"])
 @admin_required
 def create_internship():
     data = request.get_json()
     user = json.loads(get_jwt_identity())
-    conn = get_db_connection()
+    # Missing or null means no places yet, as in bulk imports
+    try:
+        slots = int(data["slots"]) if data.get("slots") is not None else 0
+    except (TypeError, ValueError):
+        return jsonify({"error": "slots must be an integer"}), 400
+    if slots < 0:
+        return jsonify({"error": "slots must not be negative"}), 400
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
     
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
+    placeholder = db.placeholder(conn)
 
-    try:
-        cur = conn.cursor()
+    is_postgres = db.is_postgres(conn)
+
+    def insert(cur):
         cur.execute(
-            f"INSERT INTO internships (title, company, description, duration, slots, admin_id) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})",
-            (data.get("title"), data.get("company"), data.get("description"), data.get("duration"), data.get("slots", 0), user["id"])
+            f"INSERT INTO internships (title, company, description, duration, slots, admin_id) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})"
+            + (" RETURNING id" if is_postgres else ""),
+            (data.get("title"), data.get("company"), data.get("description"), data.get("duration"), slots, user["id"])
         )
-        conn.commit()
+        internship_id = cur.fetchone()["id"] if is_postgres else cur.lastrowid
+        search.index_internship(cur, is_postgres, internship_id, data.get("title"), data.get("company"), data.get("description"))
+        stats.bump(cur, placeholder, total_internships=1)
+        catalog.bump(cur, placeholder)
+        cur.execute(f"SELECT {INTERNSHIP_FIELDS.select()} FROM internships i WHERE i.id = {placeholder}", (internship_id,))
+        changes.record(cur, placeholder, is_postgres, "internship", internship_id, "created", dict_from_row(cur.fetchone()))
+
+    try:
+        db.run_write(conn, insert)
+        changes.notify()
+        stats.invalidate()
+        catalog.invalidate()
         return jsonify({"message": "Internship created successfully"}), 201
+    except db.WriteTimeout:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
-@app.route("/api/apply", methods=["POST"])
+@portal.route("/api/apply", methods=["POST"])
 @student_required
 def apply_for_internship():
     user = json.loads(get_jwt_identity())
@@ -391,158 +510,488 @@ def apply_for_internship():
     cv_file = request.files.get("cv")
     
     if not internship_id: return jsonify({"error": "Internship ID required"}), 400
+    try:
+        internship_id = int(internship_id)
+    except ValueError:
+        return jsonify({"error": "Invalid internship ID"}), 400
 
-    conn = get_db_connection()
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
     
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
+    placeholder = db.placeholder(conn)
+
+    # Applications are never deleted, so a hit in the index is a sure duplicate;
+    # a miss still gets the authoritative check inside the write
+    if internship_id in applied.index.get(conn, placeholder, user["id"]):
+        return jsonify({"error": "Already applied"}), 400
+
+    # The upload was already streamed to a hashed temp file while the form
+    # was parsed; move it into place before any database work starts.
+    cv_filename = None
+    if cv_file and allowed_file(cv_file.filename):
+        extension = cv_file.filename.rsplit(".", 1)[1].lower()
+        try:
+            cv_filename = uploads.store(cv_file, extension, current_app.config['UPLOAD_FOLDER'])
+        except OSError as e:
+            return jsonify({"error": f"Could not save CV: {e}"}), 500
 
-    try:
-        cur = conn.cursor()
+    is_postgres = db.is_postgres(conn)
+
+    def insert(cur):
         cur.execute(f"SELECT id FROM applications WHERE student_id={placeholder} AND internship_id={placeholder}", (user["id"], internship_id))
         if cur.fetchone():
-            return jsonify({"error": "Already applied"}), 400
-
-        cv_filename = None
-        if cv_file and allowed_file(cv_file.filename):
-            filename = secure_filename(cv_file.filename)
-            cv_filename = f"{user['id']}_{internship_id}_{filename}"
-            # Ensure folder exists
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            cv_file.save(os.path.join(app.config['UPLOAD_FOLDER'], cv_filename))
-
+            return False
         cur.execute(
-            f"INSERT INTO applications (student_id, internship_id, cv_file, cover_letter) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})",
+            f"INSERT INTO applications (student_id, internship_id, cv_file, cover_letter) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})"
+            + (" RETURNING id" if is_postgres else ""),
             (user["id"], internship_id, cv_filename, cover_letter)
         )
-        conn.commit()
+        application_id = cur.fetchone()["id"] if is_postgres else cur.lastrowid
+        stats.bump(cur, placeholder, total_applications=1, pending_applications=1)
+        if cv_filename:
+            # Scanned after the response; committed together with the application
+            jobs.enqueue(cur, placeholder, "cv.scan", {"application_id": application_id, "cv_file": cv_filename})
+        cur.execute(f"{APPLICATION_ROWS} WHERE a.id = {placeholder}", (application_id,))
+        changes.record(cur, placeholder, is_postgres, "application", application_id, "created",
+                       dict_from_row(cur.fetchone()), student_id=user["id"])
+        return True
+
+    try:
+        if not db.run_write(conn, insert):
+            return jsonify({"error": "Already applied"}), 400
+        applied.index.invalidate(user["id"])
+        changes.notify()
+        jobs.wake()
+        stats.invalidate()
         return jsonify({"message": "Application submitted successfully"}), 201
+    except db.WriteTimeout:
+        return busy_response()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
-@app.route("/api/status", methods=["GET"])
+STUDENT_APPLICATION_FIELDS = serialize.Projection([
+    ("id", "a.id"), ("internship_id", "a.internship_id"), ("status", "a.status"),
+    ("applied_at", "a.applied_at"), ("cv_status", "a.cv_status"), ("has_cv", HAS_CV),
+    ("cover_letter", "a.cover_letter"), ("title", "i.title"), ("company", "i.company"),
+])
+
+STUDENT_APPLICATIONS_QUERY = """
+    SELECT {columns}
+    FROM applications a
+    JOIN internships i ON a.internship_id = i.id
+    WHERE a.student_id = {placeholder}
+    ORDER BY a.applied_at DESC
+"""
+
+def student_applications_query(placeholder, projection=STUDENT_APPLICATION_FIELDS):
+    return STUDENT_APPLICATIONS_QUERY.format(columns=projection.select(), placeholder=placeholder)
+
+@portal.route("/api/status", methods=["GET"])
 @student_required
 def get_student_applications():
+    """The student's applications, newest first. Query params: fields, format (ndjson, columnar)."""
     user = json.loads(get_jwt_identity())
-    conn = get_db_connection()
+    try:
+        projection = STUDENT_APPLICATION_FIELDS.from_request(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
     
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
+    query = student_applications_query(db.placeholder(conn), projection)
+    if wants_stream():
+        return ndjson_response(db.iter_rows(conn, query, (user["id"],)))
+
+    cur = conn.cursor()
+    cur.execute(query, (user["id"],))
+    if wants_columnar():
+        return jsonify(serialize.columnar(projection, cur.fetchall())), 200
+    applications = [dict_from_row(row) for row in cur.fetchall()]
+    return jsonify(applications), 200
+
+@portal.route("/api/status/summary", methods=["GET"])
+@student_required
+def get_student_application_summary():
+    """{"applications": {internship_id: status}} for the current student, from the applied index."""
+    user = json.loads(get_jwt_identity())
+    conn = get_db()
+    if not conn: return jsonify({"error": "DB error"}), 500
 
-    try:
-        cur = conn.cursor()
-        cur.execute(f"""
-            SELECT a.*, i.title, i.company
-            FROM applications a
-            JOIN internships i ON a.internship_id = i.id
-            WHERE a.student_id = {placeholder}
-            ORDER BY a.applied_at DESC
-        """, (user["id"],))
-        applications = [dict_from_row(row) for row in cur.fetchall()]
-        return jsonify(applications), 200
-    finally:
-        conn.close()
+    summary = applied.index.get(conn, db.placeholder(conn), user["id"])
+    return jsonify({"applications": {str(k): v for k, v in sorted(summary.items())}}), 200
 
-@app.route("/api/applications", methods=["GET"])
+@portal.route("/api/applications", methods=["GET"])
 @admin_required
 def get_all_applications():
-    conn = get_db_connection()
-    if not conn: return jsonify({"error": "DB error"}), 500
-
+    """Newest first, keyset-paginated on (applied_at, id).
+
+    Query params: status, internship_id, student_id, limit, cursor, fields,
+    format (ndjson, columnar). Pass the returned next_cursor back to get the
+    following page. In streaming mode every matching row after the cursor
+    is sent unless limit is given explicitly.
+    """
+    status = request.args.get("status")
+    if status and status not in APPLICATION_STATUSES:
+        return jsonify({"error": "Invalid status"}), 400
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT a.*, s.name as student_name, s.email as student_email, s.course, s.year,
-                   i.title, i.company
-            FROM applications a
-            JOIN students s ON a.student_id = s.id
-            JOIN internships i ON a.internship_id = i.id
-            ORDER BY a.applied_at DESC
-        """)
-        applications = [dict_from_row(row) for row in cur.fetchall()]
-        return jsonify(applications), 200
-    finally:
-        conn.close()
+        internship_id = request.args.get("internship_id", type=int)
+        student_id = request.args.get("student_id", type=int)
+        limit = page_size(request.args.get("limit"))
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+    try:
+        projection = APPLICATION_FIELDS.from_request(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_db()
+    if not conn: return jsonify({"error": "DB error"}), 500
 
-@app.route("/api/applications/<int:application_id>/approve", methods=["POST"])
+    placeholder = db.placeholder(conn)
+    query, params = applications_query(placeholder, status, internship_id, student_id, after, projection)
+    if wants_stream():
+        if request.args.get("limit"):
+            query += f" LIMIT {placeholder}"
+            params.append(limit)
+        return ndjson_response(db.iter_rows(conn, query, params))
+
+    cur = conn.cursor()
+    cur.execute(query + f" LIMIT {placeholder}", (*params, limit + 1))
+    rows, next_cursor = applications_page(cur.fetchmany(limit + 1), limit)
+    if wants_columnar():
+        return jsonify({**serialize.columnar(projection, rows), "next_cursor": next_cursor}), 200
+    return jsonify({"data": [dict_from_row(row) for row in rows], "next_cursor": next_cursor}), 200
+
+def set_application_status(conn, application_id, status):
+    """Move one application to `status` and adjust the stats counters and the
+    internship's approved_count in the same transaction.
+
+    Returns "updated", "unchanged", "not_found" or "no_slots" (approving an
+    application for an internship that is already full).
+    """
+    placeholder = db.placeholder(conn)
+    is_postgres = db.is_postgres(conn)
+
+    def update(cur):
+        # Lock the application before the internship (see capacity)
+        cur.execute(
+            f"SELECT status, student_id, internship_id FROM applications WHERE id = {placeholder}{db.for_update(conn)}",
+            (application_id,)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return "not_found", None
+        row = dict(row)
+        old_status = row["status"]
+        if old_status == status:
+            return "unchanged", row["student_id"]
+        if status == "Approved":
+            if not capacity.take(cur, placeholder, row["internship_id"]):
+                return "no_slots", row["student_id"]
+        elif old_status == "Approved":
+            capacity.release(cur, placeholder, row["internship_id"])
+        cur.execute(f"UPDATE applications SET status = {placeholder} WHERE id = {placeholder}", (status, application_id))
+        stats.bump(cur, placeholder, **stats.status_change(old_status, status))
+        catalog.bump(cur, placeholder)
+        jobs.enqueue(cur, placeholder, "notify.status", {"application_id": application_id})
+        changes.record(cur, placeholder, is_postgres, "application", application_id, "status",
+                       {"status": status, "previous": old_status}, student_id=row["student_id"])
+        return "updated", row["student_id"]
+
+    result, student_id = db.run_write(conn, update)
+    if result == "updated":
+        applied.index.invalidate(student_id)
+        changes.notify()
+        jobs.wake()
+        stats.invalidate()
+        catalog.invalidate()
+    return result
+
+STATUS_ERRORS = {
+    "not_found": ({"error": "Application not found"}, 404),
+    "no_slots": ({"error": "No slots left for this internship"}, 409),
+}
+
+@portal.route("/api/applications/<int:application_id>/approve", methods=["POST"])
 @admin_required
 def approve_application(application_id):
-    conn = get_db_connection()
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
-    
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
 
-    try:
-        cur = conn.cursor()
-        cur.execute(f"UPDATE applications SET status = 'Approved' WHERE id = {placeholder}", (application_id,))
-        conn.commit()
-        return jsonify({"message": "Application approved successfully"}), 200
-    finally:
-        conn.close()
+    result = set_application_status(conn, application_id, "Approved")
+    if result in STATUS_ERRORS:
+        body, code = STATUS_ERRORS[result]
+        return jsonify(body), code
+    return jsonify({"message": "Application approved successfully"}), 200
 
-@app.route("/api/applications/<int:application_id>/reject", methods=["POST"])
+@portal.route("/api/applications/<int:application_id>/reject", methods=["POST"])
 @admin_required
 def reject_application(application_id):
-    conn = get_db_connection()
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
-    
-    placeholder = "%s" if hasattr(conn, 'itersize') else "?"
 
+    result = set_application_status(conn, application_id, "Rejected")
+    if result in STATUS_ERRORS:
+        body, code = STATUS_ERRORS[result]
+        return jsonify(body), code
+    return jsonify({"message": "Application rejected successfully"}), 200
+
+BULK_ACTIONS = {"approve": "Approved", "reject": "Rejected"}
+MAX_BULK_IDS = 1000
+UPDATE_BATCH = 500   # ids per UPDATE, under SQLite's bound-parameter limit
+
+@portal.route("/api/applications/bulk", methods=["POST"])
+@admin_required
+def bulk_update_applications():
+    """Approve or reject many applications in one transaction.
+
+    Body: {"action": "approve"|"reject", "ids": [1, 2, ...]}
+       or {"action": ..., "filter": {"status": "Pending", "internship_id": 3}}
+    Returns per-id results: updated, unchanged, not_found or no_slots (the
+    internship filled up; earlier ids are approved first).
+    """
+    data = request.get_json(silent=True) or {}
+    status = BULK_ACTIONS.get(data.get("action"))
+    if not status:
+        return jsonify({"error": "action must be 'approve' or 'reject'"}), 400
+
+    ids, filters = data.get("ids"), data.get("filter")
+    if (ids is None) == (filters is None):
+        return jsonify({"error": "Provide exactly one of 'ids' or 'filter'"}), 400
     try:
-        cur = conn.cursor()
-        cur.execute(f"UPDATE applications SET status = 'Rejected' WHERE id = {placeholder}", (application_id,))
-        conn.commit()
-        return jsonify({"message": "Application rejected successfully"}), 200
-    finally:
-        conn.close()
+        if ids is not None:
+            ids = sorted({int(i) for i in ids})
+            if not ids or len(ids) > MAX_BULK_IDS:
+                return jsonify({"error": f"ids must contain 1 to {MAX_BULK_IDS} entries"}), 400
+        else:
+            filters = {
+                "status": filters.get("status"),
+                "internship_id": int(filters["internship_id"]) if filters.get("internship_id") is not None else None,
+                "student_id": int(filters["student_id"]) if filters.get("student_id") is not None else None,
+            }
+            if filters["status"] and filters["status"] not in APPLICATION_STATUSES:
+                return jsonify({"error": "Invalid status"}), 400
+            if not any(value is not None for value in filters.values()):
+                return jsonify({"error": "filter must not be empty"}), 400
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({"error": "Invalid ids or filter"}), 400
+
+    conn = get_db()
+    if not conn: return jsonify({"error": "DB error"}), 500
+
+    placeholder = db.placeholder(conn)
+    if ids is not None:
+        where = f"id IN ({', '.join([placeholder] * len(ids))})"
+        params = list(ids)
+    else:
+        conditions, params = application_filters(placeholder, alias="", **filters)
+        where = " AND ".join(conditions)
 
-@app.route("/api/stats", methods=["GET"])
+    is_postgres = db.is_postgres(conn)
+
+    def update(cur):
+        # Applications are locked in id order, then internships in id order (see capacity)
+        cur.execute(
+            f"SELECT id, status, student_id, internship_id FROM applications WHERE {where} ORDER BY id{db.for_update(conn)}",
+            params
+        )
+        rows = [dict(row) for row in cur.fetchall()]
+        current = {row["id"]: row["status"] for row in rows}
+        changing = [row for row in rows if row["status"] != status]
+
+        # Approvals take places first come (lowest id) first served; the rest stay as they are
+        by_internship = {}
+        for row in changing:
+            if status == "Approved" or row["status"] == "Approved":
+                by_internship.setdefault(row["internship_id"], []).append(row["id"])
+        full = set()
+        for internship_id, app_ids in sorted(by_internship.items()):
+            if status == "Approved":
+                granted = capacity.take_up_to(cur, placeholder, internship_id, len(app_ids), db.for_update(conn))
+                full.update(app_ids[granted:])
+            else:
+                capacity.release(cur, placeholder, internship_id, len(app_ids))
+        changing = [row for row in changing if row["id"] not in full]
+
+        # Update exactly the rows locked and counted above. Re-applying the
+        # filter could also catch rows committed since, which took no place.
+        for batch in bulk.batches([row["id"] for row in changing], UPDATE_BATCH):
+            cur.execute(
+                f"UPDATE applications SET status = {placeholder} WHERE id IN ({', '.join([placeholder] * len(batch))})",
+                (status, *batch)
+            )
+        deltas = {}
+        for row in changing:
+            for name, delta in stats.status_change(row["status"], status).items():
+                deltas[name] = deltas.get(name, 0) + delta
+        stats.bump(cur, placeholder, **deltas)
+        if by_internship:
+            catalog.bump(cur, placeholder)
+        jobs.enqueue_many(cur, placeholder, "notify.status", [{"application_id": row["id"]} for row in changing])
+        changes.record_many(cur, placeholder, is_postgres, [
+            ("application", row["id"], "status", row["student_id"], {"status": status, "previous": row["status"]})
+            for row in changing
+        ])
+        return current, full, {row["student_id"] for row in changing}
+
+    try:
+        current, full, students = db.run_write(conn, update)
+        if students:
+            applied.index.invalidate(*students)
+        changes.notify()
+        jobs.wake()
+        stats.invalidate()
+        catalog.invalidate()
+    except db.WriteTimeout:
+        return busy_response()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    def result(app_id, old_status):
+        if old_status == status:
+            return "unchanged"
+        return "no_slots" if app_id in full else "updated"
+
+    results = [{"id": app_id, "result": result(app_id, old_status)} for app_id, old_status in sorted(current.items())]
+    if ids is not None:
+        results += [{"id": app_id, "result": "not_found"} for app_id in ids if app_id not in current]
+    updated = sum(1 for r in results if r["result"] == "updated")
+    return jsonify({"status": status, "updated": updated, "results": results}), 200
+
+@portal.route("/api/import/<entity>", methods=["POST"])
+@admin_required
+def import_rows(entity):
+    """Bulk insert students, internships or applications from the request body.
+
+    CSV (with a header row) or NDJSON, chosen by ?format= or the Content-Type.
+    The body is read as a stream and committed in batches; the response
+    reports inserted, duplicate and invalid rows.
+    """
+    if entity not in bulk.ENTITIES:
+        return jsonify({"error": f"entity must be one of {', '.join(sorted(bulk.ENTITIES))}"}), 404
+    fmt = request.args.get("format") or ("ndjson" if request.mimetype == NDJSON_MIMETYPE else "csv")
+    if fmt not in bulk.FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    user = json.loads(get_jwt_identity())
+    conn = get_db()
+    if not conn: return jsonify({"error": "DB error"}), 500
+
+    text = io.TextIOWrapper(io.BufferedReader(request.stream), encoding="utf-8-sig", newline="")
+    try:
+        report = bulk.import_rows(conn, entity, bulk.READERS[fmt](text), admin_id=user["id"])
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": f"Could not read {fmt} input: {e}"}), 400
+    return jsonify(report), 200
+
+@portal.route("/api/export/applications", methods=["GET"])
+@admin_required
+def export_applications():
+    """Placement report: every application with its student and internship,
+    as CSV (default) or NDJSON, streamed off a server-side cursor."""
+    fmt = request.args.get("format", "csv")
+    if fmt not in bulk.FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    status = request.args.get("status")
+    if status and status not in APPLICATION_STATUSES:
+        return jsonify({"error": "Invalid status"}), 400
+
+    conn = get_db()
+    if not conn: return jsonify({"error": "DB error"}), 500
+
+    lines = bulk.export_applications(conn, fmt, status, request.args.get("internship_id", type=int))
+    return Response(
+        stream_with_context(lines),
+        mimetype="text/csv" if fmt == "csv" else NDJSON_MIMETYPE,
+        headers={"Content-Disposition": f"attachment; filename=applications.{fmt}"}
+    )
+
+@portal.route("/api/stats", methods=["GET"])
 @admin_required
 def get_statistics():
-    conn = get_db_connection()
+    """Dashboard counts from the stats_counters table (cached for STATS_CACHE_TTL).
+
+    ?exact=1 recomputes them with one aggregate query and resyncs the counters.
+    """
+    exact = request.args.get("exact") in ("1", "true")
+    if not exact:
+        values = stats.cached()
+        if values is not None:
+            return jsonify(values), 200
+
+    conn = get_db()
+    if not conn: return jsonify({"error": "DB error"}), 500
+
+    placeholder = db.placeholder(conn)
+    if exact:
+        values = db.run_write(conn, lambda cur: stats.rebuild(cur, placeholder))
+    else:
+        values = stats.read(conn.cursor())
+    stats.remember(values)
+    return jsonify(values), 200
+
+@portal.route("/api/changes", methods=["GET"])
+@jwt_required()
+def get_changes():
+    """Changes after ?since=<version>, oldest first: {"version", "changes", "more"}.
+
+    Without ?since only the current version is returned; load the lists,
+    then follow the feed from that version. 410 means the client is too
+    far behind and must reload.
+    """
+    user = json.loads(get_jwt_identity())
+    student_id = None if user["role"] == "admin" else user["id"]
+    conn = get_db()
     if not conn: return jsonify({"error": "DB error"}), 500
 
+    version = request.args.get("since", type=int)
+    if version is None:
+        return jsonify({"version": changes.latest(conn)[0], "changes": [], "more": False}), 200
+    limit = max(1, min(request.args.get("limit", changes.CHANGES_PAGE_SIZE, type=int), changes.CHANGES_PAGE_SIZE))
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM internships")
-        total_internships = cur.fetchone()[0] if hasattr(conn, 'itersize') else cur.fetchone()[0]
-        # Note: psycopg2 count returns a tuple too, so index 0 is fine for both usually if query is SELECT COUNT(*)
-        # But RealDictCursor from psycopg2 might return {'count': 5}. Let's be careful.
-        # Actually with RealDictCursor, fetchone returns a dictionary.
-        
-        # Let's handle RealDictCursor vs Sqlite Row
-        def get_count(cursor, query):
-            cursor.execute(query)
-            res = cursor.fetchone()
-            if res is None: return 0
-            if isinstance(res, dict): # RealDictCursor
-                return list(res.values())[0]
-            if isinstance(res, sqlite3.Row):
-                return res[0]
-            return res[0] # Normal tuple cursor
-
-        total_internships = get_count(cur, "SELECT COUNT(*) FROM internships")
-        total_applications = get_count(cur, "SELECT COUNT(*) FROM applications")
-        pending = get_count(cur, "SELECT COUNT(*) FROM applications WHERE status = 'Pending'")
-        approved = get_count(cur, "SELECT COUNT(*) FROM applications WHERE status = 'Approved'")
-        rejected = get_count(cur, "SELECT COUNT(*) FROM applications WHERE status = 'Rejected'")
-        total_students = get_count(cur, "SELECT COUNT(*) FROM students")
-
-        return jsonify({
-            "total_internships": total_internships,
-            "total_applications": total_applications,
-            "pending_applications": pending,
-            "approved_applications": approved,
-            "rejected_applications": rejected,
-            "total_students": total_students
-        }), 200
-    finally:
-        conn.close()
+        batch = changes.since(conn, version, student_id, limit)
+    except changes.FeedGone as e:
+        return jsonify({"error": str(e)}), 410
+    if batch:
+        version = batch[-1]["version"]
+    return jsonify({"version": version, "changes": batch, "more": len(batch) == limit}), 200
+
+@portal.route("/api/changes/stream", methods=["GET"])
+@jwt_required()
+def stream_changes():
+    """The same feed as Server-Sent Events, resuming from Last-Event-ID or ?since
+    (default: only changes from now on). Ends after CHANGES_STREAM_SECONDS."""
+    user = json.loads(get_jwt_identity())
+    student_id = None if user["role"] == "admin" else user["id"]
+    version = request.headers.get("Last-Event-ID", type=int)
+    if version is None:
+        version = request.args.get("since", type=int)
+    if version is None:
+        conn = get_db()
+        if not conn: return jsonify({"error": "DB error"}), 500
+        version = changes.latest(conn)[0]
+    # Give the request's connection back now; the stream borrows one per poll
+    db.close_db()
+    return Response(
+        changes.stream(version, student_id), mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@portal.route("/api/jobs", methods=["GET"])
+@admin_required
+def get_job_stats():
+    """Background queue depth by status and the age of the oldest queued job."""
+    return jsonify(jobs.depth()), 200
+
+@portal.route("/api/db/pool", methods=["GET"])
+@admin_required
+def get_pool_stats():
+    return jsonify(db.pool_stats()), 200
 
 
-@app.route("/api/me", methods=["GET"])
+@portal.route("/api/me", methods=["GET"])
 @jwt_required()
 def get_current_user():
     return jsonify(json.loads(get_jwt_identity())), 200
@@ -552,4 +1001,4 @@ def get_current_user():
 if __name__ == "__main__":
     init_db()
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    create_app().run(host="0.0.0.0", port=port, debug=True)
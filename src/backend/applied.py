@@ -0,0 +1,115 @@
+"""
+In-process index of which internships each student has applied to.
+
+GET /api/status/summary answers from it (internship id -> status for the
+current student, enough for the listing's "Applied"/"Approved" badges), and
+apply_for_internship consults it to turn away repeat applications without
+queueing a write. A student's entry is loaded with one indexed query
+(idx_applications_student) on first use and kept in a bounded LRU.
+
+Writes in this process invalidate the students they touch right after
+commit. Writes in other processes are picked up from the change feed: at
+most every APPLIED_REVALIDATE seconds the index reads which students have
+changes after the version it last saw (a primary-key range scan) and drops
+their entries. If the feed was pruned past that version, or too much has
+happened to be worth reading, the whole index is dropped instead.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import changes
+
+APPLIED_CACHE_SIZE = int(os.environ.get("APPLIED_CACHE_SIZE", 50000))
+APPLIED_REVALIDATE = float(os.environ.get("APPLIED_REVALIDATE", 1))
+APPLIED_MAX_CATCHUP = int(os.environ.get("APPLIED_MAX_CATCHUP", 10000))
+
+STUDENT_QUERY = "SELECT internship_id, status FROM applications WHERE student_id = {placeholder}"
+
+
+class AppliedIndex:
+    """student_id -> {internship_id: status}, invalidated from local writes and the change feed."""
+
+    def __init__(self, size=APPLIED_CACHE_SIZE, revalidate=APPLIED_REVALIDATE):
+        self.size = size
+        self.revalidate = revalidate
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Bumped by every invalidation, so a load that raced one is not stored
+        self._generation = 0
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conn, placeholder, student_id):
+        """The student's applications as {internship_id: status}; treat it as read-only."""
+        self.refresh(conn, placeholder)
+        with self._lock:
+            entry = self._entries.get(student_id)
+            if entry is not None:
+                self._entries.move_to_end(student_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation
+
+        cur = conn.cursor()
+        cur.execute(STUDENT_QUERY.format(placeholder=placeholder), (student_id,))
+        entry = {row["internship_id"]: row["status"] for row in map(dict, cur.fetchall())}
+        cur.close()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[student_id] = entry
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def refresh(self, conn, placeholder):
+        """Drop students changed by other processes since the last check."""
+        if time.monotonic() - self._checked_at < self.revalidate:
+            return
+        version, oldest = changes.latest(conn)
+        with self._lock:
+            seen = self._version
+        if seen is not None and version > seen:
+            if oldest > seen + 1 or version - seen > APPLIED_MAX_CATCHUP:
+                self.invalidate()
+            else:
+                cur = conn.cursor()
+                cur.execute(
+                    f"SELECT DISTINCT student_id FROM changes WHERE id > {placeholder} AND id <= {placeholder} "
+                    f"AND student_id IS NOT NULL",
+                    (seen, version)
+                )
+                students = [dict(row)["student_id"] for row in cur.fetchall()]
+                cur.close()
+                if students:
+                    self.invalidate(*students)
+        with self._lock:
+            if self._version is None or version > self._version:
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self, *student_ids):
+        """Forget the given students, or everyone when called without arguments."""
+        with self._lock:
+            self._generation += 1
+            if not student_ids:
+                self._entries.clear()
+            for student_id in student_ids:
+                self._entries.pop(student_id, None)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "version": self._version or 0,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+index = AppliedIndex()
@@ -0,0 +1,465 @@
+"""
+ASGI entry point: the same API and frontend without a worker per request.
+
+    uvicorn --app-dir src/backend asgi:app --workers 4
+    gunicorn --chdir src/backend -k uvicorn.workers.UvicornWorker asgi:app
+
+The read routes that mostly wait on the database (login, search, /api/status
+and the /api/applications pages) run on the event loop through async_db, so
+thousands of them can be in flight per worker. So does the change feed's SSE
+stream, which would otherwise hold a bridge thread for up to
+CHANGES_STREAM_SECONDS per open dashboard. Every other request (writes,
+uploads, NDJSON streams, static files, /metrics) is passed to the Flask app
+on a thread pool of ASGI_THREADS threads, so behaviour and responses match
+the WSGI deployment exactly.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qsl
+
+from flask_jwt_extended import create_access_token, decode_token
+from jwt import ExpiredSignatureError
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header
+
+import app as wsgi
+import async_db
+import auth
+import changes
+import db
+import limits
+import metrics
+import passwords
+import search
+import serialize
+from passwords import HashingBusy
+
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 32))
+BODY_SPOOL_SIZE = 1024 * 1024
+
+flask_app = wsgi.create_app()
+
+metrics.register(metrics.Gauge(
+    "async_db_pool", "Async connection pool counters",
+    lambda: {k: v for k, v in async_db.pool_stats().items() if k != "backend"}, "field"))
+
+
+# ------------------ REQUESTS ------------------
+
+class Request:
+    def __init__(self, scope, receive):
+        self.scope, self.receive = scope, receive
+        self.method, self.path = scope["method"], scope["path"]
+        self.args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+        self.headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+
+    @property
+    def is_json(self):
+        return self.headers.get("content-type", "").split(";")[0].strip() == "application/json"
+
+    def wants_stream(self):
+        """Same rule as app.wants_stream()"""
+        accept = parse_accept_header(self.headers.get("accept"), MIMEAccept)
+        return self.args.get("format") == "ndjson" or accept.best == wsgi.NDJSON_MIMETYPE
+
+    async def body(self):
+        chunks, more = [], True
+        while more:
+            message = await self.receive()
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        return b"".join(chunks)
+
+
+class Reply:
+    """A JSON response encoded the way jsonify() does it."""
+
+    def __init__(self, status, payload, headers=()):
+        self.status = status
+        self.body = f"{flask_app.json.dumps(payload)}\n".encode()
+        self.headers = [(b"content-type", b"application/json"), (b"content-length", str(len(self.body)).encode())]
+        self.headers.extend((name.encode(), value.encode()) for name, value in headers)
+
+    async def send(self, request, send):
+        headers = self.headers
+        if "origin" in request.headers:
+            headers = headers + [(b"access-control-allow-origin", b"*")]
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class StreamReply:
+    """A streamed response; stops early when the client disconnects."""
+
+    def __init__(self, status, chunks, content_type, headers=()):
+        self.status, self.chunks = status, chunks
+        self.headers = [(b"content-type", content_type.encode())]
+        self.headers.extend((name.encode(), value.encode()) for name, value in headers)
+
+    async def send(self, request, send):
+        headers = self.headers
+        if "origin" in request.headers:
+            headers = headers + [(b"access-control-allow-origin", b"*")]
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+
+        async def disconnected():
+            while (await request.receive())["type"] != "http.disconnect":
+                pass
+        watcher = asyncio.ensure_future(disconnected())
+        try:
+            while True:
+                # Wait for the next chunk or the disconnect, whichever comes first
+                chunk = asyncio.ensure_future(self.chunks.__anext__())
+                await asyncio.wait({chunk, watcher}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    await asyncio.gather(chunk, return_exceptions=True)
+                    return
+                if chunk.exception() is not None:
+                    # The status is already sent; a failing stream just ends
+                    if not isinstance(chunk.exception(), StopAsyncIteration):
+                        print("Stream failed:", chunk.exception())
+                    break
+                await send({"type": "http.response.body", "body": chunk.result().encode(), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            await self.chunks.aclose()
+
+
+def busy_reply():
+    return Reply(503, {"error": "Server busy, please retry"}, [("Retry-After", "1")])
+
+def identify(request):
+    """(user, None) or (None, error Reply): async version of jwt_required()"""
+    header = request.headers.get("authorization", "")
+    if not header.startswith("Bearer "):
+        return None, Reply(401, {"msg": "Missing Authorization Header"})
+    try:
+        with flask_app.app_context():
+            claims = decode_token(header[len("Bearer "):])
+    except ExpiredSignatureError:
+        return None, Reply(401, {"msg": "Token has expired"})
+    except Exception as e:
+        return None, Reply(422, {"msg": str(e)})
+    return json.loads(claims[flask_app.config["JWT_IDENTITY_CLAIM"]]), None
+
+async def authorize(request, role, endpoint):
+    """(user, None) or (None, error Reply): async version of auth.role_required"""
+    user, error = identify(request)
+    if error:
+        return None, error
+    message = f"{role.capitalize()} access required"
+    if user.get("role") != role:
+        return None, Reply(403, {"error": message})
+
+    exists = auth.account_cache.lookup(role, user["id"])
+    if exists is None:
+        async with async_db.connection() as conn:
+            row = await async_db.fetchone(
+                conn, f"SELECT id FROM {auth.ROLE_TABLES[role]} WHERE id={async_db.placeholder(conn)}",
+                (user["id"],), endpoint
+            )
+        exists = row is not None
+        auth.account_cache.store(role, user["id"], exists)
+    if not exists:
+        return None, Reply(403, {"error": message})
+    return user, None
+
+
+# ------------------ ASYNC ROUTES ------------------
+
+def store_password(role, user_id, hashed):
+    with db.connection() as conn:
+        wsgi.store_password(conn, role, user_id, hashed)
+
+async def login(request):
+    if not request.is_json:
+        return None
+    try:
+        data = json.loads(await request.body())
+    except ValueError:
+        return Reply(400, {"error": "Invalid JSON"})
+    if not isinstance(data, dict) or not data.get("email") or not data.get("password"):
+        return Reply(400, {"error": "Missing data"})
+
+    client = request.scope.get("client")
+    limited = limits.check("portal.login", client[0] if client else None, limits.login_identity(data["email"]))
+    if limited:
+        status, error, retry_after = limited
+        return Reply(status, {"error": error}, [("Retry-After", str(retry_after))])
+
+    email = data["email"]
+    if email in auth.unknown_emails:
+        return Reply(401, {"error": "Invalid credentials"})
+    async with async_db.connection() as conn:
+        account = await async_db.fetchone(
+            conn, auth.ACCOUNT_QUERY.format(placeholder=async_db.placeholder(conn)), (email,), "login")
+    if account is None:
+        auth.unknown_emails.add(email)
+        return Reply(401, {"error": "Invalid credentials"})
+
+    # The connection is back in the pool while the password is checked
+    if not await passwords.verify_password_async(account["password"], data["password"]):
+        return Reply(401, {"error": "Invalid credentials"})
+
+    if passwords.needs_rehash(account["password"]):
+        try:
+            hashed = await passwords.hash_password_async(data["password"])
+            # Through db.run_write like every other write (the SQLite writer, on SQLite)
+            await asyncio.to_thread(store_password, account["role"], account["id"], hashed)
+        except Exception as e:
+            print("Password rehash failed:", e)
+
+    with flask_app.app_context():
+        token = create_access_token(identity=json.dumps({"id": account["id"], "email": email, "role": account["role"]}))
+    return Reply(200, {"access_token": token, "role": account["role"]})
+
+async def search_internships(request):
+    text = request.args.get("q", "")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), search.MAX_RESULTS))
+    except ValueError:
+        return Reply(400, {"error": "Invalid limit"})
+
+    async with async_db.connection() as conn:
+        # FTS5 availability was probed with a sync connection at startup
+        built = search.search_query(None, async_db.is_postgres(conn), text, limit, wsgi.INTERNSHIP_FIELDS.select())
+        if built is None:
+            return Reply(200, [])
+        results = await async_db.fetchall(conn, *built, "search_internships")
+    return Reply(200, results)
+
+async def get_student_applications(request):
+    if request.wants_stream():
+        return None
+    user, error = await authorize(request, "student", "get_student_applications")
+    if error:
+        return error
+    try:
+        projection = wsgi.STUDENT_APPLICATION_FIELDS.from_request(request.args.get("fields"))
+    except ValueError as e:
+        return Reply(400, {"error": str(e)})
+
+    async with async_db.connection() as conn:
+        query = wsgi.student_applications_query(async_db.placeholder(conn), projection)
+        applications = await async_db.fetchall(conn, query, (user["id"],), "get_student_applications")
+    if request.args.get("format") == serialize.COLUMNAR:
+        return Reply(200, serialize.columnar(projection, applications))
+    return Reply(200, applications)
+
+async def get_all_applications(request):
+    if request.wants_stream():
+        return None
+    _, error = await authorize(request, "admin", "get_all_applications")
+    if error:
+        return error
+
+    status = request.args.get("status")
+    if status and status not in wsgi.APPLICATION_STATUSES:
+        return Reply(400, {"error": "Invalid status"})
+    try:
+        internship_id = request.args.get("internship_id", type=int)
+        student_id = request.args.get("student_id", type=int)
+        limit = wsgi.page_size(request.args.get("limit"))
+        cursor = request.args.get("cursor")
+        after = wsgi.decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        return Reply(400, {"error": "Invalid pagination parameters"})
+    try:
+        projection = wsgi.APPLICATION_FIELDS.from_request(request.args.get("fields"))
+    except ValueError as e:
+        return Reply(400, {"error": str(e)})
+
+    async with async_db.connection() as conn:
+        placeholder = async_db.placeholder(conn)
+        query, params = wsgi.applications_query(placeholder, status, internship_id, student_id, after, projection)
+        rows = await async_db.fetchall(
+            conn, query + f" LIMIT {placeholder}", (*params, limit + 1), "get_all_applications")
+    applications, next_cursor = wsgi.applications_page(rows, limit)
+    if request.args.get("format") == serialize.COLUMNAR:
+        return Reply(200, {**serialize.columnar(projection, applications), "next_cursor": next_cursor})
+    return Reply(200, {"data": applications, "next_cursor": next_cursor})
+
+async def stream_changes(request):
+    """Same as app.stream_changes, without holding a bridge thread for the stream's lifetime"""
+    user, error = identify(request)
+    if error:
+        return error
+    student_id = None if user["role"] == "admin" else user["id"]
+    version = None
+    for value in (request.headers.get("last-event-id"), request.args.get("since")):
+        try:
+            version = int(value)
+            break
+        except (TypeError, ValueError):
+            continue
+    if version is None:
+        async with async_db.connection() as conn:
+            row = await async_db.fetchone(
+                conn, "SELECT COALESCE(MAX(id), 0) AS version FROM changes", (), "stream_changes")
+        version = row["version"]
+    return StreamReply(200, changes.stream_async(version, student_id), "text/event-stream",
+                       [("Cache-Control", "no-cache"), ("X-Accel-Buffering", "no")])
+
+# A handler returning None hands the (unread) request to Flask instead
+ROUTES = {
+    ("POST", "/api/login"): login,
+    ("GET", "/api/internships/search"): search_internships,
+    ("GET", "/api/status"): get_student_applications,
+    ("GET", "/api/applications"): get_all_applications,
+    ("GET", "/api/changes/stream"): stream_changes,
+}
+
+async def dispatch(handler, request, send):
+    start = time.perf_counter()
+    try:
+        reply = await handler(request)
+    except (HashingBusy, db.WriteTimeout):
+        reply = busy_reply()
+    except db.PoolTimeout as e:
+        print("Database Pool Error:", e)
+        reply = Reply(500, {"error": "DB error"})
+    except Exception as e:
+        reply = Reply(500, {"error": str(e)})
+    if reply is None:
+        return False
+    await reply.send(request, send)
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - start, method=request.method, route=request.path, status=reply.status)
+    return True
+
+
+# ------------------ WSGI BRIDGE ------------------
+
+def build_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope["headers"]:
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WSGIBridge:
+    """Runs a WSGI app on a bounded thread pool, streaming its body back to the loop."""
+
+    def __init__(self, wsgi_app, threads=ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        body = SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE)
+        more = True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return
+            body.write(message.get("body", b""))
+            more = message.get("more_body", False)
+        body.seek(0)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self.run, build_environ(scope, body), send, loop)
+        finally:
+            body.close()
+
+    def run(self, environ, send, loop):
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        start = {}
+        def start_response(status, headers, exc_info=None):
+            start["message"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+            }
+            return lambda data: emit({"type": "http.response.body", "body": data, "more_body": True})
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                if "message" in start:
+                    emit(start.pop("message"))
+                if chunk:
+                    emit({"type": "http.response.body", "body": chunk, "more_body": True})
+            if "message" in start:
+                emit(start.pop("message"))
+            emit({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+# ------------------ APPLICATION ------------------
+
+bridge = WSGIBridge(flask_app)
+
+def probe_search():
+    conn = db.get_db_connection()
+    if conn is not None:
+        try:
+            if not db.is_postgres(conn):
+                search.fts5_available(conn)
+        finally:
+            conn.close()
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.get_running_loop().run_in_executor(bridge.executor, probe_search)
+                await async_db.get_pool()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_db.close_pool()
+            bridge.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http":
+        handler = ROUTES.get((scope["method"], scope["path"]))
+        if handler is not None and await dispatch(handler, Request(scope, receive), send):
+            return
+        return await bridge(scope, receive, send)
+    raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
@@ -0,0 +1,192 @@
+"""
+Async counterpart of db.py, used by the ASGI entry point (asgi.py).
+
+PostgreSQL (DATABASE_URL set) goes through psycopg 3's AsyncConnectionPool;
+SQLite through a bounded set of aiosqlite connections. Both speak the same
+SQL as the sync code ("%s" / "?" placeholders) and return rows as dicts.
+Pool size and checkout timeout reuse DB_POOL_MIN/MAX/TIMEOUT; each driver is
+imported only when its pool is created.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+
+import db
+import metrics
+
+
+# ------------------ POOLS ------------------
+
+class PostgresPool:
+    kind = "postgresql"
+
+    def __init__(self, dsn, minconn=db.POOL_MIN, maxconn=db.POOL_MAX, timeout=db.POOL_TIMEOUT):
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool, PoolTimeout
+        self._timeout_error = PoolTimeout
+        self._pool = AsyncConnectionPool(
+            dsn, min_size=minconn, max_size=maxconn, timeout=timeout,
+            kwargs={"row_factory": dict_row}, open=False
+        )
+        self.stats = db.PoolStats(maxconn)
+
+    async def open(self):
+        await self._pool.open()
+
+    @asynccontextmanager
+    async def connection(self):
+        start = time.perf_counter()
+        try:
+            async with self._pool.connection() as conn:
+                self.stats.checked_out(time.perf_counter() - start)
+                try:
+                    yield conn
+                finally:
+                    self.stats.checked_in()
+        except self._timeout_error:
+            self.stats.timed_out()
+            raise db.PoolTimeout(f"No database connection available after {self._pool.timeout}s")
+
+    async def close(self):
+        await self._pool.close()
+
+
+class SQLitePool:
+    """Up to `size` aiosqlite connections (each runs its queries on its own thread),
+    opened with the same pragmas as db.connect_sqlite()."""
+
+    kind = "sqlite"
+
+    def __init__(self, path=None, size=db.POOL_MAX, timeout=db.POOL_TIMEOUT):
+        import aiosqlite
+        self._connect = aiosqlite.connect
+        self.path = path or db.SQLITE_PATH
+        self.size, self.timeout = size, timeout
+        self._idle = asyncio.Queue()
+        self._opened = 0
+        self.stats = db.PoolStats(0)
+
+    async def open(self):
+        pass
+
+    async def _acquire(self):
+        if self._idle.empty() and self._opened < self.size:
+            # Count the connection before awaiting so concurrent callers cannot overshoot
+            self._opened += 1
+            try:
+                conn = await self._connect(self.path, timeout=db.SQLITE_BUSY_TIMEOUT)
+                for pragma in db.sqlite_pragmas():
+                    await conn.execute(pragma)
+            except Exception:
+                self._opened -= 1
+                raise
+            conn.row_factory = sqlite3.Row
+            self.stats.size = self._opened
+            return conn
+        try:
+            return await asyncio.wait_for(self._idle.get(), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.timed_out()
+            raise db.PoolTimeout(f"No database connection available after {self.timeout}s")
+
+    @asynccontextmanager
+    async def connection(self):
+        start = time.perf_counter()
+        conn = await self._acquire()
+        self.stats.checked_out(time.perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    await conn.rollback()
+                self._idle.put_nowait(conn)
+            except sqlite3.Error:
+                # Unusable: close it (and its file handle) before forgetting it
+                try:
+                    await conn.close()
+                except sqlite3.Error:
+                    pass
+                self._opened -= 1
+                self.stats.size = self._opened
+            self.stats.checked_in()
+
+    async def close(self):
+        while not self._idle.empty():
+            try:
+                await self._idle.get_nowait().close()
+            except sqlite3.Error:
+                pass
+        self._opened = 0
+        self.stats.size = 0
+
+
+_pool = None
+
+async def get_pool():
+    """The process-wide pool, created on first use inside the running event loop."""
+    global _pool
+    if _pool is None:
+        database_url = os.environ.get("DATABASE_URL")
+        pool = PostgresPool(database_url) if database_url else SQLitePool()
+        await pool.open()
+        _pool = pool
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+def pool_stats():
+    if _pool is None:
+        return {}
+    return {"backend": _pool.kind, **_pool.stats.snapshot()}
+
+
+# ------------------ QUERIES ------------------
+
+@asynccontextmanager
+async def connection():
+    pool = await get_pool()
+    start = time.perf_counter()
+    async with pool.connection() as conn:
+        metrics.observe_connect(time.perf_counter() - start)
+        yield conn
+
+def is_postgres(conn):
+    return not type(conn).__module__.startswith("aiosqlite")
+
+def placeholder(conn):
+    return "%s" if is_postgres(conn) else "?"
+
+async def _execute(conn, query, params, endpoint):
+    statement = metrics._statement(query)
+    start = time.perf_counter()
+    try:
+        return await conn.execute(query, tuple(params))
+    finally:
+        metrics.DB_QUERY_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, statement=statement)
+
+async def fetchall(conn, query, params=(), endpoint="none"):
+    cur = await _execute(conn, query, params, endpoint)
+    rows = [dict(row) for row in await cur.fetchall()]
+    await cur.close()
+    metrics.DB_QUERY_ROWS.observe(len(rows), endpoint=endpoint, statement="SELECT")
+    return rows
+
+async def fetchone(conn, query, params=(), endpoint="none"):
+    cur = await _execute(conn, query, params, endpoint)
+    row = await cur.fetchone()
+    await cur.close()
+    metrics.DB_QUERY_ROWS.observe(0 if row is None else 1, endpoint=endpoint, statement="SELECT")
+    return None if row is None else dict(row)
+
+async def execute(conn, query, params=(), endpoint="none"):
+    """Run a write and commit it."""
+    cur = await _execute(conn, query, params, endpoint)
+    await cur.close()
+    await conn.commit()
@@ -0,0 +1,209 @@
+"""
+Role authorization for protected routes.
+
+The role and id inside the signed JWT identity are trusted. The only state
+consulted per request is an in-process cache: an account is looked up in the
+database at most once per AUTH_CACHE_TTL seconds, and revoke() (e.g. when an
+account is deleted) takes effect immediately in this process. Other gunicorn
+workers pick the change up when their cached entry expires.
+"""
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+import db
+from db import get_db
+
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", 300))
+LOGIN_MISS_TTL = float(os.environ.get("LOGIN_MISS_TTL", 30))
+LOGIN_MISS_MAX = int(os.environ.get("LOGIN_MISS_MAX", 10000))
+
+ROLE_TABLES = {"admin": "admins", "student": "students"}
+
+
+class AccountCache:
+    """Remembers which (role, id) pairs exist, with a TTL and explicit revocation."""
+
+    def __init__(self, ttl=AUTH_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._checked = {}   # (role, id) -> (exists, expires_at)
+        self._revoked = set()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, role, user_id):
+        """True/False if known, None if the database has to be asked."""
+        key = (role, user_id)
+        with self._lock:
+            if key in self._revoked:
+                self.hits += 1
+                return False
+            entry = self._checked.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def store(self, role, user_id, exists):
+        with self._lock:
+            self._checked[(role, user_id)] = (exists, time.monotonic() + self.ttl)
+
+    def revoke(self, role, user_id):
+        with self._lock:
+            self._revoked.add((role, user_id))
+            self._checked.pop((role, user_id), None)
+
+    def invalidate(self, role=None, user_id=None):
+        """Forget cached lookups (and revocations) for one account, or everything."""
+        with self._lock:
+            if role is None:
+                self._checked.clear()
+                self._revoked.clear()
+            else:
+                self._checked.pop((role, user_id), None)
+                self._revoked.discard((role, user_id))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "entries": len(self._checked),
+                "revoked": len(self._revoked),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+account_cache = AccountCache()
+
+
+class UnknownEmails:
+    """Short-lived negative cache of login emails that matched no account.
+
+    Bounded to `size` entries (oldest dropped first), so a credential-stuffing
+    burst of random addresses costs one lookup per address and a fixed amount
+    of memory. Registration forgets the email in this process; other workers
+    notice within `ttl` seconds.
+    """
+
+    def __init__(self, ttl=LOGIN_MISS_TTL, size=LOGIN_MISS_MAX):
+        self.ttl, self.size = ttl, size
+        self._lock = threading.Lock()
+        self._expires = {}   # email -> expires_at, in insertion order
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, email):
+        with self._lock:
+            expires = self._expires.get(email)
+            if expires is not None and expires > time.monotonic():
+                self.hits += 1
+                return True
+            if expires is not None:
+                del self._expires[email]
+            self.misses += 1
+            return False
+
+    def add(self, email):
+        with self._lock:
+            self._expires.pop(email, None)
+            self._expires[email] = time.monotonic() + self.ttl
+            while len(self._expires) > self.size:
+                del self._expires[next(iter(self._expires))]
+
+    def discard(self, email=None):
+        """Forget one email, or everything."""
+        with self._lock:
+            if email is None:
+                self._expires.clear()
+            else:
+                self._expires.pop(email, None)
+
+    def snapshot(self):
+        with self._lock:
+            return {"entries": len(self._expires), "hits": self.hits, "misses": self.misses}
+
+unknown_emails = UnknownEmails()
+
+
+# One row per account, so login resolves an email with a single indexed
+# query. Both branches are served by the UNIQUE(email) index of their table;
+# students win if the same email exists in both, as the old two-step lookup did.
+ACCOUNTS_VIEW = [
+    "DROP VIEW IF EXISTS accounts",
+    """CREATE VIEW accounts AS
+        SELECT id, email, password, 'student' AS role, 0 AS precedence FROM students
+        UNION ALL
+        SELECT id, email, password, 'admin' AS role, 1 AS precedence FROM admins""",
+]
+
+ACCOUNT_QUERY = "SELECT id, role, password FROM accounts WHERE email={placeholder} ORDER BY precedence LIMIT 1"
+
+def find_account(conn, email):
+    """(id, role, password hash) for `email`, or None; uses the negative cache."""
+    if email in unknown_emails:
+        return None
+    cur = conn.cursor()
+    cur.execute(ACCOUNT_QUERY.format(placeholder=db.placeholder(conn)), (email,))
+    row = cur.fetchone()
+    cur.close()
+    if row is None:
+        unknown_emails.add(email)
+        return None
+    if isinstance(row, dict):
+        return row["id"], row["role"], row["password"]
+    return row[0], row[1], row[2]
+
+def revoke(role, user_id):
+    account_cache.revoke(role, user_id)
+
+def current_user():
+    return json.loads(get_jwt_identity())
+
+def _account_exists(role, user_id):
+    conn = get_db()
+    if not conn:
+        return None
+    placeholder = db.placeholder(conn)
+    cur = conn.cursor()
+    cur.execute(f"SELECT id FROM {ROLE_TABLES[role]} WHERE id={placeholder}", (user_id,))
+    found = cur.fetchone() is not None
+    cur.close()
+    return found
+
+def role_required(role):
+    message = f"{role.capitalize()} access required"
+
+    def decorator(f):
+        @wraps(f)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            user = current_user()
+            if user.get("role") != role:
+                return jsonify({"error": message}), 403
+
+            exists = account_cache.lookup(role, user["id"])
+            if exists is None:
+                try:
+                    exists = _account_exists(role, user["id"])
+                except Exception as e:
+                    return jsonify({"error": str(e)}), 500
+                if exists is None:
+                    return jsonify({"error": "DB error"}), 500
+                account_cache.store(role, user["id"], exists)
+
+            if not exists:
+                return jsonify({"error": message}), 403
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+admin_required = role_required("admin")
+student_required = role_required("student")
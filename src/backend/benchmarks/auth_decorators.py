@@ -0,0 +1,112 @@
+"""
+Benchmark: per-request role lookup (old decorators) vs cached role claims.
+
+    python benchmarks/auth_decorators.py [--requests 2000]
+
+Prints per-request latency for each decorator as JSON. Runs against a
+throw-away SQLite database so the bundled internship_portal.db is untouched.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from functools import wraps
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "bench_auth.db"))
+
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+
+import auth
+import db
+from app import init_db
+
+
+def legacy_admin_required(f):
+    """The pre-cache decorator: new connection and a SELECT on every call."""
+    @wraps(f)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = json.loads(get_jwt_identity())
+        conn = db.get_db_connection()
+        if not conn:
+            return jsonify({"error": "DB error"}), 500
+        cur = conn.cursor()
+        cur.execute(f"SELECT id FROM admins WHERE id={db.placeholder(conn)}", (user["id"],))
+        admin = cur.fetchone()
+        cur.close()
+        conn.close()
+        if not admin:
+            return jsonify({"error": "Admin access required"}), 403
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def build_app():
+    bench = Flask(__name__)
+    bench.config["JWT_SECRET_KEY"] = "bench-secret-key-bench-secret-key"
+    JWTManager(bench)
+    db.init_app(bench)
+
+    @bench.route("/legacy")
+    @legacy_admin_required
+    def legacy():
+        return jsonify({"ok": True})
+
+    @bench.route("/cached")
+    @auth.admin_required
+    def cached():
+        return jsonify({"ok": True})
+
+    return bench
+
+
+def run(client, path, headers, n):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        res = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - start) * 1e6)
+        assert res.status_code == 200, res.get_json()
+    timings.sort()
+    return {
+        "requests": n,
+        "mean_us": round(statistics.fmean(timings), 1),
+        "p50_us": round(timings[n // 2], 1),
+        "p95_us": round(timings[int(n * 0.95)], 1),
+        "p99_us": round(timings[int(n * 0.99)], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare old and cached role decorators")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    init_db()
+    bench = build_app()
+    with bench.app_context():
+        token = create_access_token(identity=json.dumps({"id": 1, "email": "admin@example.com", "role": "admin"}))
+    headers = {"Authorization": f"Bearer {token}"}
+    client = bench.test_client()
+
+    # Warm up both paths (and the account cache) before measuring
+    run(client, "/legacy", headers, 50)
+    run(client, "/cached", headers, 50)
+
+    results = {
+        "legacy": run(client, "/legacy", headers, args.requests),
+        "cached": run(client, "/cached", headers, args.requests),
+        "account_cache": auth.account_cache.snapshot(),
+    }
+    results["speedup_p50"] = round(results["legacy"]["p50_us"] / results["cached"]["p50_us"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Load test for the API.
+
+    python benchmarks/load.py --students 2000 --internships 200 --applications 20000 \
+        --concurrency 1,8,32 --requests 400 --mode testclient,gunicorn,uvicorn --output bench.json
+
+Seeds a throw-away SQLite database, then drives each scenario (login,
+internships, search, apply, status, applications, approve, stats) at every
+concurrency level through the Flask test client and/or local servers:
+gunicorn serving the WSGI app and uvicorn serving asgi.py side by side.
+Prints (and optionally writes) JSON with p50/p95/p99 latency in ms, req/s
+and status-code counts, tagged with the current git commit so runs can be
+compared across commits.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-bench-secret-key")
+# Every simulated client comes from 127.0.0.1; measure the app, not the limiter
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+from benchmarks import seed as seeder
+
+
+# ------------------ DRIVERS ------------------
+
+class TestClientDriver:
+    """In-process requests through Flask's test client (one client per thread)."""
+
+    name = "testclient"
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, json_body=None, form=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        res = client.open(path, method=method, headers=headers, json=json_body, data=form)
+        res.get_data()
+        return res.status_code
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    """Real HTTP requests against a server process started for the run."""
+
+    name = None
+
+    def __init__(self, db_path, workers, threads):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        env = dict(os.environ, SQLITE_PATH=db_path)
+        self.proc = subprocess.Popen(
+            self.command(workers, threads), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return
+            except OSError:
+                time.sleep(0.1)
+        self.close()
+        raise RuntimeError(f"{self.name} did not start")
+
+    def command(self, workers, threads):
+        raise NotImplementedError
+
+    def request(self, method, path, headers=None, json_body=None, form=None):
+        headers = dict(headers or {})
+        data = None
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        req = urllib.request.Request(f"http://127.0.0.1:{self.port}{path}", data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as res:
+                res.read()
+                return res.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def close(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+class GunicornDriver(HTTPDriver):
+    """The WSGI app under gunicorn's sync (or threaded) workers."""
+
+    name = "gunicorn"
+
+    def command(self, workers, threads):
+        return ["gunicorn", "--chdir", BACKEND_DIR, "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+                "app:create_app()", "--bind", f"127.0.0.1:{self.port}",
+                "--workers", str(workers), "--threads", str(threads), "--log-level", "warning"]
+
+
+class UvicornDriver(HTTPDriver):
+    """The ASGI entry point (asgi.py) under uvicorn, same number of workers."""
+
+    name = "uvicorn"
+
+    def command(self, workers, threads):
+        return ["uvicorn", "--app-dir", BACKEND_DIR, "asgi:app", "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+
+
+SERVERS = {driver.name: driver for driver in (GunicornDriver, UvicornDriver)}
+
+
+# ------------------ SCENARIOS ------------------
+
+class Context:
+    """Tokens and fresh (student, internship) pairs shared by the scenarios."""
+
+    def __init__(self, app, args):
+        from flask_jwt_extended import create_access_token
+        self.args = args
+        with app.app_context():
+            self.admin = {"Authorization": "Bearer " + create_access_token(
+                identity=json.dumps({"id": 1, "email": "admin@example.com", "role": "admin"}))}
+            self.students = [
+                {"Authorization": "Bearer " + create_access_token(
+                    identity=json.dumps({"id": i, "email": seeder.student_email(i), "role": "student"}))}
+                for i in range(1, args.students + 1)
+            ]
+        self._pairs = seeder.apply_pairs(args.students, args.internships, args.applications)
+        self._lock = threading.Lock()
+        self._n = 0
+
+    def next_index(self):
+        with self._lock:
+            self._n += 1
+            return self._n
+
+    def next_pair(self):
+        with self._lock:
+            return next(self._pairs, (1, 1))
+
+
+def scenario_login(driver, ctx):
+    i = ctx.next_index() % ctx.args.students + 1
+    return driver.request("POST", "/api/login", json_body={"email": seeder.student_email(i), "password": seeder.SEED_PASSWORD})
+
+def scenario_internships(driver, ctx):
+    return driver.request("GET", "/api/internships")
+
+def scenario_search(driver, ctx):
+    return driver.request("GET", "/api/internships/search?q=cloud")
+
+def scenario_apply(driver, ctx):
+    student, internship = ctx.next_pair()
+    return driver.request("POST", "/api/apply", headers=ctx.students[student - 1], form={"internship_id": internship})
+
+def scenario_status(driver, ctx):
+    i = ctx.next_index() % ctx.args.students
+    return driver.request("GET", "/api/status", headers=ctx.students[i])
+
+def scenario_applications(driver, ctx):
+    return driver.request("GET", "/api/applications?status=Pending&limit=50", headers=ctx.admin)
+
+def scenario_approve(driver, ctx):
+    # Walks the seeded applications; once an internship is full the rest answer 409
+    i = ctx.next_index() % ctx.args.applications + 1
+    return driver.request("POST", f"/api/applications/{i}/approve", headers=ctx.admin)
+
+def scenario_stats(driver, ctx):
+    return driver.request("GET", "/api/stats", headers=ctx.admin)
+
+SCENARIOS = {
+    "login": scenario_login,
+    "internships": scenario_internships,
+    "search": scenario_search,
+    "apply": scenario_apply,
+    "status": scenario_status,
+    "applications": scenario_applications,
+    "approve": scenario_approve,
+    "stats": scenario_stats,
+}
+
+
+# ------------------ RUNNER ------------------
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_scenario(driver, ctx, scenario, requests, concurrency):
+    latencies = []
+    codes = Counter()
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            code = scenario(driver, ctx)
+        except Exception:
+            code = "error"
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            codes[str(code)] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "req_per_s": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "status_codes": dict(codes),
+    }
+
+def run_driver(driver, ctx, args):
+    results = {}
+    for name in args.scenarios:
+        requests = args.login_requests if name == "login" else args.requests
+        results[name] = [
+            run_scenario(driver, ctx, SCENARIOS[name], requests, concurrency)
+            for concurrency in args.concurrency
+        ]
+    return results
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the internship portal API")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--internships", type=int, default=100)
+    parser.add_argument("--applications", type=int, default=10000)
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario and concurrency level")
+    parser.add_argument("--login-requests", type=int, default=40, help="login hashes passwords, so fewer by default")
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=list(SCENARIOS))
+    parser.add_argument("--mode", type=lambda v: v.split(","), default=["testclient"],
+                        help="comma-separated: testclient, gunicorn, uvicorn (both = testclient,gunicorn)")
+    parser.add_argument("--workers", type=int, default=4, help="server worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument("--db", help="database path (default: a temp file)")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if "both" in args.mode:
+        args.mode = ["testclient", "gunicorn"] + [m for m in args.mode if m != "both"]
+    unknown = set(args.mode) - {"testclient", *SERVERS}
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    db_path = os.path.abspath(args.db or os.path.join(tempfile.mkdtemp(), "bench.db"))
+    seeder.seed(db_path, args.students, args.internships, args.applications)
+
+    from app import app
+    ctx = Context(app, args)
+    report = {
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "db")},
+        "results": {},
+    }
+
+    if "testclient" in args.mode:
+        report["results"]["testclient"] = run_driver(TestClientDriver(app), ctx, args)
+
+    for name, server in SERVERS.items():
+        if name not in args.mode:
+            continue
+        if shutil.which(name) is None:
+            report["results"][name] = {"skipped": f"{name} is not installed"}
+            continue
+        # Fresh data so apply/approve numbers are comparable between modes
+        seeder.seed(db_path, args.students, args.internships, args.applications)
+        ctx = Context(app, args)
+        driver = server(db_path, args.workers, args.threads)
+        try:
+            report["results"][name] = run_driver(driver, ctx, args)
+        finally:
+            driver.close()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Seed a SQLite database with synthetic students, internships and applications.
+
+    python benchmarks/seed.py bench.db --students 2000 --internships 200 --applications 20000
+
+Every student gets the password SEED_PASSWORD (hashed once and reused, so
+seeding stays fast). Applications use the first --applications
+(student, internship) pairs; apply_pairs() yields the ones still free.
+"""
+import argparse
+import os
+import random
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SEED_PASSWORD = "bench-password"
+STATUSES = ("Pending", "Pending", "Approved", "Rejected")
+BATCH = 5000
+
+
+def student_email(i):
+    return f"student{i}@bench.example.com"
+
+def all_pairs(students, internships):
+    """Deterministic (student_id, internship_id) order shared by seed() and apply_pairs()."""
+    for offset in range(internships):
+        for student in range(1, students + 1):
+            yield student, (student + offset - 1) % internships + 1
+
+def apply_pairs(students, internships, applications):
+    pairs = all_pairs(students, internships)
+    for _ in range(applications):
+        next(pairs, None)
+    return pairs
+
+def seed(path, students, internships, applications, rng=None):
+    """Create the schema in a fresh database at `path` and fill it."""
+    if applications > students * internships:
+        raise ValueError("more applications than (student, internship) pairs")
+    rng = rng or random.Random(42)
+    os.environ["SQLITE_PATH"] = path
+
+    import db
+    from app import init_db
+    import passwords
+
+    # Drop connections (and the writer) still pointing at a previous database
+    db.reset_pool()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db.SQLITE_PATH = path
+    init_db()
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    hashed = passwords.hash_password(SEED_PASSWORD)
+
+    def insert_all(query, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH:
+                cur.executemany(query, batch)
+                batch = []
+        if batch:
+            cur.executemany(query, batch)
+
+    insert_all(
+        "INSERT INTO students (id, name, email, password, course, year) VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, f"Student {i}", student_email(i), hashed, rng.choice(("CS", "IT", "SE")), rng.randint(1, 4))
+         for i in range(1, students + 1))
+    )
+    words = ("backend", "frontend", "data", "cloud", "mobile", "security", "platform", "research")
+    insert_all(
+        "INSERT INTO internships (id, title, company, description, duration, slots, admin_id) VALUES (?, ?, ?, ?, ?, ?, 1)",
+        ((i, f"{rng.choice(words).title()} Intern {i}", f"Company {i % 50}",
+          " ".join(rng.choice(words) for _ in range(30)), "3 months", rng.randint(1, 20))
+         for i in range(1, internships + 1))
+    )
+    pairs = all_pairs(students, internships)
+    insert_all(
+        "INSERT INTO applications (student_id, internship_id, cover_letter, status, applied_at) "
+        "VALUES (?, ?, ?, ?, datetime('now', ?))",
+        ((s, i, "Seeded cover letter", rng.choice(STATUSES), f"-{n} seconds")
+         for n, (s, i) in zip(range(applications), pairs))
+    )
+    conn.commit()
+    conn.close()
+    # Counters, search index and catalog version now reflect the seeded rows
+    init_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a benchmark SQLite database")
+    parser.add_argument("path")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--internships", type=int, default=100)
+    parser.add_argument("--applications", type=int, default=10000)
+    args = parser.parse_args()
+    seed(os.path.abspath(args.path), args.students, args.internships, args.applications)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Payload size and encode time of the admin applications list.
+
+    python benchmarks/serialization.py [--applications 20000] [--runs 5] [--output serialization.json]
+
+Seeds a throwaway database (benchmarks/seed.py), reads the whole listing
+once per shape and times encoding it:
+
+- select_star: the old SELECT a.* rows (every column, cv_file included)
+- projected:   APPLICATION_FIELDS, as /api/applications returns them
+- narrow:      ?fields=id,status,student_name,title,company
+- each of the above again as {"columns", "rows"} (?format=columnar)
+
+with the stdlib encoder and, when installed, orjson. Reports the bytes and
+the median encode milliseconds of each, tagged with the git commit like
+benchmarks/load.py.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.load import git_commit
+from benchmarks.seed import seed
+
+SELECT_STAR = """
+        SELECT a.*, s.name as student_name, s.email as student_email, s.course, s.year,
+               i.title, i.company"""
+NARROW = "id,status,student_name,title,company"
+
+
+def encoders():
+    import serialize
+    found = {"json": lambda obj: json.dumps(obj, default=serialize.flask_default, sort_keys=True, separators=(",", ":"))}
+    if serialize.orjson is not None:
+        found["orjson"] = lambda obj: serialize.orjson.dumps(
+            obj, default=serialize.flask_default, option=serialize._options).decode()
+    return found
+
+def fetch(conn, select):
+    from app import APPLICATION_JOINS
+    cur = conn.cursor()
+    cur.execute(f"{select} {APPLICATION_JOINS} ORDER BY a.applied_at DESC, a.id DESC")
+    columns = [column[0] for column in cur.description]
+    rows = cur.fetchall()
+    cur.close()
+    return columns, rows
+
+def shapes(conn):
+    """name -> payload, for every shape compared."""
+    import serialize
+    from app import APPLICATION_FIELDS, dict_from_row
+    narrow = APPLICATION_FIELDS.from_request(NARROW)
+    found = {}
+    for name, select in (("select_star", SELECT_STAR), ("projected", f"SELECT {APPLICATION_FIELDS.select()}"),
+                         ("narrow", f"SELECT {narrow.select()}")):
+        columns, rows = fetch(conn, select)
+        found[name] = [dict_from_row(row) for row in rows]
+        found[f"{name}_columnar"] = {"columns": columns, "rows": [serialize.values(row) for row in rows]}
+    return found
+
+def measure(encode, payload, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = encode(payload)
+        times.append((time.perf_counter() - start) * 1000)
+    return {"bytes": len(text.encode()), "encode_ms": round(statistics.median(times), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare applications list payloads and encoders")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--internships", type=int, default=200)
+    parser.add_argument("--applications", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    os.environ.pop("DATABASE_URL", None)
+    seed(os.path.join(tempfile.mkdtemp(), "serialization.db"), args.students, args.internships, args.applications)
+    import db
+    conn = db.get_db_connection()
+    payloads = shapes(conn)
+    conn.close()
+
+    report = {"commit": git_commit(), "applications": args.applications, "runs": args.runs, "results": {}}
+    for encoder, encode in encoders().items():
+        report["results"][encoder] = {name: measure(encode, payload, args.runs) for name, payload in payloads.items()}
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Startup cost of the backend: import time, app construction and memory.
+
+    python benchmarks/startup.py [--runs 5] [--top 15] [--output startup.json]
+
+Each run is a fresh interpreter that imports app and calls create_app().
+Reports the median wall time of each step, the resident memory afterwards,
+and the slowest modules according to python -X importtime (cumulative
+microseconds), tagged with the git commit like benchmarks/load.py.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.load import git_commit
+
+PROBE = """
+import json, resource, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def probe(env):
+    out = subprocess.check_output([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env, text=True)
+    return json.loads(out.strip().splitlines()[-1])
+
+def slowest_imports(env, top):
+    """(module, cumulative_us) pairs from -X importtime, slowest first."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        modules.append((name.strip(), int(cumulative_us)))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return modules[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend import and startup time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    env = dict(os.environ, SQLITE_PATH=os.path.join(tempfile.mkdtemp(), "startup.db"))
+    env.pop("DATABASE_URL", None)
+    runs = [probe(env) for _ in range(args.runs)]
+    report = {
+        "commit": git_commit(),
+        "runs": args.runs,
+        **{key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]},
+        "slowest_imports_us": dict(slowest_imports(env, args.top)),
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""
+Bulk import and export: students, internships and applications as CSV or NDJSON.
+
+    python bulk.py import students cohort.csv
+    python bulk.py import internships postings.ndjson --admin-email admin@example.com
+    python bulk.py import applications applications.csv
+    python bulk.py export applications --format csv --status Approved > placements.csv
+
+The same code backs POST /api/import/<entity> and GET /api/export/applications.
+Input is read as a stream and handled IMPORT_BATCH rows at a time: a batch
+is validated, student passwords are hashed across processes
+(passwords.hash_many), then the batch is inserted in one transaction:
+- SQLite: one executemany of INSERT OR IGNORE.
+- PostgreSQL: COPY into a temp table, then INSERT ... SELECT ... ON
+  CONFLICT DO NOTHING.
+Rows that already exist (same student email, same student + internship) are
+counted as duplicates. Search index, stats counters, catalog version and
+change feed are updated in the same transaction, as the single-row routes
+do; imported Approved applications take internship slots, and those that do
+not fit are reported as invalid. Export streams rows off a server-side cursor, so reports of any size
+run in constant memory.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import applied
+import auth
+import capacity
+import catalog
+import changes
+import db
+import passwords
+import search
+import stats
+
+IMPORT_BATCH = int(os.environ.get("IMPORT_BATCH", 500))
+IMPORT_MAX_BYTES = int(os.environ.get("IMPORT_MAX_BYTES", 512 * 1024 * 1024))
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ("csv", "ndjson")
+APPLICATION_STATUSES = ("Pending", "Approved", "Rejected")
+
+
+# ------------------ VALIDATION ------------------
+
+def _text(row, name, required=False):
+    value = row.get(name)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f"{name} is required")
+    return value or None
+
+def _integer(row, name, default=None, required=False):
+    value = _text(row, name, required)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+def _email(row, name):
+    value = _text(row, name, required=True)
+    if "@" not in value:
+        raise ValueError(f"{name} is not an email address")
+    return value
+
+def _timestamp(row, name):
+    value = _text(row, name)
+    if value is None:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date/time")
+
+def student_values(row, context):
+    return (
+        _text(row, "name", required=True), _email(row, "email"), _text(row, "password", required=True),
+        _text(row, "course"), _integer(row, "year"),
+    )
+
+def internship_values(row, context):
+    slots = _integer(row, "slots", default=0)
+    if slots < 0:
+        raise ValueError("slots must not be negative")
+    return (
+        _text(row, "title", required=True), _text(row, "company", required=True), _text(row, "description"),
+        _text(row, "duration"), slots, _integer(row, "admin_id", default=context["admin_id"]),
+    )
+
+def application_values(row, context):
+    status = _text(row, "status") or "Pending"
+    if status not in APPLICATION_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(APPLICATION_STATUSES)}")
+    # student_id is resolved from student_email per batch (see resolve_applications)
+    return (
+        _email(row, "student_email"), _integer(row, "internship_id", required=True),
+        _text(row, "cover_letter"), status, _timestamp(row, "applied_at"),
+    )
+
+
+class Entity:
+    def __init__(self, table, columns, values):
+        self.table, self.columns, self.values = table, columns, values
+
+
+ENTITIES = {
+    "students": Entity("students", ("name", "email", "password", "course", "year"), student_values),
+    "internships": Entity(
+        "internships", ("title", "company", "description", "duration", "slots", "admin_id"), internship_values),
+    "applications": Entity(
+        "applications", ("student_id", "internship_id", "cover_letter", "status", "applied_at"), application_values),
+}
+
+
+# ------------------ READERS ------------------
+
+def read_csv(text):
+    """(line, row) pairs from a CSV text stream with a header row."""
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+def read_ndjson(text):
+    """(line, row) pairs, one JSON object per line; a bad line yields its error."""
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+            if not isinstance(row, dict):
+                raise ValueError("each line must be a JSON object")
+        except ValueError as e:
+            row = ValueError(f"invalid JSON: {e}")
+        yield line, row
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+def batches(rows, size):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ------------------ IMPORT ------------------
+
+def resolve_applications(conn, placeholder, values, report):
+    """Swap student_email for student_id and drop rows naming unknown students or internships."""
+    emails = sorted({v[0] for _, v in values})
+    internship_ids = sorted({v[1] for _, v in values})
+    cur = conn.cursor()
+    students = {}
+    if emails:
+        cur.execute(f"SELECT id, email FROM students WHERE email IN ({', '.join([placeholder] * len(emails))})", emails)
+        students = {row["email"]: row["id"] for row in map(dict, cur.fetchall())}
+    known = set()
+    if internship_ids:
+        cur.execute(
+            f"SELECT id FROM internships WHERE id IN ({', '.join([placeholder] * len(internship_ids))})", internship_ids)
+        known = {dict(row)["id"] for row in cur.fetchall()}
+    cur.close()
+
+    resolved = []
+    for line, (email, internship_id, *rest) in values:
+        if email not in students:
+            error(report, line, f"unknown student {email}")
+        elif internship_id not in known:
+            error(report, line, f"unknown internship {internship_id}")
+        else:
+            resolved.append((line, (students[email], internship_id, *rest)))
+    return resolved
+
+def error(report, line, message):
+    report["invalid"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "error": message})
+
+def insert_sqlite(cur, entity, rows):
+    """INSERT OR IGNORE the batch; returns the new ids. The single writer holds
+    the write lock, so everything above the previous MAX(id) is this batch."""
+    cur.execute(f"SELECT COALESCE(MAX(id), 0) AS last FROM {entity.table}")
+    last = dict(cur.fetchone())["last"]
+    cur.executemany(
+        f"INSERT OR IGNORE INTO {entity.table} ({', '.join(entity.columns)}) VALUES ({', '.join('?' * len(entity.columns))})",
+        rows
+    )
+    cur.execute(f"SELECT id FROM {entity.table} WHERE id > ? ORDER BY id", (last,))
+    return [dict(row)["id"] for row in cur.fetchall()]
+
+def insert_postgres(cur, entity, rows):
+    """COPY the batch into a temp table, then move the rows that do not conflict."""
+    columns = ", ".join(entity.columns)
+    stage = f"bulk_{entity.table}"
+    cur.execute(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {columns} FROM {entity.table} WITH NO DATA")
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {stage} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cur.execute(
+        f"INSERT INTO {entity.table} ({columns}) SELECT {columns} FROM {stage} "
+        f"ON CONFLICT DO NOTHING RETURNING id"
+    )
+    return sorted(dict(row)["id"] for row in cur.fetchall())
+
+def write_batch(conn, name, rows):
+    """Insert one validated batch and everything derived from it; returns the new ids."""
+    from app import APPLICATION_ROWS, INTERNSHIP_FIELDS, dict_from_row
+
+    entity = ENTITIES[name]
+    placeholder = db.placeholder(conn)
+    is_postgres = db.is_postgres(conn)
+
+    def insert(cur):
+        ids = (insert_postgres if is_postgres else insert_sqlite)(cur, entity, rows)
+        if not ids:
+            return ids
+        in_ids = f"IN ({', '.join([placeholder] * len(ids))})"
+        if name == "students":
+            stats.bump(cur, placeholder, total_students=len(ids))
+        elif name == "internships":
+            cur.execute(f"SELECT {INTERNSHIP_FIELDS.select()} FROM internships i WHERE i.id {in_ids} ORDER BY i.id", ids)
+            created = [dict_from_row(row) for row in cur.fetchall()]
+            for row in created:
+                search.index_internship(cur, is_postgres, row["id"], row["title"], row["company"], row["description"])
+            stats.bump(cur, placeholder, total_internships=len(ids))
+            catalog.bump(cur, placeholder)
+            changes.record_many(cur, placeholder, is_postgres, [
+                ("internship", row["id"], "created", None, row) for row in created
+            ])
+        else:
+            cur.execute(f"{APPLICATION_ROWS} WHERE a.id {in_ids} ORDER BY a.id", ids)
+            created = [dict_from_row(row) for row in cur.fetchall()]
+            counts, approved = {"total_applications": len(ids)}, {}
+            for row in created:
+                counter = stats.STATUS_COUNTERS[row["status"]]
+                counts[counter] = counts.get(counter, 0) + 1
+                if row["status"] == "Approved":
+                    approved[row["internship_id"]] = approved.get(row["internship_id"], 0) + 1
+            for internship_id, count in sorted(approved.items()):
+                if not capacity.take(cur, placeholder, internship_id, count):
+                    raise capacity.NoSlots(internship_id, f"internship {internship_id} has fewer than {count} slot(s) left")
+            if approved:
+                catalog.bump(cur, placeholder)
+            stats.bump(cur, placeholder, **counts)
+            changes.record_many(cur, placeholder, is_postgres, [
+                ("application", row["id"], "created", row["student_id"], row) for row in created
+            ])
+        return ids
+
+    return db.run_write(conn, insert)
+
+def import_rows(conn, name, rows, admin_id=None, batch_size=IMPORT_BATCH):
+    """Validate and insert (line, row) pairs batch by batch; returns a report:
+    rows, inserted, duplicates, invalid and the first MAX_REPORTED_ERRORS errors."""
+    entity = ENTITIES[name]
+    placeholder = db.placeholder(conn)
+    context = {"admin_id": admin_id}
+    report = {"entity": name, "rows": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "errors": []}
+
+    for batch in batches(rows, batch_size):
+        report["rows"] += len(batch)
+        values = []
+        for line, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                values.append((line, entity.values(row, context)))
+            except ValueError as e:
+                error(report, line, str(e))
+        if name == "applications":
+            values = resolve_applications(conn, placeholder, values, report)
+        if name == "students":
+            hashes = passwords.hash_many([v[2] for _, v in values])
+            values = [(line, (*v[:2], hashed, *v[3:])) for (line, v), hashed in zip(values, hashes)]
+        while values:
+            try:
+                ids = write_batch(conn, name, [v for _, v in values])
+            except capacity.NoSlots as e:
+                # The batch rolled back: drop the Approved rows that did not fit and retry the rest
+                internship_id = e.internship_id
+                for line, v in values:
+                    if v[1] == internship_id and v[3] == "Approved":
+                        error(report, line, str(e))
+                values = [(line, v) for line, v in values if not (v[1] == internship_id and v[3] == "Approved")]
+                continue
+            report["inserted"] += len(ids)
+            report["duplicates"] += len(values) - len(ids)
+            if name == "students":
+                # Every email in the batch now has an account; earlier failed logins must not stick
+                for _, v in values:
+                    auth.unknown_emails.discard(v[1])
+            break
+
+    stats.invalidate()
+    if name in ("internships", "applications"):
+        catalog.invalidate()
+    if name == "applications":
+        applied.index.invalidate()
+    changes.notify()
+    return report
+
+
+# ------------------ EXPORT ------------------
+
+EXPORT_COLUMNS = (
+    "application_id", "status", "applied_at", "cv_status",
+    "student_id", "student_name", "student_email", "course", "year",
+    "internship_id", "title", "company", "duration",
+)
+
+EXPORT_QUERY = """
+    SELECT a.id AS application_id, a.status, a.applied_at, a.cv_status,
+           s.id AS student_id, s.name AS student_name, s.email AS student_email, s.course, s.year,
+           i.id AS internship_id, i.title, i.company, i.duration
+    FROM applications a
+    JOIN students s ON a.student_id = s.id
+    JOIN internships i ON a.internship_id = i.id
+"""
+
+def export_query(placeholder, status=None, internship_id=None):
+    conditions, params = [], []
+    if status:
+        conditions.append(f"a.status = {placeholder}")
+        params.append(status)
+    if internship_id is not None:
+        conditions.append(f"a.internship_id = {placeholder}")
+        params.append(internship_id)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return EXPORT_QUERY + where + " ORDER BY a.id", params
+
+def export_lines(rows, fmt):
+    """Encode rows (sqlite3.Row / dict) one line at a time; CSV starts with a header."""
+    if fmt == "ndjson":
+        for row in rows:
+            yield json.dumps(dict(row), default=str) + "\n"
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        row = dict(row)
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def export_applications(conn, fmt, status=None, internship_id=None):
+    query, params = export_query(db.placeholder(conn), status, internship_id)
+    return export_lines(db.iter_rows(conn, query, params), fmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export for the internship portal")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_parser = sub.add_parser("import", help="import CSV or NDJSON rows")
+    import_parser.add_argument("entity", choices=sorted(ENTITIES))
+    import_parser.add_argument("file", help="path, or - for stdin")
+    import_parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    import_parser.add_argument("--admin-email", help="owner of imported internships (default: first admin)")
+    import_parser.add_argument("--batch", type=int, default=IMPORT_BATCH)
+    export_parser = sub.add_parser("export", help="stream applications with student and internship details")
+    export_parser.add_argument("entity", choices=["applications"])
+    export_parser.add_argument("--format", choices=FORMATS, default="csv")
+    export_parser.add_argument("--status", choices=APPLICATION_STATUSES)
+    export_parser.add_argument("--internship-id", type=int)
+    args = parser.parse_args()
+
+    with db.connection() as conn:
+        if args.command == "export":
+            sys.stdout.writelines(export_applications(conn, args.format, args.status, args.internship_id))
+            return
+
+        fmt = args.format or ("ndjson" if args.file.endswith((".ndjson", ".jsonl")) else "csv")
+        admin_id = None
+        if args.entity == "internships":
+            cur = conn.cursor()
+            if args.admin_email:
+                cur.execute(f"SELECT id FROM admins WHERE email = {db.placeholder(conn)}", (args.admin_email,))
+            else:
+                cur.execute("SELECT MIN(id) AS id FROM admins")
+            row = cur.fetchone()
+            admin_id = dict(row)["id"] if row else None
+            if admin_id is None:
+                sys.exit("No such admin")
+        text = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8-sig")
+        with text:
+            report = import_rows(conn, args.entity, READERS[fmt](text), admin_id, args.batch)
+        print(json.dumps(report, indent=2))
+    passwords.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Slot accounting for internships.
+
+internships.approved_count is kept next to slots and changed only in the
+transaction that approves (or un-approves) applications, so "remaining" is
+slots - approved_count without counting rows. A place is taken with one
+conditional UPDATE:
+
+    UPDATE internships SET approved_count = approved_count + n
+    WHERE id = ? AND approved_count + n <= slots
+
+which cannot oversubscribe under any concurrency. On PostgreSQL the
+internship row is locked by the UPDATE and a concurrent approver re-checks
+the condition once it gets the row; on SQLite every write runs on the single
+writer. Callers lock application rows first and internship rows afterwards,
+in id order, so concurrent approvals never wait on each other in a cycle.
+"""
+
+
+class NoSlots(Exception):
+    """The internship has fewer places left than the approvals asked for."""
+
+    def __init__(self, internship_id, message="No slots left for this internship"):
+        super().__init__(message)
+        self.internship_id = internship_id
+
+
+REBUILD_QUERY = (
+    "UPDATE internships SET approved_count = ("
+    "SELECT COUNT(*) FROM applications a WHERE a.internship_id = internships.id AND a.status = 'Approved')"
+)
+
+
+def take(cur, placeholder, internship_id, count=1):
+    """Claim `count` places; False (and nothing changed) if they are not all free."""
+    if count <= 0:
+        return True
+    cur.execute(
+        f"UPDATE internships SET approved_count = approved_count + {placeholder} "
+        f"WHERE id = {placeholder} AND approved_count + {placeholder} <= slots",
+        (count, internship_id, count)
+    )
+    return cur.rowcount == 1
+
+def take_up_to(cur, placeholder, internship_id, count, for_update=""):
+    """Claim as many of `count` places as are free; returns how many were claimed."""
+    cur.execute(
+        f"SELECT COALESCE(slots, 0) - approved_count AS remaining FROM internships WHERE id = {placeholder}{for_update}",
+        (internship_id,)
+    )
+    row = cur.fetchone()
+    granted = max(0, min(count, dict(row)["remaining"])) if row else 0
+    if granted and not take(cur, placeholder, internship_id, granted):
+        # Cannot happen with the row locked (or on the SQLite writer); be safe anyway
+        return 0
+    return granted
+
+def release(cur, placeholder, internship_id, count=1):
+    if count > 0:
+        cur.execute(
+            f"UPDATE internships SET approved_count = approved_count - {placeholder} WHERE id = {placeholder}",
+            (count, internship_id)
+        )
+
+def rebuild(cur):
+    """Recount approved_count from the applications table (init_db, repairs)."""
+    cur.execute(REBUILD_QUERY)
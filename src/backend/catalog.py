@@ -0,0 +1,79 @@
+"""
+Pre-serialized response cache for the public internship catalog.
+
+GET /api/internships keeps the encoded JSON body, a gzipped copy and a
+strong ETag in memory, keyed on the catalog version stored in
+cache_versions. create_internship bumps that version in its transaction
+and calls invalidate(), so this process rebuilds on the next read; other
+workers compare versions at most every CATALOG_REVALIDATE seconds. Between
+checks a hit costs neither a query nor JSON encoding.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+CATALOG_REVALIDATE = float(os.environ.get("CATALOG_REVALIDATE", 1))
+
+VERSION_NAME = "catalog"
+
+
+class CachedBody:
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        self.etag = f"v{version}-{digest}"
+        self.gzip_etag = f"{self.etag}-gz"
+        self.checked_at = time.monotonic()
+
+
+_lock = threading.Lock()
+_entry = None
+
+
+def bump(cur, placeholder):
+    """Advance the catalog version inside the caller's transaction."""
+    cur.execute(f"UPDATE cache_versions SET version = version + 1 WHERE name = {placeholder}", (VERSION_NAME,))
+
+def read_version(conn, placeholder):
+    cur = conn.cursor()
+    cur.execute(f"SELECT version FROM cache_versions WHERE name = {placeholder}", (VERSION_NAME,))
+    row = cur.fetchone()
+    cur.close()
+    return int(dict(row)["version"]) if row else 0
+
+def seed(cur, placeholder):
+    """Make sure the version row exists (init_db)."""
+    cur.execute(f"SELECT 1 FROM cache_versions WHERE name = {placeholder}", (VERSION_NAME,))
+    if not cur.fetchone():
+        cur.execute(f"INSERT INTO cache_versions (name, version) VALUES ({placeholder}, 1)", (VERSION_NAME,))
+
+def get(get_conn, placeholder, render):
+    """Current CachedBody, rebuilding it with render(conn) -> bytes when the version moved.
+
+    get_conn is only called when the database has to be consulted.
+    """
+    global _entry
+    entry = _entry
+    if entry is not None and time.monotonic() - entry.checked_at < CATALOG_REVALIDATE:
+        return entry
+
+    conn = get_conn()
+    if conn is None:
+        return None
+    version = read_version(conn, placeholder(conn))
+    with _lock:
+        entry = _entry
+        if entry is not None and entry.version == version:
+            entry.checked_at = time.monotonic()
+            return entry
+        entry = _entry = CachedBody(version, render(conn))
+        return entry
+
+def invalidate():
+    global _entry
+    with _lock:
+        _entry = None
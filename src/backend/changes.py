@@ -0,0 +1,215 @@
+"""
+Change feed behind GET /api/changes and /api/changes/stream.
+
+    python changes.py prune [--keep 100000]     # drop all but the newest changes
+
+Every write the dashboards display (application created, application status
+changed, internship created) records a row in the changes table with the
+writer's cursor, in the same transaction. The row id is the feed version:
+a client loads its list once, then asks for the changes after the last
+version it has applied, or follows them as Server-Sent Events.
+
+On PostgreSQL a SERIAL id is handed out at INSERT but becomes visible at
+COMMIT, so two writers could commit out of order and a reader could skip
+the smaller id. record() therefore takes a transaction-level advisory lock,
+which makes commit order follow id order; SQLite has a single writer anyway.
+Keep record() the last locking statement of a write so the lock is held
+only for the commit.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+import db
+
+CHANGES_PAGE_SIZE = int(os.environ.get("CHANGES_PAGE_SIZE", 500))
+CHANGES_POLL_INTERVAL = float(os.environ.get("CHANGES_POLL_INTERVAL", 1))
+# One SSE response lasts at most this long (it holds a worker thread, see
+# gunicorn.conf.py);
+# EventSource-style clients reconnect with Last-Event-ID and lose nothing.
+CHANGES_STREAM_SECONDS = float(os.environ.get("CHANGES_STREAM_SECONDS", 60))
+CHANGES_HEARTBEAT = float(os.environ.get("CHANGES_HEARTBEAT", 15))
+CHANGES_KEEP = int(os.environ.get("CHANGES_KEEP", 100000))
+
+ADVISORY_LOCK_ID = 7_041_020
+
+
+class FeedGone(Exception):
+    """The requested version has been pruned; the client must reload its lists."""
+
+
+# ------------------ WRITE ------------------
+
+def record_many(cur, placeholder, is_postgres, entries):
+    """Log (entity, entity_id, action, student_id, data) tuples inside the caller's
+    transaction. student_id limits who sees it: None means every user."""
+    if not entries:
+        return
+    if is_postgres:
+        cur.execute(f"SELECT pg_advisory_xact_lock({ADVISORY_LOCK_ID})")
+    cur.executemany(
+        f"INSERT INTO changes (entity, entity_id, action, student_id, data) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})",
+        [(entity, entity_id, action, student_id, json.dumps(data, default=str))
+         for entity, entity_id, action, student_id, data in entries]
+    )
+
+def record(cur, placeholder, is_postgres, entity, entity_id, action, data, student_id=None):
+    record_many(cur, placeholder, is_postgres, [(entity, entity_id, action, student_id, data)])
+
+_changed = threading.Condition()
+_async_waiters = set()   # (loop, asyncio.Event) of the streams served by asgi.py
+
+def notify():
+    """Wake this process's open streams; call after the recording write has committed."""
+    with _changed:
+        _changed.notify_all()
+    for loop, wake in list(_async_waiters):
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass   # that loop has closed
+
+
+# ------------------ READ ------------------
+
+def latest(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS version, COALESCE(MIN(id), 1) AS oldest FROM changes")
+    row = dict(cur.fetchone())
+    cur.close()
+    return row["version"], row["oldest"]
+
+def since(conn, version, student_id=None, limit=CHANGES_PAGE_SIZE):
+    """Up to `limit` changes after `version`, oldest first, as seen by `student_id`
+    (None: an admin, who sees everything). Raises FeedGone if pruned past `version`."""
+    placeholder = db.placeholder(conn)
+    conditions, params = [f"id > {placeholder}"], [version]
+    if student_id is not None:
+        conditions.append(f"(student_id IS NULL OR student_id = {placeholder})")
+        params.append(student_id)
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT id, entity, entity_id, action, data FROM changes WHERE {' AND '.join(conditions)} "
+        f"ORDER BY id LIMIT {placeholder}",
+        (*params, limit)
+    )
+    rows = [dict(row) for row in cur.fetchall()]
+    cur.close()
+    if version and (not rows or rows[0]["id"] > version + 1):
+        # A gap right after `version` is either another user's change or pruning
+        _, oldest = latest(conn)
+        if oldest > version + 1:
+            raise FeedGone(f"Changes up to {oldest - 1} are no longer available")
+    return [
+        {"version": row["id"], "entity": row["entity"], "id": row["entity_id"],
+         "action": row["action"], "data": json.loads(row["data"])}
+        for row in rows
+    ]
+
+def event(change):
+    return f"id: {change['version']}\nevent: change\ndata: {json.dumps(change, default=str)}\n\n"
+
+def stream(version, student_id=None):
+    """Server-Sent Events for every change after `version` (see since()),
+    for at most CHANGES_STREAM_SECONDS. Borrows a pooled connection only
+    while it queries, never while it waits."""
+    deadline = time.monotonic() + CHANGES_STREAM_SECONDS
+    heartbeat = time.monotonic() + CHANGES_HEARTBEAT
+    yield f"retry: {int(CHANGES_POLL_INTERVAL * 1000)}\n\n"
+    while True:
+        try:
+            batch = _poll(version, student_id)
+        except FeedGone as e:
+            yield f"event: reset\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        for change in batch:
+            version = change["version"]
+            yield event(change)
+        if batch:
+            heartbeat = time.monotonic() + CHANGES_HEARTBEAT
+            if len(batch) == CHANGES_PAGE_SIZE:
+                continue
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        if now >= heartbeat:
+            heartbeat = now + CHANGES_HEARTBEAT
+            yield ": keepalive\n\n"
+        # Writes in this process wake us at once; other processes are seen on the next poll
+        with _changed:
+            _changed.wait(min(CHANGES_POLL_INTERVAL, deadline - now))
+
+def _poll(version, student_id):
+    with db.connection() as conn:
+        return since(conn, version, student_id)
+
+async def stream_async(version, student_id=None):
+    """stream() for the ASGI app. Each poll runs on a worker thread just for
+    its query; the waits happen on the event loop, so an open stream holds
+    no thread (and none of the WSGI bridge's)."""
+    deadline = time.monotonic() + CHANGES_STREAM_SECONDS
+    heartbeat = time.monotonic() + CHANGES_HEARTBEAT
+    yield f"retry: {int(CHANGES_POLL_INTERVAL * 1000)}\n\n"
+    waiter = (asyncio.get_running_loop(), asyncio.Event())
+    _async_waiters.add(waiter)
+    try:
+        while True:
+            waiter[1].clear()   # before the poll, so a write committed during it still wakes us
+            try:
+                batch = await asyncio.to_thread(_poll, version, student_id)
+            except FeedGone as e:
+                yield f"event: reset\ndata: {json.dumps({'error': str(e)})}\n\n"
+                return
+            for change in batch:
+                version = change["version"]
+                yield event(change)
+            if batch:
+                heartbeat = time.monotonic() + CHANGES_HEARTBEAT
+                if len(batch) == CHANGES_PAGE_SIZE:
+                    continue
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if now >= heartbeat:
+                heartbeat = now + CHANGES_HEARTBEAT
+                yield ": keepalive\n\n"
+            try:
+                await asyncio.wait_for(waiter[1].wait(), min(CHANGES_POLL_INTERVAL, deadline - now))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _async_waiters.discard(waiter)
+
+
+# ------------------ MAINTENANCE ------------------
+
+def prune(conn, keep=CHANGES_KEEP):
+    """Delete all but the newest `keep` changes; returns the number removed.
+    The newest one always stays, so since() can still tell what was pruned."""
+    placeholder = db.placeholder(conn)
+    version, _ = latest(conn)
+    keep = max(keep, 1)
+
+    def delete(cur):
+        cur.execute(f"DELETE FROM changes WHERE id <= {placeholder}", (version - keep,))
+        return cur.rowcount
+
+    return db.run_write(conn, delete)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change feed maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    prune_parser = sub.add_parser("prune", help="drop all but the newest changes")
+    prune_parser.add_argument("--keep", type=int, default=CHANGES_KEEP)
+    args = parser.parse_args()
+
+    with db.connection() as conn:
+        print(f"Removed {prune(conn, args.keep)} change(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
- Database Setup Script for Student Internship Portal
-
+-- Database Setup Script for Student Internship Portal (MySQL)
+-- Schema generated by: python migrations.py ddl mysql
+-- Edit TABLES / MIGRATIONS in migrations.py, not this file.
 
 CREATE DATABASE IF NOT EXISTS internship_portal;
 USE internship_portal;
 
+-- 1: base tables
 CREATE TABLE IF NOT EXISTS students (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
@@ -31,26 +33,93 @@ CREATE TABLE IF NOT EXISTS internships (
     slots INT DEFAULT 0,
     date_posted TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     admin_id INT,
-    FOREIGN KEY (admin_id) REFERENCES admins(id) ON DELETE SET NULL
+    FOREIGN KEY (admin_id) REFERENCES admins(id)
 );
 
 CREATE TABLE IF NOT EXISTS applications (
     id INT AUTO_INCREMENT PRIMARY KEY,
     student_id INT NOT NULL,
     internship_id INT NOT NULL,
-    cv_file VARCHAR(255),
+    cv_file TEXT,
     cover_letter TEXT,
-    status ENUM('Pending', 'Approved', 'Rejected') DEFAULT 'Pending',
+    status VARCHAR(50) DEFAULT 'Pending',
     applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
-    FOREIGN KEY (internship_id) REFERENCES internships(id) ON DELETE CASCADE,
-    UNIQUE KEY unique_application (student_id, internship_id)
+    FOREIGN KEY (student_id) REFERENCES students(id),
+    FOREIGN KEY (internship_id) REFERENCES internships(id),
+    UNIQUE (student_id, internship_id)
+);
+
+-- 2: stats counters and cache versions
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name VARCHAR(64) PRIMARY KEY,
+    value INT NOT NULL DEFAULT 0
 );
 
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 1
+);
+
+-- 3: application listing indexes
+CREATE INDEX idx_applications_applied ON applications (applied_at, id);
+
+CREATE INDEX idx_applications_status ON applications (status, applied_at, id);
+
+CREATE INDEX idx_applications_internship ON applications (internship_id, applied_at, id);
+
+CREATE INDEX idx_applications_student ON applications (student_id, applied_at, id);
+
+-- 4: accounts view for login
+DROP VIEW IF EXISTS accounts;
+
+CREATE VIEW accounts AS
+        SELECT id, email, password, 'student' AS role, 0 AS precedence FROM students
+        UNION ALL
+        SELECT id, email, password, 'admin' AS role, 1 AS precedence FROM admins;
+
+-- 5: internship search index
+-- 6: internship catalog and admin indexes
+CREATE INDEX idx_internships_posted ON internships (date_posted, id);
+
+CREATE INDEX idx_internships_admin ON internships (admin_id);
+
+-- 7: background jobs and CV scan status
+CREATE TABLE IF NOT EXISTS jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    kind VARCHAR(64) NOT NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    run_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    started_at TIMESTAMP,
+    last_error TEXT
+);
+
+CREATE INDEX idx_jobs_ready ON jobs (status, run_at, id);
+
+ALTER TABLE applications ADD COLUMN cv_status VARCHAR(20);
+
+-- 8: change feed
+CREATE TABLE IF NOT EXISTS changes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    entity VARCHAR(32) NOT NULL,
+    entity_id INT NOT NULL,
+    action VARCHAR(32) NOT NULL,
+    student_id INT,
+    data TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 9: internship approved counts
+ALTER TABLE internships ADD COLUMN approved_count INT NOT NULL DEFAULT 0;
+
+UPDATE internships SET approved_count = (SELECT COUNT(*) FROM applications a WHERE a.internship_id = internships.id AND a.status = 'Approved');
+
+-- Sample data
 INSERT INTO internships (title, company, description, duration, slots, admin_id) 
 VALUES 
     ('Software Development Intern', 'Tech Corp', 'Join our team as a software development intern. Work on real projects and gain valuable experience.', '3 months', 5, 1),
     ('Marketing Intern', 'Marketing Solutions', 'Help us create and execute marketing campaigns for our clients.', '2 months', 3, 1),
     ('Data Science Intern', 'Data Analytics Inc', 'Work with big data and machine learning projects.', '4 months', 4, 1)
 ON DUPLICATE KEY UPDATE title=title;
-
@@ -0,0 +1,503 @@
+"""
+Database connection handling for the internship portal.
+
+PostgreSQL (DATABASE_URL set) uses a bounded, thread-safe connection pool;
+psycopg2 is only imported in that case. SQLite reuses one connection per
+thread. Either way a request checks out at most one connection, stored on
+flask.g, and gives it back in the app-context teardown.
+
+SQLite connections run in WAL mode with the SQLITE_* pragmas below, so
+readers never wait for writers. Writes go through run_write(): on SQLite
+they are queued to one writer thread per process, which commits whatever
+has queued up as a single transaction (group commit) instead of every
+request fighting for the write lock.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+from flask import g
+
+import metrics
+
+SQLITE_PATH = os.environ.get(
+    "SQLITE_PATH", os.path.join(os.path.dirname(__file__), 'internship_portal.db')
+)
+
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))
+STREAM_BATCH_SIZE = int(os.environ.get("DB_STREAM_BATCH_SIZE", 500))
+
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 5))
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64000)),   # negative: KiB
+    "temp_store": "MEMORY",
+}
+SQLITE_WRITER = os.environ.get("SQLITE_WRITER", "1") == "1"
+SQLITE_WRITE_BATCH = int(os.environ.get("SQLITE_WRITE_BATCH", 64))
+SQLITE_WRITE_TIMEOUT = float(os.environ.get("SQLITE_WRITE_TIMEOUT", 10))
+# Recent wait (pool checkout, SQLite writer queue) is a moving average that
+# halves every DB_WAIT_HALFLIFE seconds without new samples
+DB_WAIT_HALFLIFE = float(os.environ.get("DB_WAIT_HALFLIFE", 2))
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within DB_POOL_TIMEOUT."""
+
+
+class WriteTimeout(Exception):
+    """A write waited SQLITE_WRITE_TIMEOUT for the writer and was withdrawn without running."""
+
+
+# ------------------ HELPERS ------------------
+
+def is_postgres(conn):
+    return not isinstance(conn, sqlite3.Connection)
+
+def placeholder(conn):
+    return "%s" if is_postgres(conn) else "?"
+
+def get_db_connection():
+    """Open a new, unpooled connection (schema setup, scripts)."""
+    database_url = os.environ.get('DATABASE_URL')
+
+    if database_url:
+        # Use PostgreSQL (Railway/Production)
+        try:
+            import psycopg2
+            return psycopg2.connect(database_url, cursor_factory=metrics.postgres_cursor())
+        except Exception as e:
+            print("PostgreSQL Connection Error:", e)
+            return None
+    else:
+        # Use SQLite (Local Development)
+        try:
+            return connect_sqlite()
+        except Exception as e:
+            print("SQLite Connection Error:", e)
+            return None
+
+def sqlite_pragmas():
+    statements = [f"PRAGMA {name} = {value}" for name, value in SQLITE_PRAGMAS.items()]
+    return statements + [f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT * 1000)}"]
+
+def connect_sqlite(path=None):
+    conn = sqlite3.connect(path or SQLITE_PATH, timeout=SQLITE_BUSY_TIMEOUT, factory=metrics.SQLiteConnection)
+    conn.row_factory = sqlite3.Row
+    for pragma in sqlite_pragmas():
+        conn.execute(pragma)
+    return conn
+
+def begin_write(conn):
+    """Open a write transaction now. SQLite takes its write lock up front so
+    rows read inside the transaction cannot change before the UPDATE."""
+    if not is_postgres(conn) and not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+def for_update(conn):
+    """Row-locking suffix for SELECTs inside a write transaction (PostgreSQL only)."""
+    return " FOR UPDATE" if is_postgres(conn) else ""
+
+def iter_rows(conn, query, params=(), batch_size=STREAM_BATCH_SIZE):
+    """Run query now and return a generator over its rows.
+
+    Nothing is materialised: PostgreSQL uses a named (server-side) cursor
+    fetched batch_size rows at a time, SQLite steps its cursor lazily.
+    """
+    if is_postgres(conn):
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cur.itersize = batch_size
+    else:
+        cur = conn.cursor()
+        cur.arraysize = batch_size
+    cur.execute(query, params)
+
+    def rows():
+        try:
+            for row in cur:
+                yield row
+        finally:
+            cur.close()
+    return rows()
+
+
+# ------------------ POOLS ------------------
+
+class RecentWait:
+    """Moving average of wait times that decays toward zero while idle, so
+    load shedding based on it stops on its own once requests stop waiting."""
+
+    ALPHA = 0.3
+
+    def __init__(self, halflife=DB_WAIT_HALFLIFE):
+        self.halflife = halflife
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._at = time.monotonic()
+
+    def _decayed(self, now):
+        return self._value * 0.5 ** ((now - self._at) / self.halflife)
+
+    def add(self, seconds):
+        now = time.monotonic()
+        with self._lock:
+            value = self._decayed(now)
+            self._value = value + (seconds - value) * self.ALPHA
+            self._at = now
+
+    def value(self):
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+class PoolStats:
+    """Counters shared by both pool kinds; read them through snapshot()."""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self.size = size
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_wait = RecentWait()
+
+    def checked_out(self, waited):
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        self.recent_wait.add(waited)
+
+    def checked_in(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_recent_ms": round(self.recent_wait.value() * 1000, 3),
+            }
+
+
+class PostgresPool:
+    """ThreadedConnectionPool that blocks (up to a timeout) instead of raising when empty."""
+
+    kind = "postgresql"
+
+    def __init__(self, dsn, minconn=POOL_MIN, maxconn=POOL_MAX, timeout=POOL_TIMEOUT):
+        from psycopg2.pool import ThreadedConnectionPool
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn, cursor_factory=metrics.postgres_cursor())
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+        self.stats = PoolStats(maxconn)
+
+    def acquire(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            self.stats.timed_out()
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        self.stats.checked_out(time.perf_counter() - start)
+        return conn
+
+    def release(self, conn):
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+        self._pool.putconn(conn, close=broken)
+        self._slots.release()
+        self.stats.checked_in()
+
+    def close(self):
+        self._pool.closeall()
+
+
+class SQLitePool:
+    """One long-lived SQLite connection per thread."""
+
+    kind = "sqlite"
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+        self.stats = PoolStats(0)
+
+    def _connect(self):
+        conn = connect_sqlite(self.path)
+        with self._lock:
+            self._all.append(conn)
+            self.stats.size = len(self._all)
+        return conn
+
+    def acquire(self):
+        start = time.perf_counter()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        self.stats.checked_out(time.perf_counter() - start)
+        return conn
+
+    def release(self, conn):
+        # Never leak a half-finished transaction into the next request on this thread
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            self._local.conn = None
+        self.stats.checked_in()
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all = []
+            self.stats.size = 0
+        self._local = threading.local()
+
+
+class SQLiteWriter:
+    """The one thread (per process) that writes to SQLite.
+
+    Jobs are functions taking a cursor. Each runs inside its own SAVEPOINT, so
+    a failing job is rolled back alone, and every job that queued up while the
+    previous batch was committing is committed together (up to `batch` jobs).
+    Callers block until their batch is durable and get the job's return value
+    (or exception) back. A job still queued after `timeout` is cancelled and
+    WriteTimeout raised, so a caller told "failed" never sees it commit later.
+    """
+
+    def __init__(self, path=None, batch=SQLITE_WRITE_BATCH, timeout=SQLITE_WRITE_TIMEOUT):
+        self.path, self.batch, self.timeout = path or SQLITE_PATH, batch, timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.timed_out = 0
+        self.recent_wait = RecentWait()
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn):
+        future = Future()
+        self._queue.put((fn, future, time.monotonic()))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Not started yet: withdraw it (_commit skips cancelled jobs).
+            # Already running: its real outcome is only a batch away.
+            if future.cancel():
+                with self._lock:
+                    self.timed_out += 1
+                raise WriteTimeout(f"Write not started after {self.timeout}s")
+            return future.result()
+
+    def _run(self):
+        conn = connect_sqlite(self.path)
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                jobs = [job]
+                while len(jobs) < self.batch:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        self._commit(conn, jobs)
+                        return
+                    jobs.append(job)
+                self._commit(conn, jobs)
+        finally:
+            conn.close()
+
+    def _commit(self, conn, jobs):
+        outcomes = []
+        ran = 0
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            for fn, future, queued_at in jobs:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                ran += 1
+                self.recent_wait.add(time.monotonic() - queued_at)
+                cur.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((future, fn(cur), None))
+                    cur.execute("RELEASE job")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO job")
+                    cur.execute("RELEASE job")
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for _, future, _ in jobs:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            cur.close()
+
+        with self._lock:
+            self.jobs += ran
+            self.batches += 1
+            self.max_batch = max(self.max_batch, ran)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "jobs": self.jobs,
+                "batches": self.batches,
+                "max_batch": self.max_batch,
+                "timed_out": self.timed_out,
+                "wait_recent_ms": round(self.recent_wait.value() * 1000, 3),
+            }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_writer = None
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                database_url = os.environ.get('DATABASE_URL')
+                _pool = PostgresPool(database_url) if database_url else SQLitePool()
+    return _pool
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _pool_lock:
+            if _writer is None:
+                _writer = SQLiteWriter()
+    return _writer
+
+def reset_pool():
+    """Close every pooled connection and the writer; the next use starts fresh."""
+    global _pool, _writer
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        if _writer is not None:
+            _writer.close()
+        _pool = _writer = None
+
+def writer_stats():
+    return _writer.snapshot() if _writer is not None else {}
+
+def recent_wait():
+    """Seconds requests have recently waited for the database: pool checkout,
+    or on SQLite the writer queue (its per-thread pool never waits)."""
+    wait = _pool.stats.recent_wait.value() if _pool is not None else 0.0
+    if _writer is not None:
+        wait = max(wait, _writer.recent_wait.value())
+    return wait
+
+def run_write(conn, fn):
+    """Run fn(cursor) as one committed transaction and return its result.
+
+    fn must not commit or roll back. On SQLite (unless SQLITE_WRITER=0) it
+    runs on the writer thread, batched with other writes; on PostgreSQL it
+    runs on `conn`, the request's connection.
+    """
+    if SQLITE_WRITER and not is_postgres(conn):
+        return get_writer().submit(fn)
+    begin_write(conn)
+    cur = conn.cursor()
+    try:
+        result = fn(cur)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def pool_stats():
+    pool = get_pool()
+    return {"backend": pool.kind, **pool.stats.snapshot()}
+
+
+# ------------------ REQUEST SCOPE ------------------
+
+def get_db():
+    """Connection for the current request; checked out once, released on teardown."""
+    if "db_conn" not in g:
+        start = time.perf_counter()
+        try:
+            g.db_conn = get_pool().acquire()
+        except Exception as e:
+            print("Database Pool Error:", e)
+            return None
+        metrics.observe_connect(time.perf_counter() - start)
+    return g.db_conn
+
+@contextmanager
+def connection():
+    """A pooled connection outside of any request (background threads, scripts)."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+def close_db(exc=None):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        get_pool().release(conn)
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
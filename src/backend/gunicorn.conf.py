@@ -0,0 +1,36 @@
+"""
+gunicorn settings for the WSGI app.
+
+    gunicorn --chdir src/backend -c src/backend/gunicorn.conf.py "app:create_app()"
+
+The app is imported and built once in the master (preload_app), so workers
+fork with the code already loaded and share those pages copy-on-write. The
+schema migration runs there too, once, before any worker starts. Nothing
+opens a pooled database connection before the fork, and the password
+executor init_db may start (to hash the default admin) is shut down again.
+
+Workers are threaded (gthread): every open dashboard holds a request on
+/api/changes/stream for up to CHANGES_STREAM_SECONDS, which would block a
+sync worker outright. GUNICORN_THREADS bounds how many requests, streams
+included, one worker runs at once; WEB_CONCURRENCY sets the worker count.
+The timeout stays above the stream length so a quiet stream is never
+mistaken for a hung worker.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+preload_app = True
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+timeout = int(float(os.environ.get("CHANGES_STREAM_SECONDS", 60))) + 30
+graceful_timeout = 30
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    from app import init_db
+    import passwords
+    init_db()
+    passwords.shutdown()
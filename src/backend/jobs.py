@@ -0,0 +1,383 @@
+"""
+Background jobs for work that does not have to finish before the response.
+
+    python jobs.py status           # queue depth and failed jobs
+    python jobs.py work             # run workers in the foreground (JOB_WORKERS=0 deployments)
+    python jobs.py retry            # requeue every failed job
+
+Jobs live in the jobs table. enqueue() inserts them with the caller's cursor,
+inside the same write as the row they belong to, so a job exists exactly
+when that row is durable and the request can return right after its commit.
+JOB_WORKERS threads per process claim due jobs one at a time (FOR UPDATE
+SKIP LOCKED on PostgreSQL, the single writer on SQLite), run the handler
+registered for the job's kind inside an app context, and delete the job on
+success. Failures are retried with exponential backoff up to
+JOB_MAX_ATTEMPTS, then kept as 'failed' for inspection. Jobs left 'running'
+by a dead process are requeued after JOB_TIMEOUT seconds.
+"""
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+from flask import current_app
+
+import db
+import metrics
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 2))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_DELAY = float(os.environ.get("JOB_RETRY_DELAY", 5))
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", 300))
+
+# Optional external scanner, e.g. "clamdscan --no-summary"; gets the file path
+# appended and must exit 0 (clean) or 1 (infected), like clamscan.
+CV_SCAN_COMMAND = os.environ.get("CV_SCAN_COMMAND", "")
+CV_SCAN_TIMEOUT = float(os.environ.get("CV_SCAN_TIMEOUT", 60))
+NOTIFY_WEBHOOK_URLS = [url for url in os.environ.get("NOTIFY_WEBHOOK_URLS", "").split(",") if url]
+NOTIFY_TIMEOUT = float(os.environ.get("NOTIFY_TIMEOUT", 5))
+
+QUEUE_LATENCY = metrics.register(metrics.Histogram(
+    "job_queue_latency_seconds", "Time from enqueue to a worker starting the job", ("kind",)))
+RUN_SECONDS = metrics.register(metrics.Histogram(
+    "job_run_seconds", "Job handler run time", ("kind", "outcome")))
+FINISHED = metrics.register(metrics.Counter(
+    "jobs_total", "Jobs finished by outcome (done, retry, failed)", ("kind", "outcome")))
+
+
+# ------------------ HANDLERS ------------------
+
+HANDLERS = {}
+
+def handler(kind):
+    """Register fn(payload) as the handler for jobs of `kind`."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# Leading bytes every genuine file of each allowed CV type starts with
+CV_SIGNATURES = {
+    "pdf": b"%PDF-",
+    "doc": b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",   # OLE2 compound document
+    "docx": b"PK\x03\x04",                         # zip container
+}
+
+def scan_file(path):
+    """'clean' or 'rejected'; raises if the scanner itself could not run (retried)."""
+    extension = path.rsplit(".", 1)[-1].lower()
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if not head.startswith(CV_SIGNATURES.get(extension, b"")):
+        return "rejected"
+    if CV_SCAN_COMMAND:
+        result = subprocess.run(
+            shlex.split(CV_SCAN_COMMAND) + [path], capture_output=True, timeout=CV_SCAN_TIMEOUT
+        )
+        if result.returncode not in (0, 1):
+            raise RuntimeError(f"CV scanner exited with {result.returncode}: {result.stderr[:200]!r}")
+        return "clean" if result.returncode == 0 else "rejected"
+    return "clean"
+
+@handler("cv.scan")
+def scan_cv(payload):
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], payload["cv_file"])
+    # A file that is gone will not come back by retrying
+    status = scan_file(path) if os.path.exists(path) else "missing"
+    with db.connection() as conn:
+        placeholder = db.placeholder(conn)
+        db.run_write(conn, lambda cur: cur.execute(
+            f"UPDATE applications SET cv_status = {placeholder} WHERE id = {placeholder}",
+            (status, payload["application_id"])
+        ))
+
+@handler("notify.status")
+def notify_status(payload):
+    """Fan a status change out as one notify.webhook job per configured URL,
+    so a slow or failing receiver is retried on its own."""
+    with db.connection() as conn:
+        placeholder = db.placeholder(conn)
+        cur = conn.cursor()
+        cur.execute(
+            f"""SELECT a.id, a.status, s.email, s.name, i.title, i.company
+                FROM applications a
+                JOIN students s ON a.student_id = s.id
+                JOIN internships i ON a.internship_id = i.id
+                WHERE a.id = {placeholder}""",
+            (payload["application_id"],)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return
+        message = {"event": "application.status", **dict(row)}
+        if not NOTIFY_WEBHOOK_URLS:
+            print(f"Application {message['id']} for {message['email']} is now {message['status']}")
+            return
+        db.run_write(conn, lambda cur: enqueue_many(
+            cur, placeholder, "notify.webhook", [{"url": url, "message": message} for url in NOTIFY_WEBHOOK_URLS]
+        ))
+    wake()
+
+@handler("notify.webhook")
+def post_webhook(payload):
+    body = json.dumps(payload["message"], default=str).encode()
+    req = urllib.request.Request(
+        payload["url"], data=body, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(req, timeout=NOTIFY_TIMEOUT):
+        pass
+
+
+# ------------------ QUEUE ------------------
+
+def _timestamp(seconds):
+    # Fixed-width UTC text: compares correctly as a string on SQLite and parses on PostgreSQL
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def _epoch(value):
+    if isinstance(value, str):
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if "." in value else "%Y-%m-%d %H:%M:%S"
+        value = datetime.strptime(value, fmt)
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def enqueue_many(cur, placeholder, kind, payloads, delay=0):
+    """Queue one `kind` job per payload inside the caller's transaction.
+    Call wake() after the commit so idle workers pick them up at once."""
+    now = time.time()
+    cur.executemany(
+        f"INSERT INTO jobs (kind, payload, run_at, created_at) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})",
+        [(kind, json.dumps(payload), _timestamp(now + delay), _timestamp(now)) for payload in payloads]
+    )
+
+def enqueue(cur, placeholder, kind, payload, delay=0):
+    enqueue_many(cur, placeholder, kind, [payload], delay)
+
+def claim(conn):
+    """Mark the oldest due job running and return it, or None if nothing is due."""
+    placeholder = db.placeholder(conn)
+    skip_locked = " FOR UPDATE SKIP LOCKED" if db.is_postgres(conn) else ""
+    now = _timestamp(time.time())
+
+    # Peek with a plain read first so an idle queue never costs a write transaction
+    cur = conn.cursor()
+    cur.execute(f"SELECT 1 FROM jobs WHERE status = 'queued' AND run_at <= {placeholder} LIMIT 1", (now,))
+    due = cur.fetchone() is not None
+    cur.close()
+    if not due:
+        return None
+
+    def take(cur):
+        cur.execute(
+            f"""UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = {placeholder}
+                WHERE id = (
+                    SELECT id FROM jobs WHERE status = 'queued' AND run_at <= {placeholder}
+                    ORDER BY run_at, id LIMIT 1{skip_locked}
+                )
+                RETURNING id, kind, payload, attempts, created_at""",
+            (now, now)
+        )
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+    return db.run_write(conn, take)
+
+def finish(conn, job, error=None):
+    """Delete a finished job, or schedule its retry, or park it as failed."""
+    placeholder = db.placeholder(conn)
+    if error is None:
+        db.run_write(conn, lambda cur: cur.execute(f"DELETE FROM jobs WHERE id = {placeholder}", (job["id"],)))
+        return "done"
+    outcome = "retry" if job["attempts"] < JOB_MAX_ATTEMPTS else "failed"
+    run_at = _timestamp(time.time() + JOB_RETRY_DELAY * 2 ** (job["attempts"] - 1))
+    db.run_write(conn, lambda cur: cur.execute(
+        f"UPDATE jobs SET status = {placeholder}, run_at = {placeholder}, last_error = {placeholder} WHERE id = {placeholder}",
+        ("queued" if outcome == "retry" else "failed", run_at, f"{type(error).__name__}: {error}"[:2000], job["id"])
+    ))
+    return outcome
+
+def requeue_stale(conn):
+    """Give jobs whose worker died (still 'running' after JOB_TIMEOUT) back to the queue."""
+    placeholder = db.placeholder(conn)
+    cutoff = _timestamp(time.time() - JOB_TIMEOUT)
+    db.run_write(conn, lambda cur: cur.execute(
+        f"UPDATE jobs SET status = 'queued' WHERE status = 'running' AND started_at < {placeholder}", (cutoff,)
+    ))
+
+def run_one(app):
+    """Claim and run one due job; False if there was none."""
+    with db.connection() as conn:
+        job = claim(conn)
+    if job is None:
+        return False
+
+    kind = job["kind"]
+    QUEUE_LATENCY.observe(max(0.0, time.time() - _epoch(job["created_at"])), kind=kind)
+    start = time.perf_counter()
+    error = None
+    try:
+        fn = HANDLERS.get(kind)
+        if fn is None:
+            raise LookupError(f"No handler for job kind {kind!r}")
+        with app.app_context():
+            fn(json.loads(job["payload"]))
+    except Exception as e:
+        error = e
+        print(f"Job {job['id']} ({kind}) failed:", e)
+
+    with db.connection() as conn:
+        outcome = finish(conn, job, error)
+    RUN_SECONDS.observe(time.perf_counter() - start, kind=kind, outcome=outcome)
+    FINISHED.inc(kind=kind, outcome=outcome)
+    return True
+
+def run_pending(app):
+    """Run due jobs on the calling thread until none are left; returns how many ran."""
+    count = 0
+    while run_one(app):
+        count += 1
+    return count
+
+def depth():
+    """Jobs per status, plus the age of the oldest queued one in seconds."""
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT status, COUNT(*) AS jobs, MIN(created_at) AS oldest FROM jobs GROUP BY status")
+        rows = [dict(row) for row in cur.fetchall()]
+        cur.close()
+    counts = {status: 0 for status in ("queued", "running", "failed")}
+    counts.update({row["status"]: row["jobs"] for row in rows})
+    oldest = [row["oldest"] for row in rows if row["status"] == "queued" and row["oldest"]]
+    counts["oldest_queued_seconds"] = round(time.time() - _epoch(oldest[0]), 3) if oldest else 0
+    return counts
+
+def retry_failed(conn):
+    placeholder = db.placeholder(conn)
+
+    def requeue(cur):
+        cur.execute(
+            f"UPDATE jobs SET status = 'queued', attempts = 0, run_at = {placeholder} WHERE status = 'failed'",
+            (_timestamp(time.time()),)
+        )
+        return cur.rowcount
+
+    return db.run_write(conn, requeue)
+
+
+# ------------------ WORKERS ------------------
+
+class Workers:
+    """JOB_WORKERS daemon threads polling the queue, woken early by wake()."""
+
+    def __init__(self, app, count=JOB_WORKERS):
+        self.app, self.count = app, count
+        self.pid = os.getpid()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._requeued_at = 0.0
+
+    def start(self):
+        for i in range(self.count):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _loop(self):
+        while True:
+            try:
+                if run_one(self.app):
+                    continue
+                if time.time() - self._requeued_at > JOB_TIMEOUT / 2:
+                    self._requeued_at = time.time()
+                    with db.connection() as conn:
+                        requeue_stale(conn)
+            except Exception as e:
+                print("Job worker error:", e)
+            self._wakeup.wait(JOB_POLL_INTERVAL)
+            self._wakeup.clear()
+
+    def wake(self):
+        self._wakeup.set()
+
+
+_workers = None
+_workers_lock = threading.Lock()
+
+def ensure_workers(app):
+    """Start this process's workers once. Checked per request rather than in
+    create_app() so threads are started after gunicorn forks, not in the master."""
+    global _workers
+    if JOB_WORKERS <= 0 or (_workers is not None and _workers.pid == os.getpid()):
+        return
+    with _workers_lock:
+        if _workers is None or _workers.pid != os.getpid():
+            workers = Workers(app)
+            workers.start()
+            _workers = workers
+
+def wake():
+    if _workers is not None and _workers.pid == os.getpid():
+        _workers.wake()
+
+def wait_idle(timeout=10):
+    """Block until no job is running or due (retries waiting out their backoff
+    do not count); False on timeout."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with db.connection() as conn:
+            placeholder = db.placeholder(conn)
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT COUNT(*) AS jobs FROM jobs WHERE status = 'running' OR (status = 'queued' AND run_at <= {placeholder})",
+                (_timestamp(time.time()),)
+            )
+            busy = dict(cur.fetchone())["jobs"]
+            cur.close()
+        if not busy:
+            return True
+        wake()
+        time.sleep(0.05)
+    return False
+
+def init_app(app):
+    app.before_request(lambda: ensure_workers(app))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background jobs for the internship portal")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="queue depth and failed jobs")
+    sub.add_parser("work", help="run JOB_WORKERS workers in the foreground")
+    sub.add_parser("retry", help="requeue every failed job")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(depth(), indent=2))
+        with db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, kind, attempts, last_error FROM jobs WHERE status = 'failed' ORDER BY id")
+            for row in map(dict, cur.fetchall()):
+                print(f"failed {row['id']:>6}  {row['kind']:<16} attempts={row['attempts']}  {row['last_error']}")
+    elif args.command == "retry":
+        with db.connection() as conn:
+            print(f"Requeued {retry_failed(conn)} job(s)")
+    else:
+        from app import create_app
+        workers = Workers(create_app(), max(JOB_WORKERS, 1))
+        workers.start()
+        print(f"Running {workers.count} job worker(s); Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
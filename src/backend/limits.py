@@ -0,0 +1,264 @@
+"""
+Rate limiting and load shedding for the expensive public endpoints.
+
+Login hashes a password, apply moves an upload and queues a write, and
+registration does both; a deadline burst of them can tie up every sync
+worker. Before such a request is parsed:
+
+1. Admission control. If SHED_MAX_IN_FLIGHT requests are already running
+   in this process, or requests have recently waited longer than
+   SHED_DB_WAIT_MS for the database (pool checkout, or the SQLite writer
+   queue; see db.recent_wait), answer 503 with Retry-After at once.
+2. Token buckets. Each rule in RULES names a key (the client IP, or the
+   identity: login email or JWT user) and a rate "N/S": bursts of up to N,
+   refilled at N per S seconds. An empty bucket answers 429 with
+   Retry-After set to when the next token arrives.
+
+Buckets live in this process (RATE_LIMIT_BACKEND=memory) or in a small
+SQLite file shared by every worker on the host (RATE_LIMIT_BACKEND=sqlite,
+RATE_LIMIT_SQLITE_PATH), where each take is one UPSERT. That file is not
+the application database, so limiter traffic never queues behind the
+single writer. RATE_LIMIT_ENABLED=0 and SHED_MAX_IN_FLIGHT=0 /
+SHED_DB_WAIT_MS=0 turn the two halves off.
+
+The client IP is REMOTE_ADDR; behind a reverse proxy wrap the app in
+werkzeug's ProxyFix so that is the real client.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import g, jsonify, request
+
+import db
+import metrics
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.environ.get("RATE_LIMIT_SQLITE_PATH", db.SQLITE_PATH + ".limits")
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", 100000))
+
+SHED_MAX_IN_FLIGHT = int(os.environ.get("SHED_MAX_IN_FLIGHT", 0))
+SHED_DB_WAIT_MS = float(os.environ.get("SHED_DB_WAIT_MS", 0))
+SHED_RETRY_AFTER = int(os.environ.get("SHED_RETRY_AFTER", 1))
+
+
+def parse_rate(text):
+    """"10/60" -> (10 tokens, refilled over 60 seconds)"""
+    count, _, seconds = text.partition("/")
+    return int(count), float(seconds or 1)
+
+
+class Rule:
+    def __init__(self, key, rate):
+        self.key = key
+        self.capacity, self.period = parse_rate(rate)
+
+    @property
+    def per_second(self):
+        return self.capacity / self.period
+
+
+# endpoint -> rules; an identity rule is skipped when the request carries none
+RULES = {
+    "portal.login": [
+        # Per IP is generous: a campus or office shares one address
+        Rule("ip", os.environ.get("RATE_LIMIT_LOGIN_IP", "300/60")),
+        Rule("identity", os.environ.get("RATE_LIMIT_LOGIN_IDENTITY", "10/60")),
+    ],
+    "portal.apply_for_internship": [
+        Rule("ip", os.environ.get("RATE_LIMIT_APPLY_IP", "300/60")),
+        Rule("identity", os.environ.get("RATE_LIMIT_APPLY_IDENTITY", "10/60")),
+    ],
+    "portal.register_student": [
+        Rule("ip", os.environ.get("RATE_LIMIT_REGISTER_IP", "30/60")),
+    ],
+}
+
+def longest_period():
+    # A bucket idle this long is full again, so forgetting it changes nothing
+    return max(rule.period for rules in RULES.values() for rule in rules)
+
+LIMITED = metrics.register(metrics.Counter(
+    "requests_limited_total", "Requests turned away before running (rate_limited, shed_in_flight, shed_db_wait)",
+    ("endpoint", "reason")))
+
+
+# ------------------ BACKENDS ------------------
+
+class MemoryBuckets:
+    """Token buckets in a dict; per process."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}   # key -> (tokens, updated)
+
+    def take(self, key, rule, cost=1):
+        """0 if allowed, else seconds until `cost` tokens are available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rule.capacity, now))
+            tokens = min(rule.capacity, tokens + (now - updated) * rule.per_second)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                if len(self._buckets) > self.max_keys:
+                    self._prune(now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / rule.per_second
+
+    def _prune(self, now):
+        longest = longest_period()
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < longest}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file shared by the workers of one host."""
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+    # Refill, then take `cost` only if enough is left; no row comes back when it is not
+    TAKE = """
+        INSERT INTO buckets (key, tokens, updated) VALUES (:key, :capacity - :cost, :now)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = MIN(:capacity, tokens + (:now - updated) * :rate) - :cost,
+            updated = :now
+        WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= :cost
+        RETURNING tokens
+    """
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path=RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=db.SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")   # losing a few buckets in a crash is harmless
+            conn.execute(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rule, cost=1):
+        conn = self._conn()
+        # Wall clock, not monotonic: every worker process has to agree on it
+        now = time.time()
+        params = {"key": key, "capacity": rule.capacity, "cost": cost, "now": now, "rate": rule.per_second}
+        if conn.execute(self.TAKE, params).fetchone() is not None:
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - longest_period(),))
+            return 0
+        row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        tokens = min(rule.capacity, row[0] + (now - row[1]) * rule.per_second) if row else 0
+        return max((cost - tokens) / rule.per_second, 0.001)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM buckets")
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+def get_buckets():
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                _buckets = SQLiteBuckets() if RATE_LIMIT_BACKEND == "sqlite" else MemoryBuckets()
+    return _buckets
+
+
+# ------------------ CHECKS ------------------
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+def shed_reason():
+    """Why a new expensive request should be turned away right now, or None."""
+    if SHED_MAX_IN_FLIGHT and _in_flight > SHED_MAX_IN_FLIGHT:
+        return "shed_in_flight"
+    if SHED_DB_WAIT_MS and db.recent_wait() * 1000 > SHED_DB_WAIT_MS:
+        return "shed_db_wait"
+    return None
+
+def check(endpoint, ip, identity=None):
+    """None if the request may run, else (status, error, retry_after seconds)."""
+    rules = RULES.get(endpoint)
+    if not rules:
+        return None
+    reason = shed_reason()
+    if reason:
+        LIMITED.inc(endpoint=endpoint, reason=reason)
+        return 503, "Server busy, please retry", SHED_RETRY_AFTER
+    if not RATE_LIMIT_ENABLED:
+        return None
+    buckets = get_buckets()
+    for rule in rules:
+        value = ip if rule.key == "ip" else identity
+        if value is None:
+            continue
+        wait = buckets.take(f"{endpoint}:{rule.key}:{value}", rule)
+        if wait:
+            LIMITED.inc(endpoint=endpoint, reason="rate_limited")
+            return 429, "Too many requests, please retry later", max(1, math.ceil(wait))
+    return None
+
+def limited_response(status, error, retry_after):
+    response = jsonify({"error": error})
+    response.headers["Retry-After"] = str(retry_after)
+    return response, status
+
+
+# ------------------ FLASK ------------------
+
+def login_identity(email):
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+def request_identity():
+    """Login email or "role:id" from the JWT, read without parsing a form or upload."""
+    if request.endpoint == "portal.login":
+        data = request.get_json(silent=True)
+        return login_identity(data.get("email")) if isinstance(data, dict) else None
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        user = json.loads(identity) if identity else None
+        return f"{user['role']}:{user['id']}" if user else None
+    except Exception:
+        return None   # the route's own decorator reports the bad token
+
+def _before():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    g.limits_counted = True
+    if request.endpoint not in RULES:
+        return None
+    limited = check(request.endpoint, request.remote_addr, request_identity())
+    return limited_response(*limited) if limited else None
+
+def _teardown(exc=None):
+    global _in_flight
+    if g.pop("limits_counted", False):
+        with _in_flight_lock:
+            _in_flight -= 1
+
+def snapshot():
+    return {"in_flight": _in_flight, "db_wait_recent_ms": round(db.recent_wait() * 1000, 3)}
+
+def init_app(app):
+    app.before_request(_before)
+    app.teardown_request(_teardown)
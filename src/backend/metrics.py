@@ -0,0 +1,325 @@
+"""
+Request instrumentation and a Prometheus-style /metrics endpoint.
+
+Recorded per request: latency by route, time spent getting a database
+connection, each query's execution time and row count (through the
+instrumented cursor classes that db.py connects with), and JSON encoding
+time. Setting PROFILE_SAMPLE_RATE (e.g. 0.01) runs that fraction of
+requests under cProfile and keeps .prof dumps of the PROFILE_KEEP slowest
+ones in PROFILE_DIR.
+
+/metrics is not public: it answers scrapers that send
+"Authorization: Bearer $METRICS_TOKEN", and without a token configured
+only clients on the same host (loopback).
+"""
+import cProfile
+import heapq
+import hmac
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+from flask import Response, g, has_request_context, jsonify, request
+
+import serialize
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 10))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+LOOPBACK = ("127.0.0.1", "::1")
+
+
+# ------------------ REGISTRY ------------------
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"'.replace("\n", " ") for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_label_text(names, key + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_label_text(names, key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value(s) read from a callback at scrape time: a number or {label_value: number}."""
+
+    def __init__(self, name, help, read, label=None):
+        self.name, self.help, self.read, self.label = name, help, read, label
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.read()
+        except Exception:
+            return lines
+        if isinstance(value, dict):
+            for key, v in sorted(value.items()):
+                lines.append(f"{self.name}{_label_text((self.label,), (key,))} {v}")
+        else:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = register(Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status")))
+DB_CONNECT_SECONDS = register(Histogram(
+    "db_connect_seconds", "Time to check out a database connection"))
+DB_QUERY_SECONDS = register(Histogram(
+    "db_query_duration_seconds", "Query execution time", ("endpoint", "statement")))
+DB_QUERY_ROWS = register(Histogram(
+    "db_query_rows", "Rows fetched (or affected) per query", ("endpoint", "statement"), buckets=ROW_BUCKETS))
+JSON_SECONDS = register(Histogram(
+    "json_serialize_seconds", "Time spent encoding JSON responses", ("endpoint",)))
+PROFILED = register(Counter(
+    "profiled_requests_total", "Requests run under cProfile", ("route",)))
+
+
+def _endpoint():
+    if has_request_context():
+        # "portal.login" -> "login": every route lives on the one blueprint
+        return request.endpoint.rpartition(".")[2] if request.endpoint else "unmatched"
+    return "none"
+
+_STATEMENT = re.compile(r"\s*(\w+)")
+
+def _statement(query):
+    match = _STATEMENT.match(query if isinstance(query, str) else "")
+    return match.group(1).upper() if match else "OTHER"
+
+
+# ------------------ DATABASE ------------------
+
+def observe_connect(seconds):
+    DB_CONNECT_SECONDS.observe(seconds)
+
+class _QueryTimer:
+    """Shared execute/fetch bookkeeping for both cursor classes."""
+
+    def _timed(self, method, query, *args):
+        statement = _statement(query)
+        start = time.perf_counter()
+        try:
+            return method(query, *args)
+        finally:
+            endpoint = _endpoint()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, statement=statement)
+            self._metric_labels = {"endpoint": endpoint, "statement": statement}
+            if statement != "SELECT":
+                DB_QUERY_ROWS.observe(max(self.rowcount, 0), **self._metric_labels)
+
+    def _count(self, rows):
+        labels = getattr(self, "_metric_labels", None)
+        if labels and labels["statement"] == "SELECT":
+            DB_QUERY_ROWS.observe(rows, **labels)
+        return rows
+
+
+class SQLiteCursor(_QueryTimer, sqlite3.Cursor):
+    def execute(self, query, params=()):
+        return self._timed(super().execute, query, params)
+
+    def executemany(self, query, seq):
+        return self._timed(super().executemany, query, seq)
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._count(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count(len(rows))
+        return rows
+
+
+class SQLiteConnection(sqlite3.Connection):
+    def cursor(self, factory=SQLiteCursor):
+        return super().cursor(factory)
+
+
+_postgres_cursor = None
+
+def postgres_cursor():
+    """Instrumented RealDictCursor; psycopg2 is only imported once PostgreSQL is in use."""
+    global _postgres_cursor
+    if _postgres_cursor is None:
+        from psycopg2.extras import RealDictCursor
+
+        class PostgresCursor(_QueryTimer, RealDictCursor):
+            def execute(self, query, vars=None):
+                result = self._timed(super().execute, query, vars)
+                if self.name is None and _statement(query) == "SELECT":
+                    self._count(max(self.rowcount, 0))
+                return result
+
+            def executemany(self, query, vars_list):
+                return self._timed(super().executemany, query, vars_list)
+
+        _postgres_cursor = PostgresCursor
+    return _postgres_cursor
+
+
+# ------------------ JSON ------------------
+
+class TimedJSONProvider(serialize.FastJSONProvider):
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            JSON_SECONDS.observe(time.perf_counter() - start, endpoint=_endpoint())
+
+
+# ------------------ PROFILING ------------------
+
+class SlowestProfiles:
+    """Keeps .prof dumps for the N slowest sampled requests."""
+
+    def __init__(self, keep=PROFILE_KEEP, folder=PROFILE_DIR):
+        self.keep, self.folder = keep, folder
+        self._heap = []   # (seconds, path)
+        self._lock = threading.Lock()
+
+    def offer(self, seconds, route, profiler):
+        with self._lock:
+            if len(self._heap) >= self.keep and seconds <= self._heap[0][0]:
+                return None
+            os.makedirs(self.folder, exist_ok=True)
+            safe_route = re.sub(r"[^\w.-]+", "_", route).strip("_") or "root"
+            path = os.path.join(self.folder, f"{seconds * 1000:010.1f}ms-{safe_route}-{time.time_ns()}.prof")
+            profiler.dump_stats(path)
+            heapq.heappush(self._heap, (seconds, path))
+            if len(self._heap) > self.keep:
+                _, dropped = heapq.heappop(self._heap)
+                try:
+                    os.remove(dropped)
+                except OSError:
+                    pass
+            return path
+
+    def slowest(self):
+        with self._lock:
+            return sorted(self._heap, reverse=True)
+
+profiles = SlowestProfiles()
+
+
+# ------------------ FLASK HOOKS ------------------
+
+def _route():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+def _before():
+    g.metrics_start = time.perf_counter()
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+def _after(response):
+    g.metrics_status = response.status_code
+    return response
+
+def _teardown(exc=None):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    status = g.pop("metrics_status", 500 if exc else 200)
+    REQUEST_SECONDS.observe(elapsed, method=request.method, route=_route(), status=status)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        PROFILED.inc(route=_route())
+        profiles.offer(elapsed, _route(), profiler)
+
+def scrape_allowed():
+    if METRICS_TOKEN:
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}")
+    return request.remote_addr in LOOPBACK
+
+def init_app(app):
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before)
+    app.after_request(_after)
+    app.teardown_request(_teardown)
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        if not scrape_allowed():
+            return jsonify({"error": "Forbidden"}), 403
+        return Response(render(), mimetype="text/plain; version=0.0.4")
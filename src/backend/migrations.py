@@ -0,0 +1,376 @@
+"""
+Versioned schema migrations, rendered per dialect from one table definition.
+
+    python migrations.py migrate          # apply pending migrations
+    python migrations.py status           # applied / pending versions
+    python migrations.py ddl mysql        # full schema as SQL for a dialect
+    python migrations.py check            # pending migrations + EXPLAIN of route queries
+
+TABLES describes every table once with portable column kinds; COLUMN_TYPES
+turns them into SQLite, PostgreSQL or MySQL types. MIGRATIONS is an
+append-only list: each entry runs once, in its own transaction, and is
+recorded in schema_migrations. The first versions use IF NOT EXISTS, so a
+database created before versioning is adopted without changes.
+"""
+import argparse
+import re
+import sys
+
+import db
+
+DIALECTS = ("sqlite", "postgresql", "mysql")
+
+COLUMN_TYPES = {
+    "pk": {"sqlite": "INTEGER PRIMARY KEY AUTOINCREMENT", "postgresql": "SERIAL PRIMARY KEY", "mysql": "INT AUTO_INCREMENT PRIMARY KEY"},
+    "string": {"sqlite": "TEXT", "postgresql": "VARCHAR({size})", "mysql": "VARCHAR({size})"},
+    "text": {"sqlite": "TEXT", "postgresql": "TEXT", "mysql": "TEXT"},
+    "integer": {"sqlite": "INTEGER", "postgresql": "INTEGER", "mysql": "INT"},
+    "timestamp": {"sqlite": "TIMESTAMP", "postgresql": "TIMESTAMP", "mysql": "TIMESTAMP"},
+}
+
+# table -> (columns as (name, kind[:size], extra), table constraints)
+TABLES = {
+    "students": ([
+        ("id", "pk", ""),
+        ("name", "string:255", "NOT NULL"),
+        ("email", "string:255", "UNIQUE NOT NULL"),
+        ("password", "string:255", "NOT NULL"),
+        ("course", "string:255", ""),
+        ("year", "integer", ""),
+        ("created_at", "timestamp", "DEFAULT CURRENT_TIMESTAMP"),
+    ], []),
+    "admins": ([
+        ("id", "pk", ""),
+        ("name", "string:255", "NOT NULL"),
+        ("email", "string:255", "UNIQUE NOT NULL"),
+        ("password", "string:255", "NOT NULL"),
+        ("created_at", "timestamp", "DEFAULT CURRENT_TIMESTAMP"),
+    ], []),
+    "internships": ([
+        ("id", "pk", ""),
+        ("title", "string:255", "NOT NULL"),
+        ("company", "string:255", "NOT NULL"),
+        ("description", "text", ""),
+        ("duration", "string:100", ""),
+        ("slots", "integer", "DEFAULT 0"),
+        ("date_posted", "timestamp", "DEFAULT CURRENT_TIMESTAMP"),
+        ("admin_id", "integer", ""),
+    ], [
+        "FOREIGN KEY (admin_id) REFERENCES admins(id)",
+    ]),
+    "applications": ([
+        ("id", "pk", ""),
+        ("student_id", "integer", "NOT NULL"),
+        ("internship_id", "integer", "NOT NULL"),
+        ("cv_file", "text", ""),
+        ("cover_letter", "text", ""),
+        ("status", "string:50", "DEFAULT 'Pending'"),
+        ("applied_at", "timestamp", "DEFAULT CURRENT_TIMESTAMP"),
+    ], [
+        "FOREIGN KEY (student_id) REFERENCES students(id)",
+        "FOREIGN KEY (internship_id) REFERENCES internships(id)",
+        "UNIQUE (student_id, internship_id)",
+    ]),
+    "stats_counters": ([
+        ("name", "string:64", "PRIMARY KEY"),
+        ("value", "integer", "NOT NULL DEFAULT 0"),
+    ], []),
+    "cache_versions": ([
+        ("name", "string:64", "PRIMARY KEY"),
+        ("version", "integer", "NOT NULL DEFAULT 1"),
+    ], []),
+    "jobs": ([
+        ("id", "pk", ""),
+        ("kind", "string:64", "NOT NULL"),
+        ("payload", "text", "NOT NULL"),
+        ("status", "string:20", "NOT NULL DEFAULT 'queued'"),
+        ("attempts", "integer", "NOT NULL DEFAULT 0"),
+        ("run_at", "timestamp", "NOT NULL"),
+        ("created_at", "timestamp", "NOT NULL"),
+        ("started_at", "timestamp", ""),
+        ("last_error", "text", ""),
+    ], []),
+    "changes": ([
+        ("id", "pk", ""),
+        ("entity", "string:32", "NOT NULL"),
+        ("entity_id", "integer", "NOT NULL"),
+        ("action", "string:32", "NOT NULL"),
+        ("student_id", "integer", ""),
+        ("data", "text", "NOT NULL"),
+        ("created_at", "timestamp", "DEFAULT CURRENT_TIMESTAMP"),
+    ], []),
+}
+
+
+# ------------------ DDL ------------------
+
+def column_type(kind, dialect):
+    kind, _, size = kind.partition(":")
+    return COLUMN_TYPES[kind][dialect].format(size=size)
+
+def create_table(name, dialect):
+    columns, constraints = TABLES[name]
+    lines = [" ".join(filter(None, (column, column_type(kind, dialect), extra))) for column, kind, extra in columns]
+    body = ",\n    ".join(lines + constraints)
+    return f"CREATE TABLE IF NOT EXISTS {name} (\n    {body}\n)"
+
+def create_index(name, table, columns, dialect):
+    # MySQL has no CREATE INDEX IF NOT EXISTS; the migration only runs once anyway
+    exists = "" if dialect == "mysql" else "IF NOT EXISTS "
+    return f"CREATE INDEX {exists}{name} ON {table} ({columns})"
+
+def tables(*names):
+    return lambda dialect: [create_table(name, dialect) for name in names]
+
+def indexes(*specs):
+    return lambda dialect: [create_index(*spec, dialect) for spec in specs]
+
+def add_column(table, column, kind, extra=""):
+    return lambda dialect: [" ".join(filter(None, (
+        f"ALTER TABLE {table} ADD COLUMN {column}", column_type(kind, dialect), extra)))]
+
+def combine(*builders):
+    return lambda dialect: [statement for build in builders for statement in build(dialect)]
+
+def accounts_view(dialect):
+    import auth
+    return list(auth.ACCOUNTS_VIEW)
+
+def search_index(dialect):
+    import search
+    return search.schema(dialect)
+
+def approved_counts(dialect):
+    import capacity
+    return [capacity.REBUILD_QUERY]
+
+
+class Migration:
+    """One schema version. `optional` ones (e.g. FTS5, which some SQLite builds
+    lack) are skipped on error and retried on the next run."""
+
+    def __init__(self, version, name, statements, optional=False):
+        self.version, self.name = version, name
+        self.statements, self.optional = statements, optional
+
+
+# Append only: never edit or reorder an entry once it has shipped.
+MIGRATIONS = [
+    Migration(1, "base tables", tables("students", "admins", "internships", "applications")),
+    Migration(2, "stats counters and cache versions", tables("stats_counters", "cache_versions")),
+    Migration(3, "application listing indexes", indexes(
+        # Each ends in (applied_at, id) so keyset pages are pure range scans
+        ("idx_applications_applied", "applications", "applied_at, id"),
+        ("idx_applications_status", "applications", "status, applied_at, id"),
+        ("idx_applications_internship", "applications", "internship_id, applied_at, id"),
+        ("idx_applications_student", "applications", "student_id, applied_at, id"),
+    )),
+    Migration(4, "accounts view for login", accounts_view),
+    Migration(5, "internship search index", search_index, optional=True),
+    Migration(6, "internship catalog and admin indexes", indexes(
+        # GET /api/internships orders the whole catalog by date_posted
+        ("idx_internships_posted", "internships", "date_posted, id"),
+        ("idx_internships_admin", "internships", "admin_id"),
+    )),
+    Migration(7, "background jobs and CV scan status", combine(
+        tables("jobs"),
+        # Workers claim the oldest due job: status = 'queued' AND run_at <= now
+        indexes(("idx_jobs_ready", "jobs", "status, run_at, id")),
+        add_column("applications", "cv_status", "string:20"),
+    )),
+    # Read by primary-key range (id > version), so no secondary index
+    Migration(8, "change feed", tables("changes")),
+    # Remaining places = slots - approved_count, kept by the approving transaction
+    Migration(9, "internship approved counts", combine(
+        add_column("internships", "approved_count", "integer", "NOT NULL DEFAULT 0"),
+        approved_counts,
+    )),
+]
+
+def ddl(dialect):
+    """Every migration's statements, in order, as one script."""
+    return "".join(
+        f"-- {m.version}: {m.name}\n" + "".join(f"{statement};\n\n" for statement in m.statements(dialect))
+        for m in MIGRATIONS
+    )
+
+
+# ------------------ MIGRATE ------------------
+
+MIGRATIONS_TABLE = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)"""
+
+# Serialises concurrent migrators on PostgreSQL (SQLite uses BEGIN IMMEDIATE)
+ADVISORY_LOCK_ID = 7_041_017
+
+def dialect(conn):
+    return "postgresql" if db.is_postgres(conn) else "sqlite"
+
+def applied_versions(conn):
+    cur = conn.cursor()
+    cur.execute(MIGRATIONS_TABLE)
+    conn.commit()
+    cur.execute("SELECT version FROM schema_migrations")
+    versions = {dict(row)["version"] for row in cur.fetchall()}
+    cur.close()
+    return versions
+
+def pending(conn):
+    applied = applied_versions(conn)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+def migrate(conn):
+    """Apply every pending migration; returns the versions applied now."""
+    name = dialect(conn)
+    placeholder = db.placeholder(conn)
+    done = []
+    for migration in pending(conn):
+        cur = conn.cursor()
+        try:
+            db.begin_write(conn)
+            if name == "postgresql":
+                cur.execute(f"SELECT pg_advisory_xact_lock({ADVISORY_LOCK_ID})")
+            # Another process may have applied it while we waited for the lock
+            cur.execute(f"SELECT 1 FROM schema_migrations WHERE version = {placeholder}", (migration.version,))
+            if cur.fetchone():
+                conn.rollback()
+                continue
+            for statement in migration.statements(name):
+                cur.execute(statement)
+            cur.execute(
+                f"INSERT INTO schema_migrations (version, name) VALUES ({placeholder}, {placeholder})",
+                (migration.version, migration.name)
+            )
+            conn.commit()
+            done.append(migration.version)
+        except Exception as e:
+            conn.rollback()
+            if not migration.optional:
+                raise
+            print(f"Skipping optional migration {migration.version} ({migration.name}):", e)
+        finally:
+            cur.close()
+    return done
+
+
+# ------------------ CHECK ------------------
+
+def route_queries(placeholder, conn):
+    """(route, sql, params, full_scan_expected) for the queries behind each route."""
+    import app
+    import applied
+    import auth
+    import search
+    import stats
+
+    p = placeholder
+    listing = lambda **filters: app.applications_query(p, **filters)
+    queries = [
+        ("login", auth.ACCOUNT_QUERY.format(placeholder=p), ("admin@example.com",), False),
+        ("get_internships", app.INTERNSHIPS_QUERY, (), True),
+        ("get_student_applications", app.student_applications_query(p), (1,), False),
+        ("get_student_application_summary", applied.STUDENT_QUERY.format(placeholder=p), (1,), False),
+        ("apply_for_internship", f"SELECT id FROM applications WHERE student_id={p} AND internship_id={p}", (1, 1), False),
+        ("set_application_status", f"SELECT status, student_id, internship_id FROM applications WHERE id = {p}", (1,), False),
+        ("capacity.take", f"SELECT COALESCE(slots, 0) - approved_count AS remaining FROM internships WHERE id = {p}", (1,), False),
+        ("role_required", f"SELECT id FROM students WHERE id={p}", (1,), False),
+        ("get_changes", f"SELECT id, entity, entity_id, action, data FROM changes WHERE id > {p} "
+         f"AND (student_id IS NULL OR student_id = {p}) ORDER BY id LIMIT {p}", (0, 1, 500), False),
+        ("jobs.claim", f"SELECT id FROM jobs WHERE status = 'queued' AND run_at <= {p} ORDER BY run_at, id LIMIT 1",
+         ("2025-01-01 00:00:00",), False),
+        ("get_statistics?exact=1", stats.AGGREGATE_QUERY, (), True),
+    ]
+    for label, filters in (
+        ("", {}),
+        ("?status", {"status": "Pending"}),
+        ("?internship_id", {"internship_id": 1}),
+        ("?student_id", {"student_id": 1}),
+        ("?cursor", {"after": ("2025-01-01 00:00:00", 1)}),
+    ):
+        sql, params = listing(**filters)
+        queries.append((f"get_all_applications{label}", sql + f" LIMIT {p}", (*params, 51), False))
+    built = search.search_query(conn, db.is_postgres(conn), "software intern", 20)
+    if built:
+        queries.append(("search_internships", built[0], built[1], False))
+    return queries
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+SQLITE_DERIVED = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)")
+
+def explain(conn, sql, params):
+    """Plan lines, plus the tables read by a full scan."""
+    cur = conn.cursor()
+    if db.is_postgres(conn):
+        # With sequential scans priced out, a Seq Scan means no usable index
+        cur.execute("SET LOCAL enable_seqscan = off")
+        cur.execute("EXPLAIN " + sql, params)
+        lines = [next(iter(dict(row).values())) for row in cur.fetchall()]
+        scans = [m.group(1) for m in map(re.compile(r"Seq Scan on (\w+)").search, lines) if m]
+        conn.rollback()
+    else:
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+        lines = [dict(row)["detail"] for row in cur.fetchall()]
+        # Scanning a view's co-routine reads only what its own SEARCH lines found
+        derived = {m.group(1) for m in map(SQLITE_DERIVED.match, lines) if m}
+        scans = [m.group(1) for m in map(SQLITE_FULL_SCAN.match, lines) if m and m.group(1) not in derived]
+    cur.close()
+    return lines, scans
+
+def check(conn, out=sys.stdout):
+    """Print pending migrations and every route query's plan; True if all is well."""
+    ok = True
+    waiting = pending(conn)
+    for migration in waiting:
+        print(f"PENDING migration {migration.version}: {migration.name}", file=out)
+        ok = False
+    if waiting:
+        return ok
+
+    for route, sql, params, scan_expected in route_queries(db.placeholder(conn), conn):
+        lines, scans = explain(conn, sql, params)
+        flagged = scans and not scan_expected
+        ok = ok and not flagged
+        status = f"FULL SCAN of {', '.join(scans)}" if flagged else "ok"
+        print(f"{route}: {status}", file=out)
+        for line in lines:
+            print(f"    {line}", file=out)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations for the internship portal")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="apply pending migrations")
+    sub.add_parser("status", help="list applied and pending migrations")
+    ddl_parser = sub.add_parser("ddl", help="print the full schema for a dialect")
+    ddl_parser.add_argument("dialect", choices=DIALECTS)
+    sub.add_parser("check", help="pending migrations and EXPLAIN plans for route queries")
+    args = parser.parse_args()
+
+    if args.command == "ddl":
+        print(ddl(args.dialect), end="")
+        return
+
+    conn = db.get_db_connection()
+    if conn is None:
+        sys.exit("Could not connect to the database")
+    try:
+        if args.command == "migrate":
+            applied = migrate(conn)
+            print(f"Applied: {applied}" if applied else "Nothing to apply")
+        elif args.command == "status":
+            applied = applied_versions(conn)
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version:>4}  {state:<8} {migration.name}")
+        else:
+            sys.exit(0 if check(conn) else 1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Password hashing with configurable parameters.
+
+PASSWORD_HASH_METHOD is any werkzeug method string, e.g. "scrypt" (the
+werkzeug default), "scrypt:16384:8:1" or "pbkdf2:sha256:310000". Hashes
+are computed on a bounded executor (PASSWORD_POOL=thread|process, with
+PASSWORD_WORKERS workers and at most PASSWORD_QUEUE waiting jobs), so a
+login burst cannot occupy every request thread with hashing; when the
+queue is full HashingBusy is raised and the route answers 503. A stored
+hash made with other parameters is reported by needs_rehash() so login
+can upgrade it. The *_async variants await the same pool from the ASGI app.
+hash_many() is for bulk imports: it spreads a whole batch over a separate
+process pool of PASSWORD_BULK_WORKERS and is not subject to the queue limit.
+The executors are created lazily and dropped in a forked child, which starts
+its own on first use.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_POOL = os.environ.get("PASSWORD_POOL", "thread")
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_QUEUE = int(os.environ.get("PASSWORD_QUEUE", 64))
+PASSWORD_TIMEOUT = float(os.environ.get("PASSWORD_TIMEOUT", 10))
+PASSWORD_BULK_WORKERS = int(os.environ.get("PASSWORD_BULK_WORKERS", os.cpu_count() or 1))
+
+
+class HashingBusy(Exception):
+    """Too many hash computations queued; retry later."""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+def _check(stored, password):
+    return check_password_hash(stored, password)
+
+
+# Pool processes are spawned, not forked from the caller: gthread workers and
+# job threads may hold locks at that moment that the child would never see
+# released. (A forkserver would be shared with gunicorn workers forked later.)
+_mp_context = multiprocessing.get_context("spawn")
+
+_executor = None
+_bulk_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE)
+_current_method = None
+
+def _after_fork_in_child():
+    # A forked child inherits the executor objects but none of their threads
+    # (gunicorn's preload_app forks after init_db may have hashed); start over
+    global _executor, _bulk_executor, _executor_lock, _slots
+    _executor = _bulk_executor = None
+    _executor_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if PASSWORD_POOL == "process":
+                    _executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, mp_context=_mp_context)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS)
+    return _executor
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy("Password hashing queue is full")
+    try:
+        return _get_executor().submit(fn, *args).result(timeout=PASSWORD_TIMEOUT)
+    finally:
+        _slots.release()
+
+async def _run_async(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy("Password hashing queue is full")
+    try:
+        future = asyncio.wrap_future(_get_executor().submit(fn, *args))
+        return await asyncio.wait_for(future, PASSWORD_TIMEOUT)
+    finally:
+        _slots.release()
+
+def _get_bulk_executor():
+    global _bulk_executor
+    if _bulk_executor is None:
+        with _executor_lock:
+            if _bulk_executor is None:
+                _bulk_executor = ProcessPoolExecutor(max_workers=PASSWORD_BULK_WORKERS, mp_context=_mp_context)
+    return _bulk_executor
+
+def shutdown():
+    """Stop the executors (tests, or before forking workers)."""
+    global _executor, _bulk_executor
+    with _executor_lock:
+        for executor in (_executor, _bulk_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        _executor = _bulk_executor = None
+
+
+def hash_password(password):
+    return _run(_hash, password, PASSWORD_HASH_METHOD)
+
+def hash_many(passwords):
+    """Hashes for a list of passwords, in order, computed across processes."""
+    if not passwords:
+        return []
+    chunksize = max(1, len(passwords) // (PASSWORD_BULK_WORKERS * 4))
+    methods = [PASSWORD_HASH_METHOD] * len(passwords)
+    return list(_get_bulk_executor().map(_hash, passwords, methods, chunksize=chunksize))
+
+def verify_password(stored, password):
+    return _run(_check, stored, password)
+
+async def hash_password_async(password):
+    return await _run_async(_hash, password, PASSWORD_HASH_METHOD)
+
+async def verify_password_async(stored, password):
+    return await _run_async(_check, stored, password)
+
+def current_method():
+    """Fully expanded method prefix for PASSWORD_HASH_METHOD, e.g. "scrypt:32768:8:1"."""
+    global _current_method
+    if _current_method is None:
+        _current_method = _hash("", PASSWORD_HASH_METHOD).split("$", 1)[0]
+    return _current_method
+
+def needs_rehash(stored):
+    return stored.split("$", 1)[0] != current_method()
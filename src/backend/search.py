@@ -0,0 +1,106 @@
+"""
+Full-text search over internships (title, company, description).
+
+SQLite: an FTS5 external-content table, internships_fts (created by a
+migration), filled by create_internship in the same transaction as the
+insert and rebuilt by init_db(). PostgreSQL: a GIN expression index over a weighted tsvector, so
+there is nothing extra to keep in sync. If this SQLite build lacks FTS5 the
+search falls back to LIKE matching.
+"""
+import re
+import sqlite3
+
+MAX_RESULTS = 100
+
+# Title matches outrank company matches, which outrank description matches.
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(company, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+POSTGRES_SCHEMA = [
+    f"CREATE INDEX IF NOT EXISTS idx_internships_search ON internships USING GIN (({PG_DOCUMENT}))",
+]
+
+SQLITE_SCHEMA = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS internships_fts USING fts5(
+        title, company, description,
+        content='internships', content_rowid='id', tokenize='porter unicode61'
+    )''',
+]
+
+_fts5 = None
+
+
+def schema(dialect):
+    """Index DDL for a migrations.py dialect (MySQL gets none)."""
+    return {"postgresql": POSTGRES_SCHEMA, "sqlite": SQLITE_SCHEMA}.get(dialect, [])
+
+def rebuild(cur, is_postgres):
+    """Refill the SQLite FTS table from internships (caller commits)."""
+    global _fts5
+    if is_postgres:
+        return
+    try:
+        cur.execute("INSERT INTO internships_fts (internships_fts) VALUES ('rebuild')")
+        _fts5 = True
+    except sqlite3.OperationalError as e:
+        print("FTS5 unavailable, internship search falls back to LIKE:", e)
+        _fts5 = False
+
+def fts5_available(conn):
+    global _fts5
+    if _fts5 is None:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'internships_fts'")
+        _fts5 = cur.fetchone() is not None
+    return _fts5
+
+def index_internship(cur, is_postgres, internship_id, title, company, description):
+    """Add a freshly inserted internship to the SQLite FTS table."""
+    if is_postgres or not fts5_available(cur.connection):
+        return
+    cur.execute(
+        "INSERT INTO internships_fts (rowid, title, company, description) VALUES (?, ?, ?, ?)",
+        (internship_id, title, company, description)
+    )
+
+def terms(text):
+    return re.findall(r"\w+", text.lower())[:16]
+
+def search_query(conn, is_postgres, text, limit, columns="i.*"):
+    """(sql, params) for the best `limit` matches of `text`, best first; None if no terms.
+    `columns` is the select list, over internships aliased as i."""
+    words = terms(text)
+    if not words:
+        return None
+
+    if is_postgres:
+        # Prefix match every word so results update while the user types
+        tsquery = " & ".join(f"{word}:*" for word in words)
+        return f"""
+            SELECT {columns} FROM internships i
+            WHERE ({PG_DOCUMENT}) @@ to_tsquery('english', %s)
+            ORDER BY ts_rank(({PG_DOCUMENT}), to_tsquery('english', %s)) DESC, date_posted DESC
+            LIMIT %s
+        """, (tsquery, tsquery, limit)
+
+    if fts5_available(conn):
+        match = " ".join(f'"{word}"*' for word in words)
+        return f"""
+            SELECT {columns} FROM internships_fts
+            JOIN internships i ON i.id = internships_fts.rowid
+            WHERE internships_fts MATCH ?
+            ORDER BY bm25(internships_fts, 10.0, 5.0, 1.0), i.date_posted DESC
+            LIMIT ?
+        """, (match, limit)
+
+    conditions = " AND ".join(
+        "(title LIKE ? OR company LIKE ? OR description LIKE ?)" for _ in words
+    )
+    params = [f"%{word}%" for word in words for _ in range(3)]
+    return f"""
+        SELECT {columns} FROM internships i WHERE {conditions}
+        ORDER BY date_posted DESC LIMIT ?
+    """, (*params, limit)
@@ -0,0 +1,92 @@
+"""
+Response shapes for the list endpoints.
+
+Each list endpoint declares a Projection: its output fields in order, and
+the SQL expression behind each. The same object writes the SELECT list and
+names the output, so a route returns exactly the columns it declares and no
+others. In particular it never returns the stored cv_file path (has_cv says
+whether there is one) or internal counters. Clients may narrow a projection
+with ?fields=a,b,c.
+
+Rows come back as objects, as before. With ?format=columnar a list is sent
+as {"columns": [...], "rows": [[...], ...]}, so key names are not repeated
+on every row.
+
+dumps() uses orjson when it is installed (JSON_ENCODER=auto, the default,
+or orjson) and the stdlib encoder otherwise (JSON_ENCODER=json). Output
+matches Flask's provider: sorted keys, and dates in HTTP format.
+"""
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider, _default as flask_default
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "auto")
+COLUMNAR = "columnar"
+
+_fast = orjson is not None and JSON_ENCODER in ("auto", "orjson")
+_options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def encoder():
+    return "orjson" if _fast else "json"
+
+def dumps(obj, compact=False):
+    """JSON text for `obj`. The orjson output is always compact."""
+    if _fast:
+        try:
+            return orjson.dumps(obj, default=flask_default, option=_options).decode()
+        except TypeError:
+            pass   # e.g. integers beyond 64 bits; the stdlib encoder copes
+    separators = (",", ":") if compact else None
+    return json.dumps(obj, default=flask_default, sort_keys=True, separators=separators)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's provider, encoding through dumps() unless asked for indentation or other options."""
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs or kwargs == {"separators": (",", ":")}:
+            return dumps(obj, compact=bool(kwargs))
+        return super().dumps(obj, **kwargs)
+
+
+class Projection:
+    """Ordered (name, SQL expression) pairs for one endpoint's rows."""
+
+    def __init__(self, fields, required=()):
+        self.fields = tuple(fields)
+        self.names = tuple(name for name, _ in self.fields)
+        # Always selected, even when ?fields leaves them out (e.g. the keyset cursor needs them)
+        self.required = tuple(required)
+
+    def select(self):
+        return ", ".join(name if expr == name else f"{expr} AS {name}" for name, expr in self.fields)
+
+    def only(self, names):
+        """A narrower projection with just `names` (plus the required ones), in declared order.
+        Raises ValueError for a name this projection does not have."""
+        wanted = set(names)
+        unknown = wanted - set(self.names)
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+        wanted.update(self.required)
+        return Projection([f for f in self.fields if f[0] in wanted], self.required)
+
+    def from_request(self, fields):
+        """The projection for a ?fields= value (None or empty: all of it)."""
+        names = [name.strip() for name in (fields or "").split(",") if name.strip()]
+        return self.only(names) if names else self
+
+
+def values(row):
+    """A row's values in SELECT order, for sqlite3.Row, dict rows and tuples alike."""
+    return list(row.values()) if isinstance(row, dict) else list(row)
+
+def columnar(projection, rows):
+    return {"columns": list(projection.names), "rows": [values(row) for row in rows]}
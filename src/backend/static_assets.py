@@ -0,0 +1,129 @@
+"""
+In-memory index of the frontend files.
+
+build() reads src/frontend once at startup, records a content hash for
+every file and keeps gzip (and brotli, when the optional `brotli` package
+is installed) variants of the text assets. CSS/JS are also reachable under
+a fingerprinted name (js/api.3f9c2a1b7e.js) that HTML pages are rewritten
+to reference, so those URLs can be cached as immutable. Lookups are dict
+hits: no filesystem stat per request, including the SPA fallback.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".map"}
+FINGERPRINTED = {".css", ".js"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# src="js/api.js" / href="css/style.css" in HTML pages
+ASSET_REF = re.compile(r'''(\b(?:src|href)=")([^"#?:]+)(")''')
+
+
+class Asset:
+    def __init__(self, path, body):
+        self.path = path
+        self.body = body
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.digest = hashlib.sha256(body).hexdigest()[:10]
+        self.variants = {}
+        ext = posixpath.splitext(path)[1]
+        if ext in COMPRESSIBLE:
+            zipped = gzip.compress(body, compresslevel=9)
+            if len(zipped) < len(body):
+                self.variants["gzip"] = zipped
+            if brotli is not None:
+                squeezed = brotli.compress(body, quality=11)
+                if len(squeezed) < len(body):
+                    self.variants["br"] = squeezed
+
+    @property
+    def fingerprinted_path(self):
+        root, ext = posixpath.splitext(self.path)
+        return f"{root}.{self.digest}{ext}"
+
+
+class AssetIndex:
+    def __init__(self, root, fallback="index.html"):
+        self.root = root
+        self.fallback = fallback
+        self.assets = {}
+        self.fingerprints = {}
+        self.manifest = {}
+
+    def build(self):
+        assets = {}
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                full = os.path.join(folder, name)
+                path = os.path.relpath(full, self.root).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    assets[path] = f.read()
+
+        self.assets, self.fingerprints, self.manifest = {}, {}, {}
+        # Fingerprint CSS/JS first so the HTML pages can point at the hashed names
+        for path, body in assets.items():
+            if posixpath.splitext(path)[1] in FINGERPRINTED:
+                asset = self.assets[path] = Asset(path, body)
+                self.fingerprints[asset.fingerprinted_path] = asset
+                self.manifest[path] = asset.fingerprinted_path
+        for path, body in assets.items():
+            if path in self.assets:
+                continue
+            if path.endswith(".html"):
+                body = self._rewrite(path, body)
+            self.assets[path] = Asset(path, body)
+        return self
+
+    def _rewrite(self, page, body):
+        base = posixpath.dirname(page)
+
+        def swap(match):
+            ref = match.group(2)
+            target = posixpath.normpath(posixpath.join(base, ref.lstrip("/")))
+            hashed = self.manifest.get(target)
+            if not hashed:
+                return match.group(0)
+            new_ref = posixpath.relpath(hashed, base or ".") if not ref.startswith("/") else "/" + hashed
+            return f"{match.group(1)}{new_ref}{match.group(3)}"
+        return ASSET_REF.sub(swap, body.decode("utf-8")).encode("utf-8")
+
+    def lookup(self, path):
+        """(asset, immutable) for a request path, falling back to the SPA entry page."""
+        path = path.lstrip("/")
+        if path in self.fingerprints:
+            return self.fingerprints[path], True
+        asset = self.assets.get(path) or self.assets.get(self.fallback)
+        return asset, False
+
+    def response(self, request, asset, immutable=False):
+        encoding = None
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and candidate in request.accept_encodings:
+                encoding = candidate
+                break
+        etag = f"{asset.digest}-{encoding}" if encoding else asset.digest
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = asset.variants[encoding] if encoding else asset.body
+            response = Response(body, mimetype=asset.mimetype)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+        return response
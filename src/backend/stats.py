@@ -0,0 +1,109 @@
+"""
+Dashboard statistics.
+
+Counts live in the stats_counters table, which every write path updates in
+the same transaction as the row it changes, so reading them is O(1). The
+aggregate query recomputes everything in one pass and is used to (re)build
+the counters at startup or on ?exact=1. Reads are also cached in-process
+for STATS_CACHE_TTL seconds because the admin dashboard polls /api/stats.
+"""
+import os
+import threading
+import time
+
+STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", 5))
+
+COUNTERS = (
+    "total_internships",
+    "total_applications",
+    "pending_applications",
+    "approved_applications",
+    "rejected_applications",
+    "total_students",
+)
+
+STATUS_COUNTERS = {
+    "Pending": "pending_applications",
+    "Approved": "approved_applications",
+    "Rejected": "rejected_applications",
+}
+
+AGGREGATE_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM internships) AS total_internships,
+        COUNT(a.id) AS total_applications,
+        COALESCE(SUM(CASE WHEN a.status = 'Pending' THEN 1 ELSE 0 END), 0) AS pending_applications,
+        COALESCE(SUM(CASE WHEN a.status = 'Approved' THEN 1 ELSE 0 END), 0) AS approved_applications,
+        COALESCE(SUM(CASE WHEN a.status = 'Rejected' THEN 1 ELSE 0 END), 0) AS rejected_applications,
+        (SELECT COUNT(*) FROM students) AS total_students
+    FROM applications a
+"""
+
+
+def bump(cur, placeholder, **deltas):
+    """Adjust counters inside the caller's transaction, e.g. bump(cur, p, total_students=1).
+
+    Rows are updated in name order, so concurrent writers (an approval and a
+    rejection moving applications in opposite directions) lock them in the
+    same order and cannot deadlock on PostgreSQL.
+    """
+    cur.executemany(
+        f"UPDATE stats_counters SET value = value + {placeholder} WHERE name = {placeholder}",
+        [(delta, name) for name, delta in sorted(deltas.items()) if delta]
+    )
+
+def status_change(old_status, new_status):
+    """Counter deltas for moving one application between statuses."""
+    deltas = {}
+    if old_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[old_status]] = -1
+    if new_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[new_status]] = deltas.get(STATUS_COUNTERS[new_status], 0) + 1
+    return deltas
+
+def aggregate(cur):
+    cur.execute(AGGREGATE_QUERY)
+    row = dict(cur.fetchone())
+    return {name: int(row[name]) for name in COUNTERS}
+
+def rebuild(cur, placeholder):
+    """Recompute every counter from the base tables (caller commits)."""
+    values = aggregate(cur)
+    cur.execute("DELETE FROM stats_counters")
+    cur.executemany(
+        f"INSERT INTO stats_counters (name, value) VALUES ({placeholder}, {placeholder})",
+        list(values.items())
+    )
+    return values
+
+def read(cur):
+    cur.execute("SELECT name, value FROM stats_counters")
+    values = {name: 0 for name in COUNTERS}
+    for row in cur.fetchall():
+        row = dict(row)
+        values[row["name"]] = int(row["value"])
+    return values
+
+
+# ------------------ CACHE ------------------
+
+_lock = threading.Lock()
+_cached = None
+_expires = 0.0
+
+def cached():
+    with _lock:
+        if _cached is not None and _expires > time.monotonic():
+            return dict(_cached)
+    return None
+
+def remember(values):
+    global _cached, _expires
+    with _lock:
+        _cached = dict(values)
+        _expires = time.monotonic() + STATS_CACHE_TTL
+
+def invalidate():
+    global _cached
+    with _lock:
+        _cached = None
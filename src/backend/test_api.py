@@ -4,10 +4,49 @@ Tests basic API endpoints without external dependencies
 """
 import sys
 import os
+import json
+import tempfile
 
 # Add the backend directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Keep the tests away from the bundled internship_portal.db
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(), 'test_portal.db'))
+# Every test client shares 127.0.0.1; the limiter test switches it on for itself
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+def _client():
+    """Flask test client backed by a freshly initialised SQLite database"""
+    from app import app, init_db
+    init_db()
+    return app.test_client()
+
+def _seed_applications(count, status="Pending", slots=5):
+    """Insert `count` applications (one new student each) straight into the test database"""
+    import db
+    conn = db.get_db_connection()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO internships (title, company, slots) VALUES ('Seeded', 'Acme', ?)", (slots,))
+    internship_id = cur.lastrowid
+    for _ in range(count):
+        cur.execute("INSERT INTO students (name, email, password) VALUES ('Seed', 'seed-' || hex(randomblob(8)), 'x')")
+        cur.execute(
+            "INSERT INTO applications (student_id, internship_id, status, applied_at) VALUES (?, ?, ?, '2025-01-01 00:00:00')",
+            (cur.lastrowid, internship_id, status)
+        )
+    conn.commit()
+    conn.close()
+    return internship_id
+
+def _student_headers(client, email):
+    client.post('/api/register/student', json={"name": "Student", "email": email, "password": "pw"})
+    res = client.post('/api/login', json={"email": email, "password": "pw"})
+    return {"Authorization": f"Bearer {res.get_json()['access_token']}"}
+
+def _admin_headers(client):
+    res = client.post('/api/login', json={"email": "admin@example.com", "password": "admin123"})
+    return {"Authorization": f"Bearer {res.get_json()['access_token']}"}
+
 def test_imports():
     """Test if all required modules can be imported"""
     try:
@@ -15,7 +54,6 @@ def test_imports():
         from flask_cors import CORS
         from flask_jwt_extended import JWTManager
         from werkzeug.security import generate_password_hash
-        import mysql.connector
         print("✓ All imports successful")
         return True
     except ImportError as e:
@@ -27,8 +65,10 @@ def test_app_creation():
     try:
         # Import app after setting up test environment
         os.environ['TESTING'] = 'True'
-        from backend.app import app
+        from app import create_app
+        app = create_app()
         assert app is not None
+        assert create_app() is not app
         assert app.config['JWT_SECRET_KEY'] is not None
         print("✓ Flask app creation successful")
         return True
@@ -50,6 +90,840 @@ def test_password_hashing():
         print(f"✗ Password hashing error: {e}")
         return False
 
+def test_password_executor_survives_fork():
+    """A worker forked after init_db (gunicorn preload_app) can still hash"""
+    from app import init_db
+    import passwords
+    init_db()
+    passwords.hash_password("before-fork")   # the executor exists in the parent
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = 0 if passwords.verify_password(passwords.hash_password("child"), "child") else 1
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0, status
+    assert passwords.verify_password(passwords.hash_password("parent"), "parent")
+    print("✓ Password executor restarts in forked workers")
+    return True
+
+def test_db_pool_one_connection_per_request():
+    """Each request checks out exactly one pooled connection and returns it"""
+    import db
+    client = _client()
+    headers = _admin_headers(client)
+    before = db.pool_stats()
+    res = client.get('/api/applications', headers=headers)
+    assert res.status_code == 200
+    after = db.pool_stats()
+    # admin_required and the view share the request's connection
+    assert after["checkouts"] - before["checkouts"] == 1
+    assert after["in_use"] == 0
+    stats = client.get('/api/db/pool', headers=headers).get_json()
+    assert stats["backend"] == "sqlite" and stats["size"] >= 1
+    print("✓ Connection pool hands out one connection per request")
+    return True
+
+def test_role_cache_and_revocation():
+    """Role checks are served from the account cache and honour revoke()"""
+    import auth
+    import db
+    client = _client()
+    headers = _admin_headers(client)
+    auth.account_cache.invalidate()
+    assert client.get('/api/stats', headers=headers).status_code == 200
+    before = db.pool_stats()["checkouts"]
+    hits = auth.account_cache.hits
+    assert client.get('/api/db/pool', headers=headers).status_code == 200
+    assert auth.account_cache.hits == hits + 1
+    # the pool route itself never touches the database
+    assert db.pool_stats()["checkouts"] == before
+    auth.revoke("admin", 1)
+    assert client.get('/api/stats', headers=headers).status_code == 403
+    auth.account_cache.invalidate("admin", 1)
+    assert client.get('/api/stats', headers=headers).status_code == 200
+    # an admin token is never accepted on student routes
+    assert client.get('/api/status', headers=headers).status_code == 403
+    print("✓ Role cache serves repeat checks and respects revocation")
+    return True
+
+def test_applications_keyset_pagination():
+    """Pages follow next_cursor without gaps or repeats, filters apply server-side"""
+    client = _client()
+    headers = _admin_headers(client)
+    internship_id = _seed_applications(7, status="Rejected")
+    seen = []
+    cursor = None
+    while True:
+        params = {"internship_id": internship_id, "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get('/api/applications', query_string=params, headers=headers).get_json()
+        seen.extend(app["id"] for app in body["data"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    # identical applied_at values: ordering falls back to id
+    assert seen == sorted(seen, reverse=True) and len(seen) == 7
+    body = client.get('/api/applications', query_string={"internship_id": internship_id, "status": "Pending"}, headers=headers).get_json()
+    assert body["data"] == [] and body["next_cursor"] is None
+    assert client.get('/api/applications?status=Bogus', headers=headers).status_code == 400
+    assert client.get('/api/applications?cursor=!!', headers=headers).status_code == 400
+    print("✓ Applications are keyset-paginated and filtered on the server")
+    return True
+
+def test_ndjson_streaming():
+    """format=ndjson streams one JSON object per line, same rows as the list view"""
+    client = _client()
+    headers = _admin_headers(client)
+    internship_id = _seed_applications(5)
+    res = client.get(f'/api/applications?format=ndjson&internship_id={internship_id}', headers=headers)
+    assert res.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert len(rows) == 5 and all(row["internship_id"] == internship_id for row in rows)
+    res = client.get('/api/internships', headers={"Accept": "application/x-ndjson"})
+    listed = client.get('/api/internships').get_json()
+    assert [json.loads(line) for line in res.get_data(as_text=True).splitlines()] == listed
+    print("✓ List endpoints stream NDJSON on request")
+    return True
+
+def test_stats_counters_track_writes():
+    """Counters maintained by apply/approve/reject match a full recount"""
+    client = _client()
+    headers = _admin_headers(client)
+    student = _student_headers(client, "stats@example.com")
+    client.post('/api/internships', json={"title": "Counted", "company": "Acme", "slots": 2}, headers=headers)
+    internship_id = client.get('/api/internships').get_json()[0]["id"]
+    assert client.post('/api/apply', data={"internship_id": internship_id}, headers=student).status_code == 201
+    application_id = client.get('/api/status', headers=student).get_json()[0]["id"]
+    assert client.post(f'/api/applications/{application_id}/approve', headers=headers).status_code == 200
+    assert client.post(f'/api/applications/{application_id}/reject', headers=headers).status_code == 200
+    assert client.post('/api/applications/999999/approve', headers=headers).status_code == 404
+    counters = client.get('/api/stats', headers=headers).get_json()
+    # a second read inside the TTL is served from the cache
+    assert client.get('/api/stats', headers=headers).get_json() == counters
+    exact = client.get('/api/stats?exact=1', headers=headers).get_json()
+    assert counters == exact
+
+    # Opposite status moves update (and so lock) the counter rows in the same order
+    import stats
+
+    class Recorder:
+        def executemany(self, sql, rows):
+            self.names = [name for _, name in rows]
+    orders = []
+    for old, new in (("Rejected", "Approved"), ("Approved", "Rejected")):
+        cur = Recorder()
+        stats.bump(cur, "?", **stats.status_change(old, new))
+        orders.append(cur.names)
+    assert orders[0] == orders[1] == ["approved_applications", "rejected_applications"], orders
+    print("✓ Stats counters stay in sync with the tables")
+    return True
+
+def test_internship_search_ranking():
+    """Search finds new postings immediately and ranks title matches first"""
+    client = _client()
+    headers = _admin_headers(client)
+    client.post('/api/internships', json={"title": "Backend Intern", "company": "Acme", "description": "Work on kubernetes operators"}, headers=headers)
+    client.post('/api/internships', json={"title": "Kubernetes Platform Intern", "company": "Globex", "description": "Clusters"}, headers=headers)
+    results = client.get('/api/internships/search?q=kubernetes').get_json()
+    assert [r["title"] for r in results[:2]] == ["Kubernetes Platform Intern", "Backend Intern"]
+    # prefix matching while typing
+    assert client.get('/api/internships/search?q=globe').get_json()[0]["company"] == "Globex"
+    assert client.get('/api/internships/search?q=%22%29*').get_json() == []
+    print("✓ Internship search is ranked and kept in sync")
+    return True
+
+def test_internship_catalog_http_cache():
+    """Catalog answers If-None-Match with 304 and changes ETag when a posting is added"""
+    import gzip
+    client = _client()
+    headers = _admin_headers(client)
+    first = client.get('/api/internships')
+    etag = first.headers["ETag"]
+    assert client.get('/api/internships', headers={"If-None-Match": etag}).status_code == 304
+    zipped = client.get('/api/internships', headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(zipped.get_data()) == first.get_data()
+    client.post('/api/internships', json={"title": "Fresh", "company": "Acme"}, headers=headers)
+    second = client.get('/api/internships', headers={"If-None-Match": etag})
+    assert second.status_code == 200 and second.headers["ETag"] != etag
+    assert any(i["title"] == "Fresh" for i in second.get_json())
+    print("✓ Internship catalog supports ETag revalidation")
+    return True
+
+def test_static_assets_fingerprinted_and_compressed():
+    """Pages reference hashed CSS/JS that is served immutable and precompressed"""
+    import re
+    client = _client()
+    page = client.get('/internships.html')
+    assert page.headers["Cache-Control"] == "no-cache"
+    hashed = re.search(r'src="(js/api\.[0-9a-f]{10}\.js)"', page.get_data(as_text=True)).group(1)
+    res = client.get('/' + hashed, headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200 and res.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in res.headers["Cache-Control"]
+    assert client.get('/asset-manifest.json').get_json()["js/api.js"] == hashed
+    plain = client.get('/js/api.js')
+    assert client.get('/js/api.js', headers={"If-None-Match": plain.headers["ETag"]}).status_code == 304
+    # unknown paths fall back to the SPA entry page
+    assert client.get('/no/such/page').get_data() == client.get('/').get_data()
+    print("✓ Static assets are fingerprinted and precompressed")
+    return True
+
+def test_cv_upload_deduplicated():
+    """Identical CVs are stored once under their content hash, temp files are cleaned up"""
+    import io
+    import db
+    from app import app
+    client = _client()
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+    headers = _admin_headers(client)
+    client.post('/api/internships', json={"title": "CV Test", "company": "Acme"}, headers=headers)
+    internship_id = client.get('/api/internships').get_json()[0]["id"]
+    stored = []
+    for email in ("cv1@example.com", "cv2@example.com"):
+        student = _student_headers(client, email)
+        data = {"internship_id": internship_id, "cv": (io.BytesIO(b"%PDF-1.4 same cv" * 4096), "my cv.pdf")}
+        res = client.post('/api/apply', data=data, headers=student, content_type='multipart/form-data')
+        assert res.status_code == 201, res.get_json()
+        listed = client.get('/api/status', headers=student).get_json()[0]
+        assert listed["has_cv"] == 1 and "cv_file" not in listed   # the stored path stays internal
+        conn = db.get_db_connection()
+        stored.append(conn.execute("SELECT cv_file FROM applications WHERE id = ?", (listed["id"],)).fetchone()[0])
+        conn.close()
+    assert stored[0] == stored[1] and stored[0].startswith("cv/") and stored[0].endswith(".pdf")
+    folder = app.config['UPLOAD_FOLDER']
+    assert os.path.getsize(os.path.join(folder, stored[0])) == len(b"%PDF-1.4 same cv") * 4096
+    assert os.listdir(os.path.join(folder, ".tmp")) == []
+    app.config['UPLOAD_FOLDER'] = "uploads"
+    print("✓ CV uploads are streamed, hashed and deduplicated")
+    return True
+
+def test_bulk_status_update():
+    """Bulk endpoint updates by ids or filter in one go and reports per-id results"""
+    client = _client()
+    headers = _admin_headers(client)
+    internship_id = _seed_applications(4)
+    client.get('/api/stats?exact=1', headers=headers)  # resync counters after seeding
+    ids = [a["id"] for a in client.get(f'/api/applications?internship_id={internship_id}', headers=headers).get_json()["data"]]
+    body = client.post('/api/applications/bulk', json={"action": "approve", "ids": ids[:2] + [999999]}, headers=headers).get_json()
+    assert body["updated"] == 2
+    assert {r["id"]: r["result"] for r in body["results"]}[999999] == "not_found"
+    body = client.post('/api/applications/bulk', json={"action": "reject", "filter": {"internship_id": internship_id, "status": "Pending"}}, headers=headers).get_json()
+    assert sorted(r["id"] for r in body["results"]) == sorted(ids[2:]) and body["updated"] == 2
+    statuses = {a["id"]: a["status"] for a in client.get(f'/api/applications?internship_id={internship_id}', headers=headers).get_json()["data"]}
+    assert [statuses[i] for i in ids] == ["Approved", "Approved", "Rejected", "Rejected"]
+    assert client.get('/api/stats', headers=headers).get_json() == client.get('/api/stats?exact=1', headers=headers).get_json()
+    assert client.post('/api/applications/bulk', json={"action": "approve"}, headers=headers).status_code == 400
+    print("✓ Bulk approve/reject applies set-based updates")
+    return True
+
+def test_metrics_endpoint():
+    """/metrics exposes route latency, query timings/rows and pool gauges"""
+    client = _client()
+    headers = _admin_headers(client)
+    client.get('/api/applications', headers=headers)
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/applications",status="200"}' in text
+    assert 'db_query_duration_seconds_count{endpoint="get_all_applications",statement="SELECT"}' in text
+    assert 'db_query_rows_count{endpoint="get_all_applications",statement="SELECT"}' in text
+    assert 'json_serialize_seconds_count{endpoint="get_all_applications"}' in text
+    assert 'db_pool{field="checkouts"}' in text
+
+    # Not public: other hosts need the scrape token
+    import metrics
+    remote = {"REMOTE_ADDR": "10.0.0.7"}
+    assert client.get('/metrics', environ_base=remote).status_code == 403
+    token, metrics.METRICS_TOKEN = metrics.METRICS_TOKEN, "scrape-secret"
+    try:
+        assert client.get('/metrics', environ_base=remote, headers={"Authorization": "Bearer wrong"}).status_code == 403
+        assert client.get('/metrics').status_code == 403
+        assert client.get('/metrics', environ_base=remote, headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+    finally:
+        metrics.METRICS_TOKEN = token
+    print("✓ Metrics endpoint reports request and query timings")
+    return True
+
+def test_sampled_profiling_keeps_slowest():
+    """With sampling forced on, only the slowest profiles are kept on disk"""
+    import metrics
+    folder = tempfile.mkdtemp()
+    keeper = metrics.SlowestProfiles(keep=2, folder=folder)
+    old_rate, old_profiles = metrics.PROFILE_SAMPLE_RATE, metrics.profiles
+    metrics.PROFILE_SAMPLE_RATE, metrics.profiles = 1.0, keeper
+    try:
+        client = _client()
+        for _ in range(4):
+            client.get('/api/internships')
+    finally:
+        metrics.PROFILE_SAMPLE_RATE, metrics.profiles = old_rate, old_profiles
+    assert len(os.listdir(folder)) == 2 and len(keeper.slowest()) == 2
+    print("✓ Sampled profiler keeps the slowest requests")
+    return True
+
+def test_password_rehash_on_login():
+    """A hash made with outdated parameters is upgraded on the next successful login"""
+    import passwords
+    from werkzeug.security import generate_password_hash
+    from db import get_db_connection
+    client = _client()
+    client.post('/api/register/student', json={
+        'name': 'Rehash', 'email': 'rehash@example.com', 'password': 'secret', 'course': 'CS', 'year': 2
+    })
+    conn = get_db_connection()
+    conn.execute("UPDATE students SET password=? WHERE email=?",
+                 (generate_password_hash('secret', method='pbkdf2:sha256:1000'), 'rehash@example.com'))
+    conn.commit()
+    res = client.post('/api/login', json={'email': 'rehash@example.com', 'password': 'secret'})
+    assert res.status_code == 200
+    stored = conn.execute("SELECT password FROM students WHERE email=?", ('rehash@example.com',)).fetchone()[0]
+    conn.close()
+    assert not passwords.needs_rehash(stored)
+    assert client.post('/api/login', json={'email': 'rehash@example.com', 'password': 'wrong'}).status_code == 401
+    print("✓ Outdated password hashes are upgraded on login")
+    return True
+
+def test_login_single_lookup_and_negative_cache():
+    """Admins and students resolve through one query; unknown emails are cached until they register"""
+    import auth
+    client = _client()
+    auth.unknown_emails.discard()
+    res = client.post('/api/login', json={'email': 'admin@example.com', 'password': 'admin123'})
+    assert res.status_code == 200 and res.get_json()['role'] == 'admin'
+
+    bad = {'email': 'later@example.com', 'password': 'secret'}
+    assert client.post('/api/login', json=bad).status_code == 401
+    assert client.post('/api/login', json=bad).status_code == 401
+    assert auth.unknown_emails.snapshot()['hits'] >= 1
+
+    client.post('/api/register/student', json={
+        'name': 'Later', 'email': 'later@example.com', 'password': 'secret', 'course': 'CS', 'year': 1
+    })
+    res = client.post('/api/login', json=bad)
+    assert res.status_code == 200 and res.get_json()['role'] == 'student'
+    print("✓ Login uses one account lookup with a negative cache")
+    return True
+
+def test_asgi_entry_point():
+    """The ASGI app answers async routes natively and hands the rest to Flask"""
+    import asyncio
+    import time
+    from werkzeug.security import generate_password_hash
+    import asgi
+    import async_db
+    import changes
+    import db
+    import passwords
+    client = _client()
+    stream_seconds = changes.CHANGES_STREAM_SECONDS
+
+    async def call(method, path, query=b"", headers=(), body=b"", hold=False):
+        """hold=True keeps the client connected; otherwise it disconnects right after the request"""
+        scope = {"type": "http", "method": method, "path": path, "query_string": query,
+                 "headers": [(k.encode(), v.encode()) for k, v in headers], "http_version": "1.1"}
+        messages, sent = [{"type": "http.request", "body": body}], []
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            if hold:
+                await asyncio.Event().wait()
+            return {"type": "http.disconnect"}
+        async def send(message):
+            sent.append(message)
+        await asgi.app(scope, receive, send)
+        return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+    async def run():
+        try:
+            status, body = await call("POST", "/api/login", headers=[("content-type", "application/json")],
+                                      body=json.dumps({"email": "admin@example.com", "password": "admin123"}).encode())
+            assert status == 200
+            admin = [("authorization", "Bearer " + json.loads(body)["access_token"])]
+
+            # An outdated hash is upgraded through the SQLite writer, not a side connection
+            client.post('/api/register/student', json={"name": "Async", "email": "asgi-rehash@example.com", "password": "pw"})
+            conn = db.get_db_connection()
+            conn.execute("UPDATE students SET password = ? WHERE email = ?",
+                         (generate_password_hash("pw", method="pbkdf2:sha256:1000"), "asgi-rehash@example.com"))
+            conn.commit()
+            jobs = db.writer_stats()["jobs"]
+            login = json.dumps({"email": "asgi-rehash@example.com", "password": "pw"}).encode()
+            assert (await call("POST", "/api/login", headers=[("content-type", "application/json")], body=login))[0] == 200
+            stored = conn.execute("SELECT password FROM students WHERE email = ?", ("asgi-rehash@example.com",)).fetchone()[0]
+            conn.close()
+            assert not passwords.needs_rehash(stored) and db.writer_stats()["jobs"] > jobs
+            status, body = await call("GET", "/api/applications", b"limit=2", admin)
+            assert status == 200 and "next_cursor" in json.loads(body)
+            assert (await call("GET", "/api/status", headers=admin))[0] == 403
+            assert (await call("GET", "/api/applications", b"format=ndjson", admin))[0] == 200
+            status, body = await call("GET", "/api/internships")
+            assert status == 200 and isinstance(json.loads(body), list)
+
+            # The change stream is served on the loop and ends early when the client goes away
+            posting = json.dumps({"title": "Streamed", "company": "Acme"}).encode()
+            status, body = await call("POST", "/api/internships", body=posting, headers=admin + [
+                ("content-type", "application/json"), ("content-length", str(len(posting)))])
+            assert status == 201, body
+            changes.CHANGES_STREAM_SECONDS = 0.3
+            status, body = await call("GET", "/api/changes/stream", b"since=0", admin, hold=True)
+            assert status == 200 and "event: change" in body.decode() and '"Streamed"' in body.decode()
+            changes.CHANGES_STREAM_SECONDS = 30
+            started = time.monotonic()
+            assert (await call("GET", "/api/changes/stream", headers=admin))[0] == 200
+            assert time.monotonic() - started < 5
+        finally:
+            changes.CHANGES_STREAM_SECONDS = stream_seconds
+            await async_db.close_pool()
+
+    asyncio.run(run())
+    print("✓ ASGI entry point serves async and bridged routes")
+    return True
+
+def test_versioned_migrations_and_query_plans():
+    """Migrations run once, adopt pre-versioning databases, and every route query uses an index"""
+    import io
+    import sqlite3
+    import migrations
+    from db import get_db_connection
+    _client()
+    conn = get_db_connection()
+    assert migrations.pending(conn) == []
+    assert migrations.migrate(conn) == []
+    out = io.StringIO()
+    assert migrations.check(conn, out), out.getvalue()
+    conn.close()
+
+    legacy = sqlite3.connect(os.path.join(tempfile.mkdtemp(), 'legacy.db'))
+    legacy.row_factory = sqlite3.Row
+    legacy.execute("CREATE TABLE students (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                   "email TEXT UNIQUE NOT NULL, password TEXT NOT NULL, course TEXT, year INTEGER, created_at TIMESTAMP)")
+    legacy.execute("INSERT INTO students (name, email, password) VALUES ('Old', 'old@example.com', 'x')")
+    legacy.commit()
+    assert migrations.migrate(legacy)[:3] == [1, 2, 3]
+    assert legacy.execute("SELECT email FROM accounts").fetchone()[0] == 'old@example.com'
+    legacy.close()
+
+    assert "SERIAL PRIMARY KEY" in migrations.ddl("postgresql")
+    assert "AUTO_INCREMENT" in migrations.ddl("mysql")
+    print("✓ Versioned migrations apply once and route queries are indexed")
+    return True
+
+def test_sqlite_wal_and_group_commit():
+    """Concurrent writes on SQLite go through the writer thread without lock errors"""
+    from concurrent.futures import ThreadPoolExecutor
+    import db
+    from app import app
+    client = _client()
+    conn = db.get_db_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    internship_id = _seed_applications(0)
+    headers = [_student_headers(client, f"writer-{i}@example.com") for i in range(16)]
+    before = db.writer_stats()
+
+    def apply(h):
+        return app.test_client().post('/api/apply', data={"internship_id": internship_id}, headers=h)
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(apply, headers + headers))
+    codes = sorted(res.status_code for res in responses)
+    # every student gets in exactly once; the duplicates are rejected, not "database is locked"
+    assert codes == [201] * 16 + [400] * 16, [res.get_json() for res in responses]
+    after = db.writer_stats()
+    # (background job workers may add writes of their own; duplicates the
+    # applied index already knows about never reach the writer)
+    assert after["jobs"] - before["jobs"] >= 16
+    assert after["batches"] > before["batches"] and after["max_batch"] >= 1
+    print("✓ SQLite runs in WAL mode and batches concurrent writes")
+    return True
+
+def test_write_timeout_withdraws_job():
+    """A write that times out in the writer queue never commits and answers 503"""
+    import threading
+    import time
+    import db
+    client = _client()
+    internship_id = _seed_applications(1)
+    conn = db.get_db_connection()
+    app_id = conn.execute("SELECT id FROM applications WHERE internship_id = ?", (internship_id,)).fetchone()[0]
+    conn.close()
+    headers = _admin_headers(client)
+
+    writer = db.get_writer()
+    before = db.writer_stats()
+    started = threading.Event()
+    outcome = []
+
+    def slow(cur):
+        started.set()
+        time.sleep(0.6)
+        return "slow"
+
+    writer.timeout = 0.2
+    try:
+        blocker = threading.Thread(target=lambda: outcome.append(writer.submit(slow)))
+        blocker.start()
+        started.wait(5)
+        res = client.post(f'/api/applications/{app_id}/approve', headers=headers)
+        blocker.join()
+    finally:
+        writer.timeout = db.SQLITE_WRITE_TIMEOUT
+    assert res.status_code == 503 and res.headers.get("Retry-After") == "1", res.get_json()
+    # the running job outlived the timeout too, and its caller still got the real result
+    assert outcome == ["slow"]
+    conn = db.get_db_connection()
+    db.run_write(conn, lambda cur: None)   # the withdrawn job's batch is behind us
+    assert conn.execute("SELECT status FROM applications WHERE id = ?", (app_id,)).fetchone()[0] == "Pending"
+    conn.close()
+    assert db.writer_stats()["timed_out"] == before["timed_out"] + 1
+    print("✓ Timed-out writes are withdrawn and answered with 503")
+    return True
+
+def test_background_jobs():
+    """CV scans and status notifications run after the response, with retries and queue metrics"""
+    import io
+    import jobs
+    from app import app
+    client = _client()
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+    admin = _admin_headers(client)
+    internship_id = _seed_applications(0)
+    for email, content in (("cv-ok@example.com", b"%PDF-1.4 genuine"), ("cv-bad@example.com", b"MZ not a pdf")):
+        res = client.post('/api/apply', headers=_student_headers(client, email), data={
+            "internship_id": internship_id, "cv": (io.BytesIO(content), "cv.pdf")
+        }, content_type="multipart/form-data")
+        assert res.status_code == 201
+    assert jobs.wait_idle()
+    app.config['UPLOAD_FOLDER'] = "uploads"
+    rows = client.get(f'/api/applications?internship_id={internship_id}', headers=admin).get_json()["data"]
+    assert sorted(row["cv_status"] for row in rows) == ["clean", "rejected"]
+
+    done = jobs.FINISHED._values.get(("notify.status", "done"), 0)
+    assert client.post(f'/api/applications/{rows[0]["id"]}/approve', headers=admin).status_code == 200
+    assert jobs.wait_idle()
+    assert jobs.FINISHED._values.get(("notify.status", "done"), 0) == done + 1
+
+    # A failing handler is put back with its error and a later run_at
+    jobs.HANDLERS["test.fail"] = lambda payload: 1 / 0
+    import db
+    with db.connection() as conn:
+        db.run_write(conn, lambda cur: jobs.enqueue(cur, db.placeholder(conn), "test.fail", {}))
+    jobs.run_pending(app)
+    depth = client.get('/api/jobs', headers=admin).get_json()
+    assert depth["queued"] == 1 and depth["running"] == 0
+    with db.connection() as conn:
+        row = dict(conn.execute("SELECT attempts, last_error FROM jobs WHERE kind = 'test.fail'").fetchone())
+        assert row["attempts"] == 1 and "ZeroDivisionError" in row["last_error"]
+        db.run_write(conn, lambda cur: cur.execute("DELETE FROM jobs WHERE kind = 'test.fail'"))
+    assert "job_queue_latency_seconds_count" in client.get('/metrics').get_data(as_text=True)
+    print("✓ Background jobs run after the response and retry failures")
+    return True
+
+def test_change_feed():
+    """Writes are logged as a versioned change feed, per-student filtered, and streamed as SSE"""
+    import changes
+    import db
+    client = _client()
+    admin = _admin_headers(client)
+    alice = _student_headers(client, "feed-alice@example.com")
+    bob = _student_headers(client, "feed-bob@example.com")
+    start = client.get('/api/changes', headers=admin).get_json()["version"]
+
+    res = client.post('/api/internships', headers=admin, json={"title": "Feed Intern", "company": "Acme"})
+    assert res.status_code == 201
+    assert client.post('/api/apply', headers=alice, data={"internship_id": _seed_applications(0)}).status_code == 201
+
+    feed = client.get(f'/api/changes?since={start}', headers=admin).get_json()
+    created = [c for c in feed["changes"] if c["entity"] == "application"][0]
+    assert [c["action"] for c in feed["changes"]] == ["created", "created"]
+    assert created["data"]["student_email"] == "feed-alice@example.com" and created["data"]["title"] == "Seeded"
+    assert client.post(f'/api/applications/{created["id"]}/approve', headers=admin).status_code == 200
+
+    # Students see internships plus changes to their own applications only
+    mine = client.get(f'/api/changes?since={start}', headers=alice).get_json()
+    assert [(c["entity"], c["action"]) for c in mine["changes"]] == [
+        ("internship", "created"), ("application", "created"), ("application", "status")]
+    assert mine["changes"][-1]["data"] == {"status": "Approved", "previous": "Pending"}
+    theirs = client.get(f'/api/changes?since={start}', headers=bob).get_json()
+    assert [c["entity"] for c in theirs["changes"]] == ["internship"]
+    assert theirs["version"] < mine["version"]
+    assert client.get(f'/api/changes?since={mine["version"]}', headers=alice).get_json()["changes"] == []
+
+    stream_seconds, changes.CHANGES_STREAM_SECONDS = changes.CHANGES_STREAM_SECONDS, 0.2
+    try:
+        res = client.get('/api/changes/stream', headers={**alice, "Last-Event-ID": str(start)})
+        body = res.get_data(as_text=True)
+    finally:
+        changes.CHANGES_STREAM_SECONDS = stream_seconds
+    assert res.mimetype == "text/event-stream"
+    assert body.count("event: change") == 3 and f"id: {mine['version']}" in body
+
+    with db.connection() as conn:
+        changes.prune(conn, keep=1)
+    assert client.get(f'/api/changes?since={start}', headers=admin).status_code == 410
+    print("✓ Change feed is versioned, filtered per student and streamed")
+    return True
+
+def test_bulk_import_and_export():
+    """CSV/NDJSON imports are validated and batched; exports stream joined rows"""
+    import csv
+    import bulk
+    client = _client()
+    admin = _admin_headers(client)
+    _student_headers(client, "bulk-existing@example.com")
+    batch, bulk.IMPORT_BATCH = bulk.IMPORT_BATCH, 2
+    # a failed login puts the email in the negative cache; the import must clear it
+    assert client.post('/api/login', json={"email": "bulk-bo@example.com", "password": "pw-bo"}).status_code == 401
+
+    students = "name,email,password,course,year\n" + "\n".join([
+        "Ada,bulk-ada@example.com,pw-ada,CS,2",
+        "Bo,bulk-bo@example.com,pw-bo,IT,",
+        "Old,bulk-existing@example.com,pw,CS,1",
+        "Nope,not-an-email,pw,CS,1",
+        "Cy,bulk-cy@example.com,pw-cy,SE,three",
+    ]) + "\n"
+    res = client.post('/api/import/students?format=csv', headers=admin, data=students, content_type="text/csv")
+    report = res.get_json()
+    assert (report["rows"], report["inserted"], report["duplicates"], report["invalid"]) == (5, 2, 1, 2), report
+    assert [e["line"] for e in report["errors"]] == [5, 6]
+    login = client.post('/api/login', json={"email": "bulk-bo@example.com", "password": "pw-bo"})
+    assert login.status_code == 200
+
+    internships = '{"title": "Bulk Backend", "company": "Acme", "slots": 3}\n{"title": "Missing company"}\nnot json\n'
+    res = client.post('/api/import/internships', headers=admin, data=internships, content_type="application/x-ndjson")
+    report = res.get_json()
+    assert (report["inserted"], report["invalid"]) == (1, 2), report
+    internship_id = client.get('/api/internships/search?q=bulk').get_json()[0]["id"]
+
+    applications = "student_email,internship_id,status\n" + "\n".join([
+        f"bulk-ada@example.com,{internship_id},Approved",
+        f"bulk-bo@example.com,{internship_id},",
+        f"bulk-ada@example.com,{internship_id},Pending",
+        f"ghost@example.com,{internship_id},",
+    ]) + "\n"
+    report = client.post('/api/import/applications', headers=admin, data=applications).get_json()
+    assert (report["inserted"], report["duplicates"], report["invalid"]) == (2, 1, 1), report
+    bulk.IMPORT_BATCH = batch
+    assert client.get('/api/stats', headers=admin).get_json() == client.get('/api/stats?exact=1', headers=admin).get_json()
+
+    res = client.get(f'/api/export/applications?internship_id={internship_id}', headers=admin)
+    assert res.mimetype == "text/csv" and res.is_streamed
+    rows = list(csv.DictReader(res.get_data(as_text=True).splitlines()))
+    assert [(r["student_email"], r["status"], r["title"]) for r in rows] == [
+        ("bulk-ada@example.com", "Approved", "Bulk Backend"), ("bulk-bo@example.com", "Pending", "Bulk Backend")]
+    res = client.get(f'/api/export/applications?format=ndjson&status=Approved&internship_id={internship_id}', headers=admin)
+    assert [json.loads(line)["student_name"] for line in res.get_data(as_text=True).splitlines()] == ["Ada"]
+    assert client.post('/api/import/admins', headers=admin, data="").status_code == 404
+    print("✓ Bulk import validates and batches rows, export streams reports")
+    return True
+
+def test_approvals_never_oversubscribe():
+    """Concurrent single and bulk approvals never approve more applications than slots"""
+    from concurrent.futures import ThreadPoolExecutor
+    import db
+    client = _client()
+    headers = _admin_headers(client)
+    internship_id = _seed_applications(24, slots=3)
+    ids = [a["id"] for a in client.get(f'/api/applications?internship_id={internship_id}', headers=headers).get_json()["data"]]
+
+    def approve(app_id):
+        return _client().post(f'/api/applications/{app_id}/approve', headers=headers).status_code
+
+    def approve_bulk(chunk):
+        body = _client().post('/api/applications/bulk', json={"action": "approve", "ids": chunk}, headers=headers).get_json()
+        return [r["result"] for r in body["results"]]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        singles = pool.map(approve, ids[:16])
+        bulks = pool.map(approve_bulk, [ids[16:20], ids[20:]])
+        codes, results = list(singles), [r for chunk in bulks for r in chunk]
+    assert set(codes) <= {200, 409} and set(results) <= {"updated", "no_slots"}
+    assert codes.count(200) + results.count("updated") == 3, (codes, results)
+
+    def approved(internship=internship_id):
+        conn = db.get_db_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM applications WHERE internship_id = ? AND status = 'Approved'", (internship,))
+        count = cur.fetchone()[0]
+        cur.execute("SELECT approved_count FROM internships WHERE id = ?", (internship,))
+        counter = cur.fetchone()[0]
+        conn.close()
+        return count, counter
+    assert approved() == (3, 3)
+
+    # Rejecting an approved application frees its place for the next one
+    statuses = {a["id"]: a["status"] for a in client.get(f'/api/applications?internship_id={internship_id}', headers=headers).get_json()["data"]}
+    winner = next(i for i in ids if statuses[i] == "Approved")
+    waiting = [i for i in ids if statuses[i] == "Pending"]
+    assert client.post(f'/api/applications/{waiting[0]}/approve', headers=headers).status_code == 409
+    assert client.post(f'/api/applications/{winner}/reject', headers=headers).status_code == 200
+    internships = {i["id"]: i for i in client.get('/api/internships').get_json()}
+    assert internships[internship_id]["remaining"] == 1
+    assert client.post(f'/api/applications/{waiting[0]}/approve', headers=headers).status_code == 200
+    assert client.post(f'/api/applications/{waiting[1]}/approve', headers=headers).status_code == 409
+    assert approved() == (3, 3)
+
+    # Filter mode updates only the rows it locked and counted: an application
+    # arriving between its SELECT and UPDATE (possible on PostgreSQL READ
+    # COMMITTED) is left alone. The arrival is simulated inside the transaction.
+    import capacity
+    late_id = _seed_applications(4, slots=3)
+    take_up_to = capacity.take_up_to
+
+    def take_then_arrive(cur, *args):
+        granted = take_up_to(cur, *args)
+        cur.execute("INSERT INTO students (name, email, password) VALUES ('Late', 'late-' || hex(randomblob(8)), 'x')")
+        cur.execute("INSERT INTO applications (student_id, internship_id, status) VALUES (?, ?, 'Pending')", (cur.lastrowid, late_id))
+        return granted
+
+    capacity.take_up_to = take_then_arrive
+    try:
+        body = client.post('/api/applications/bulk', json={"action": "approve", "filter": {"status": "Pending", "internship_id": late_id}},
+                           headers=headers).get_json()
+    finally:
+        capacity.take_up_to = take_up_to
+    assert body["updated"] == 3 and [r["result"] for r in body["results"]].count("no_slots") == 1, body
+    assert approved(late_id) == (3, 3)
+
+    # A NULL slots column counts as no places, and the API no longer stores one
+    unset_id = _seed_applications(1, slots=None)
+    body = client.post('/api/applications/bulk', json={"action": "approve", "filter": {"internship_id": unset_id}},
+                       headers=headers).get_json()
+    assert [r["result"] for r in body["results"]] == ["no_slots"], body
+    assert client.post('/api/internships', json={"title": "Null", "company": "Acme", "slots": None}, headers=headers).status_code == 201
+    assert client.post('/api/internships', json={"title": "Bad", "company": "Acme", "slots": "many"}, headers=headers).status_code == 400
+    assert client.post('/api/internships', json={"title": "Bad", "company": "Acme", "slots": -1}, headers=headers).status_code == 400
+    conn = db.get_db_connection()
+    assert conn.execute("SELECT slots FROM internships WHERE title = 'Null'").fetchone()[0] == 0
+    conn.close()
+    print("✓ Approvals take slots atomically and never oversubscribe an internship")
+    return True
+
+def test_applied_index_summary():
+    """The per-student summary is served from the applied index and follows every write"""
+    import applied
+    import db
+    client = _client()
+    admin = _admin_headers(client)
+    student = _student_headers(client, "summary@example.com")
+    first, second = _seed_applications(0), _seed_applications(0)
+    assert client.get('/api/status/summary', headers=student).get_json() == {"applications": {}}
+
+    assert client.post('/api/apply', headers=student, data={"internship_id": first}).status_code == 201
+    assert client.post('/api/apply', headers=student, data={"internship_id": second}).status_code == 201
+    summary = client.get('/api/status/summary', headers=student).get_json()["applications"]
+    assert summary == {str(first): "Pending", str(second): "Pending"}
+    hits = applied.index.hits
+    assert client.post('/api/apply', headers=student, data={"internship_id": first}).status_code == 400
+    assert applied.index.hits == hits + 1  # turned away without a write
+
+    application_id = next(a["id"] for a in client.get('/api/status', headers=student).get_json() if a["internship_id"] == first)
+    client.post(f'/api/applications/{application_id}/approve', headers=admin)
+    assert client.get('/api/status/summary', headers=student).get_json()["applications"][str(first)] == "Approved"
+
+    # A write from another process is only visible through the change feed
+    student_id = client.get('/api/me', headers=student).get_json()["id"]
+    conn = db.get_db_connection()
+    conn.execute("UPDATE applications SET status = 'Rejected' WHERE student_id = ? AND internship_id = ?", (student_id, second))
+    conn.execute("INSERT INTO changes (entity, entity_id, action, student_id, data) VALUES ('application', 0, 'status', ?, '{}')", (student_id,))
+    conn.commit()
+    conn.close()
+    revalidate, applied.index.revalidate = applied.index.revalidate, 0
+    try:
+        assert client.get('/api/status/summary', headers=student).get_json()["applications"][str(second)] == "Rejected"
+    finally:
+        applied.index.revalidate = revalidate
+    assert client.get('/api/status/summary', headers=admin).status_code == 403
+    print("✓ Student application summary comes from an invalidation-aware index")
+    return True
+
+def test_rate_limits_and_load_shedding():
+    """Token buckets answer 429, admission control answers 503, both with Retry-After"""
+    import db
+    import limits
+    client = _client()
+    student = _student_headers(client, "limited@example.com")
+    saved = (limits.RATE_LIMIT_ENABLED, limits.RULES["portal.login"], limits.SHED_MAX_IN_FLIGHT, limits.SHED_DB_WAIT_MS)
+    limits.RATE_LIMIT_ENABLED = True
+    limits.RULES["portal.login"] = [limits.Rule("ip", "100/60"), limits.Rule("identity", "3/60")]
+    limits.get_buckets().clear()
+    try:
+        bad = {"email": "Limited@example.com ", "password": "wrong"}
+        assert [client.post('/api/login', json=bad).status_code for _ in range(3)] == [401] * 3
+        res = client.post('/api/login', json={"email": "limited@example.com", "password": "pw"})
+        assert res.status_code == 429 and int(res.headers["Retry-After"]) >= 1
+        assert client.post('/api/login', json={"email": "other@example.com", "password": "x"}).status_code == 401
+
+        # The SQLite backend is shared: a second instance (another worker) sees the same bucket
+        path = os.path.join(tempfile.mkdtemp(), "limits.db")
+        rule = limits.Rule("ip", "2/60")
+        first, second = limits.SQLiteBuckets(path), limits.SQLiteBuckets(path)
+        assert first.take("k", rule) == 0 and second.take("k", rule) == 0
+        assert 0 < first.take("k", rule) <= 30 and second.take("k", rule) > 0
+
+        limits.SHED_MAX_IN_FLIGHT = 1
+        limits._in_flight += 1   # another request is running
+        try:
+            res = client.post('/api/apply', headers=student, data={"internship_id": 1})
+            assert res.status_code == 503 and res.headers["Retry-After"] == "1"
+            assert client.get('/api/internships').status_code == 200   # cheap routes are never shed
+        finally:
+            limits._in_flight -= 1
+            limits.SHED_MAX_IN_FLIGHT = 0
+
+        limits.SHED_DB_WAIT_MS = 50
+        db.get_writer().recent_wait.add(1.0)
+        assert client.post('/api/register/student', json={"name": "Shed", "email": "shed@example.com", "password": "pw"}).status_code == 503
+        db.get_writer().recent_wait = db.RecentWait()
+        assert client.post('/api/register/student', json={"name": "Shed", "email": "shed@example.com", "password": "pw"}).status_code == 201
+    finally:
+        limits.RATE_LIMIT_ENABLED, limits.RULES["portal.login"], limits.SHED_MAX_IN_FLIGHT, limits.SHED_DB_WAIT_MS = saved
+        limits.get_buckets().clear()
+    print("✓ Login/apply are rate limited per IP and identity and shed under load")
+    return True
+
+def test_projected_and_columnar_responses():
+    """List endpoints return only their declared fields, optionally as columns and rows"""
+    from datetime import datetime
+    import serialize
+    from app import APPLICATION_FIELDS, INTERNSHIP_FIELDS
+    client = _client()
+    admin = _admin_headers(client)
+    internship_id = _seed_applications(5)
+    url = f'/api/applications?internship_id={internship_id}'
+
+    rows = client.get(url, headers=admin).get_json()["data"]
+    assert len(rows) == 5 and all(set(row) == set(APPLICATION_FIELDS.names) for row in rows)
+    assert set(client.get('/api/internships').get_json()[0]) == set(INTERNSHIP_FIELDS.names)
+    narrowed = client.get(url + '&fields=status,title', headers=admin).get_json()["data"]
+    assert set(narrowed[0]) == {"id", "applied_at", "status", "title"}   # the cursor needs id and applied_at
+    assert client.get(url + '&fields=status,cv_file', headers=admin).status_code == 400
+
+    # Columnar pages carry the same rows and cursors
+    columnar, cursor = [], None
+    while True:
+        body = client.get(url + f'&limit=2&format=columnar&cursor={cursor or ""}', headers=admin).get_json()
+        assert body["columns"] == list(APPLICATION_FIELDS.names)
+        columnar += [dict(zip(body["columns"], row)) for row in body["rows"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert columnar == rows
+
+    # Both encoders agree with Flask's provider on keys order and dates
+    value = {"b": [1, None, "é"], "a": datetime(2025, 1, 1)}
+    fast, serialize._fast = serialize._fast, False
+    try:
+        assert json.loads(serialize.dumps(value)) == {"a": "Wed, 01 Jan 2025 00:00:00 GMT", "b": [1, None, "é"]}
+    finally:
+        serialize._fast = fast
+    assert json.loads(serialize.dumps(value)) == json.loads(serialize.dumps(value, compact=True))
+    assert serialize.dumps(value, compact=True).startswith('{"a":"Wed, 01 Jan 2025 00:00:00 GMT","b":[1,null')
+    print(f"✓ Responses are projected per endpoint, optionally columnar ({serialize.encoder()} encoder)")
+    return True
+
 def main():
     """Run all tests"""
     print("Running API tests...")
@@ -58,7 +932,33 @@ def main():
     tests = [
         test_imports,
         test_app_creation,
-        test_password_hashing
+        test_password_hashing,
+        test_password_executor_survives_fork,
+        test_db_pool_one_connection_per_request,
+        test_role_cache_and_revocation,
+        test_applications_keyset_pagination,
+        test_ndjson_streaming,
+        test_stats_counters_track_writes,
+        test_internship_search_ranking,
+        test_internship_catalog_http_cache,
+        test_static_assets_fingerprinted_and_compressed,
+        test_cv_upload_deduplicated,
+        test_bulk_status_update,
+        test_metrics_endpoint,
+        test_sampled_profiling_keeps_slowest,
+        test_password_rehash_on_login,
+        test_login_single_lookup_and_negative_cache,
+        test_asgi_entry_point,
+        test_versioned_migrations_and_query_plans,
+        test_sqlite_wal_and_group_commit,
+        test_write_timeout_withdraws_job,
+        test_background_jobs,
+        test_change_feed,
+        test_bulk_import_and_export,
+        test_approvals_never_oversubscribe,
+        test_applied_index_summary,
+        test_rate_limits_and_load_shedding,
+        test_projected_and_columnar_responses
     ]
     
     results = []
@@ -0,0 +1,85 @@
+"""
+Streaming, content-addressed CV storage.
+
+UploadRequest makes Werkzeug write each uploaded file in chunks straight to
+a temp file inside UPLOAD_FOLDER while a SHA-256 of the bytes is computed
+on the way through, instead of buffering the body. store() then links the
+temp file to cv/<2 hex>/<sha256>.<ext>; a CV already on disk (the same
+file sent with another application) is not written again. Callers store
+the file before opening their database transaction.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from flask import Request, current_app
+
+CV_DIR = "cv"
+
+
+class HashingFile:
+    """Writable temp file that hashes everything written to it."""
+
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=folder, prefix="upload-", delete=True)
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    @property
+    def name(self):
+        return self._file.name
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def __getattr__(self, attr):
+        # read/seek/tell/flush/close/... go to the underlying file
+        return getattr(self._file, attr)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    @property
+    def max_content_length(self):
+        # BODY_LIMITS: per-endpoint overrides of MAX_CONTENT_LENGTH (bulk imports)
+        limits = current_app.config.get("BODY_LIMITS", {}) if current_app else {}
+        return limits.get(self.endpoint, super().max_content_length)
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingFile(os.path.join(current_app.config['UPLOAD_FOLDER'], ".tmp"))
+
+
+def store(file_storage, extension, upload_folder):
+    """Persist an uploaded file under its content hash; returns the path relative to upload_folder."""
+    stream = file_storage.stream
+    if not isinstance(stream, HashingFile):
+        # Not parsed by UploadRequest (e.g. a small in-memory part): hash it now
+        spooled = HashingFile(os.path.join(upload_folder, ".tmp"))
+        shutil.copyfileobj(stream, spooled, 64 * 1024)
+        stream = spooled
+
+    digest = stream.hexdigest()
+    relative = os.path.join(CV_DIR, digest[:2], f"{digest}.{extension}")
+    target = os.path.join(upload_folder, relative)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        stream.flush()
+        try:
+            # The temp file is deleted on close; a hard link keeps the content
+            os.link(stream.name, target)
+        except FileExistsError:
+            pass
+        except OSError:
+            partial = f"{target}.{os.getpid()}.part"
+            shutil.copyfile(stream.name, partial)
+            os.replace(partial, target)
+    return relative.replace(os.sep, "/")
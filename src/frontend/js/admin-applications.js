@@ -4,8 +4,15 @@ document.addEventListener('DOMContentLoaded', async function () {
     const logoutBtn = document.getElementById('logoutBtn');
     const applicationsContainer = document.getElementById('applications-container');
     const statusFilter = document.getElementById('statusFilter');
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    const selectAllPending = document.getElementById('selectAllPending');
+    const bulkApproveBtn = document.getElementById('bulkApproveBtn');
+    const bulkRejectBtn = document.getElementById('bulkRejectBtn');
+    const selectedCount = document.getElementById('selectedCount');
 
     let allApplications = [];
+    let nextCursor = null;
+    const selectedIds = new Set();
 
     // Logout functionality
     if (logoutBtn) {
@@ -15,32 +22,141 @@ document.addEventListener('DOMContentLoaded', async function () {
         });
     }
 
-    // Load applications
-    try {
-        const result = await api.getAllApplications();
+    // Load a page of applications; filtering and paging happen on the server
+    async function loadApplications(reset) {
+        if (reset) {
+            allApplications = [];
+            nextCursor = null;
+            selectedIds.clear();
+            selectAllPending.checked = false;
+            updateSelectionUI();
+        }
+        loadMoreBtn.disabled = true;
 
-        if (result.ok) {
-            allApplications = result.data;
-            renderApplications(allApplications);
+        try {
+            const result = await api.getAllApplications({
+                status: statusFilter.value,
+                cursor: nextCursor
+            });
+
+            if (result.ok) {
+                allApplications = allApplications.concat(result.data);
+                nextCursor = result.nextCursor;
+                renderApplications(allApplications);
+            } else {
+                applicationsContainer.innerHTML = '<div class="p-6 text-center text-red-600 bg-red-50 rounded-xl">Failed to load applications.</div>';
+            }
+        } catch (error) {
+            console.error('Error loading applications:', error);
+            applicationsContainer.innerHTML = '<div class="p-6 text-center text-red-600 bg-red-50 rounded-xl">Error loading applications.</div>';
+        }
+
+        loadMoreBtn.disabled = false;
+        loadMoreBtn.classList.toggle('d-none', !nextCursor);
+    }
+
+    // Note the feed version before the first page loads; changes made
+    // meanwhile are replayed, and replaying one twice is harmless
+    const feed = await api.getChanges();
+    await loadApplications(true);
+    if (feed.ok) {
+        api.watchChanges(feed.version, applyChange, () => loadApplications(true));
+    }
+
+    // Patch the loaded list from one change-feed entry (other admins' actions, new applications)
+    function applyChange(change) {
+        if (change.entity !== 'application') return;
+        const currentFilter = statusFilter.value;
+        const index = allApplications.findIndex(a => a.id === change.id);
+
+        if (change.action === 'created') {
+            // Newest first, so a new application belongs at the top of the loaded pages
+            if (index !== -1 || (currentFilter && change.data.status !== currentFilter)) return;
+            allApplications.unshift(change.data);
+        } else if (change.action === 'status') {
+            if (index === -1) return;
+            allApplications[index].status = change.data.status;
+            if (currentFilter && change.data.status !== currentFilter) {
+                allApplications.splice(index, 1);
+            }
+            if (change.data.status !== 'Pending' && selectedIds.delete(change.id)) {
+                updateSelectionUI();
+            }
         } else {
-            applicationsContainer.innerHTML = '<div class="p-6 text-center text-red-600 bg-red-50 rounded-xl">Failed to load applications.</div>';
+            return;
         }
-    } catch (error) {
-        console.error('Error loading applications:', error);
-        applicationsContainer.innerHTML = '<div class="p-6 text-center text-red-600 bg-red-50 rounded-xl">Error loading applications.</div>';
+        renderApplications(allApplications);
     }
 
     // Filter functionality
     statusFilter.addEventListener('change', function () {
-        const status = this.value;
-        if (status) {
-            const filtered = allApplications.filter(app => app.status === status);
-            renderApplications(filtered);
+        loadApplications(true);
+    });
+
+    loadMoreBtn.addEventListener('click', function () {
+        loadApplications(false);
+    });
+
+    // Multi-select for bulk approve/reject
+    function updateSelectionUI() {
+        bulkApproveBtn.disabled = selectedIds.size === 0;
+        bulkRejectBtn.disabled = selectedIds.size === 0;
+        selectedCount.textContent = selectedIds.size ? `${selectedIds.size} selected` : '';
+    }
+
+    applicationsContainer.addEventListener('change', function (e) {
+        if (!e.target.classList.contains('select-application')) return;
+        const id = Number(e.target.value);
+        if (e.target.checked) {
+            selectedIds.add(id);
         } else {
-            renderApplications(allApplications);
+            selectedIds.delete(id);
         }
+        updateSelectionUI();
     });
 
+    selectAllPending.addEventListener('change', function () {
+        selectedIds.clear();
+        if (this.checked) {
+            allApplications.filter(a => a.status === 'Pending').forEach(a => selectedIds.add(a.id));
+        }
+        renderApplications(allApplications);
+        updateSelectionUI();
+    });
+
+    async function bulkUpdate(action) {
+        const ids = Array.from(selectedIds);
+        if (!ids.length || !confirm(`Are you sure you want to ${action} ${ids.length} application(s)?`)) return;
+
+        bulkApproveBtn.disabled = true;
+        bulkRejectBtn.disabled = true;
+
+        const result = await api.bulkUpdateApplications(action, { ids });
+        if (result.ok) {
+            const updated = new Set(result.results.filter(r => r.result === 'updated').map(r => r.id));
+            const refused = result.results.filter(r => r.result === 'no_slots').map(r => r.id);
+            allApplications.forEach(a => {
+                if (updated.has(a.id)) a.status = result.status;
+            });
+            const currentFilter = statusFilter.value;
+            if (currentFilter) {
+                allApplications = allApplications.filter(a => a.status === currentFilter);
+            }
+            selectedIds.clear();
+            selectAllPending.checked = false;
+            renderApplications(allApplications);
+            if (refused.length) {
+                alert(`No slots left for application(s) ${refused.map(id => '#' + id).join(', ')}; they are still Pending.`);
+            }
+        } else {
+            alert('Failed to update applications: ' + (result.error || 'Unknown error'));
+        }
+        updateSelectionUI();
+    }
+
+    bulkApproveBtn.addEventListener('click', () => bulkUpdate('approve'));
+    bulkRejectBtn.addEventListener('click', () => bulkUpdate('reject'));
+
     function renderApplications(applications) {
         if (!applications || applications.length === 0) {
             applicationsContainer.innerHTML = `
@@ -69,6 +185,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                         <div class="flex flex-col lg:flex-row lg:items-center lg:justify-between gap-6">
                             <div class="flex-grow">
                                 <div class="flex items-center gap-3 mb-2">
+                                    ${showActions ? `<input type="checkbox" class="form-check-input select-application" value="${app.id}" ${selectedIds.has(app.id) ? 'checked' : ''}>` : ''}
                                     <h3 class="text-lg font-bold text-slate-900">${app.student_name}</h3>
                                     <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium ${statusBadgeStyles}">
                                         ${app.status}
@@ -90,7 +207,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                                         <svg class="w-4 h-4 text-slate-400" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 7V3m8 4V3m-9 8h10M5 21h14a2 2 0 002-2V7a2 2 0 00-2-2H5a2 2 0 00-2 2v10a2 2 0 002 2z"></path></svg>
                                         Applied: ${new Date(app.applied_at).toLocaleDateString()}
                                     </div>
-                                    ${app.cv_file ? `
+                                    ${app.has_cv ? `
                                     <div class="flex items-center gap-2">
                                         <svg class="w-4 h-4 text-primary-500" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M15.172 7l-6.586 6.586a2 2 0 102.828 2.828l6.414-6.414a4 4 0 00-5.656-5.656l-6.415 6.414a6 6 0 108.486 8.486L20.5 13"></path></svg>
                                         <span class="text-primary-600 font-medium cursor-pointer hover:underline">Download CV</span>
@@ -148,13 +265,12 @@ document.addEventListener('DOMContentLoaded', async function () {
                 if (appIndex !== -1) {
                     allApplications[appIndex].status = action === 'approve' ? 'Approved' : 'Rejected';
 
+                    // Drop rows that no longer match the server-side filter
                     const currentFilter = statusFilter.value;
                     if (currentFilter) {
-                        const filtered = allApplications.filter(a => a.status === currentFilter);
-                        renderApplications(filtered);
-                    } else {
-                        renderApplications(allApplications);
+                        allApplications = allApplications.filter(a => a.status === currentFilter);
                     }
+                    renderApplications(allApplications);
                 }
             } else {
                 alert('Failed to update status: ' + (result.error || 'Unknown error'));
@@ -40,6 +40,16 @@ const api = {
         return headers;
     },
 
+    // "?a=1&b=2" from an object, skipping empty values
+    buildQuery(params = {}) {
+        const query = new URLSearchParams();
+        Object.entries(params || {}).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') query.set(key, value);
+        });
+        const qs = query.toString();
+        return qs ? `?${qs}` : '';
+    },
+
     // Centralized request handler
     async request(endpoint, options = {}) {
         const url = `${API_BASE_URL}${endpoint}`;
@@ -49,16 +59,7 @@ const api = {
 
             // Handle invalid token errors automatically
             if (response.status === 401 || response.status === 422) {
-                console.warn('Session expired or invalid. Logging out...');
-                this.removeToken();
-                // Only redirect if not already on public pages
-                if (!window.location.pathname.endsWith('login.html') &&
-                    !window.location.pathname.endsWith('register.html') &&
-                    !window.location.pathname.endsWith('index.html')) {
-                    window.location.href = 'login.html';
-                }
-                // Return a clear error
-                return { error: 'Session expired', ok: false };
+                return this.sessionExpired();
             }
 
             const data = await response.json().catch(() => ({}));
@@ -69,6 +70,68 @@ const api = {
         }
     },
 
+    // Log out after a 401/422 and return a clear error
+    sessionExpired() {
+        console.warn('Session expired or invalid. Logging out...');
+        this.removeToken();
+        // Only redirect if not already on public pages
+        if (!window.location.pathname.endsWith('login.html') &&
+            !window.location.pathname.endsWith('register.html') &&
+            !window.location.pathname.endsWith('index.html')) {
+            window.location.href = 'login.html';
+        }
+        return { error: 'Session expired', ok: false };
+    },
+
+    // Incremental reader for list endpoints in NDJSON mode.
+    // Calls onItem(row) as each line arrives instead of waiting for the whole list.
+    async stream(endpoint, onItem, options = {}) {
+        const separator = endpoint.includes('?') ? '&' : '?';
+        const url = `${API_BASE_URL}${endpoint}${separator}format=ndjson`;
+
+        try {
+            const response = await fetch(url, {
+                ...options,
+                headers: { ...(options.headers || {}), 'Accept': 'application/x-ndjson' }
+            });
+
+            if (response.status === 401 || response.status === 422) {
+                return this.sessionExpired();
+            }
+            if (!response.ok) {
+                const data = await response.json().catch(() => ({}));
+                return { ...data, ok: false };
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let count = 0;
+
+            const emit = (line) => {
+                if (line.trim()) {
+                    onItem(JSON.parse(line));
+                    count++;
+                }
+            };
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop(); // keep the incomplete tail for the next chunk
+                lines.forEach(emit);
+            }
+            emit(buffer + decoder.decode());
+
+            return { ok: true, count };
+        } catch (error) {
+            console.error('API Stream Error:', error);
+            return { error: 'Connection error', ok: false };
+        }
+    },
+
     // Login
     async login(email, password) {
         return this.request('/login', {
@@ -112,6 +175,21 @@ const api = {
         });
     },
 
+    // Search internships (ranked by relevance)
+    async searchInternships(query, limit = 20) {
+        return this.request(`/internships/search${this.buildQuery({ q: query, limit })}`, {
+            method: 'GET',
+            headers: this.getHeaders(false) // Public endpoint
+        });
+    },
+
+    // Stream internships one at a time
+    async streamInternships(onItem) {
+        return this.stream('/internships', onItem, {
+            method: 'GET'
+        });
+    },
+
     // Apply for internship
     async applyForInternship(formData) {
         return this.request('/apply', {
@@ -132,14 +210,38 @@ const api = {
         });
     },
 
-    // Get all applications (admin)
-    async getAllApplications() {
-        const result = await this.request('/applications', {
+    // { applications: { internshipId: status } } for the current student
+    async getApplicationSummary() {
+        return this.request('/status/summary', {
+            method: 'GET',
+            headers: this.getHeaders()
+        });
+    },
+
+    // Stream the current student's applications
+    async streamApplicationStatus(onItem) {
+        return this.stream('/status', onItem, {
+            method: 'GET',
+            headers: this.getHeaders()
+        });
+    },
+
+    // Get one page of applications (admin)
+    // params: { status, internship_id, student_id, limit, cursor }
+    async getAllApplications(params = {}) {
+        const result = await this.request(`/applications${this.buildQuery(params)}`, {
+            method: 'GET',
+            headers: this.getHeaders()
+        });
+        return { data: result.data || [], nextCursor: result.next_cursor || null, ok: result.ok, error: result.error };
+    },
+
+    // Stream every matching application (admin); same filters as getAllApplications
+    async streamAllApplications(params, onItem) {
+        return this.stream(`/applications${this.buildQuery(params)}`, onItem, {
             method: 'GET',
             headers: this.getHeaders()
         });
-        // normalize response structure if needed
-        return { data: result, ok: result.ok };
     },
 
     // Approve application (admin)
@@ -158,6 +260,16 @@ const api = {
         });
     },
 
+    // Approve/reject many applications at once (admin)
+    // target: { ids: [...] } or { filter: { status, internship_id } }
+    async bulkUpdateApplications(action, target) {
+        return this.request('/applications/bulk', {
+            method: 'POST',
+            headers: this.getHeaders(),
+            body: JSON.stringify({ action, ...target })
+        });
+    },
+
     // Get statistics (admin)
     async getStats() {
         return this.request('/stats', {
@@ -166,6 +278,75 @@ const api = {
         });
     },
 
+    // Changes after version `since`; without it just { version } to start following from
+    async getChanges(since) {
+        return this.request(`/changes${this.buildQuery({ since })}`, {
+            method: 'GET',
+            headers: this.getHeaders()
+        });
+    },
+
+    // Follow the change feed (Server-Sent Events over fetch, so the token goes in a header).
+    // Calls onChange(change) for every change after `since` and reconnects from the last
+    // version seen whenever the server ends the stream. onReset() runs if the feed no longer
+    // reaches back to that version and the lists must be reloaded. Returns a stop function.
+    watchChanges(since, onChange, onReset) {
+        const controller = new AbortController();
+        let version = since;
+
+        const handle = (block) => {
+            const fields = { event: 'message', data: '' };
+            block.split('\n').forEach(line => {
+                if (!line || line.startsWith(':')) return;
+                const colon = line.indexOf(':');
+                const name = colon === -1 ? line : line.slice(0, colon);
+                const value = colon === -1 ? '' : line.slice(colon + 1).replace(/^ /, '');
+                fields[name] = name === 'data' && fields.data ? `${fields.data}\n${value}` : value;
+            });
+            if (fields.event === 'change') {
+                const change = JSON.parse(fields.data);
+                version = change.version;
+                onChange(change);
+            } else if (fields.event === 'reset') {
+                controller.abort();
+                if (onReset) onReset();
+            }
+        };
+
+        const connect = async () => {
+            while (!controller.signal.aborted) {
+                try {
+                    const response = await fetch(`${API_BASE_URL}/changes/stream${this.buildQuery({ since: version })}`, {
+                        headers: { ...this.getHeaders(), 'Accept': 'text/event-stream' },
+                        signal: controller.signal
+                    });
+                    if (response.status === 401 || response.status === 422) {
+                        this.sessionExpired();
+                        return;
+                    }
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+                    while (true) {
+                        const { done, value } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
+                        const blocks = buffer.split('\n\n');
+                        buffer = blocks.pop(); // keep the incomplete event for the next chunk
+                        blocks.forEach(handle);
+                    }
+                } catch (error) {
+                    if (controller.signal.aborted) return;
+                    console.error('Change feed error:', error);
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000));
+            }
+        };
+
+        connect();
+        return () => controller.abort();
+    },
+
     // Check if user is logged in
     isLoggedIn() {
         return !!this.getToken();
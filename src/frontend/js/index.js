@@ -65,7 +65,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                 <div class="p-6 flex-grow">
                     <div class="flex justify-between items-start mb-4">
                         <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-primary-50 text-primary-700">
-                            ${internship.slots} Slots
+                            ${internship.remaining ?? internship.slots} of ${internship.slots} Slots left
                         </span>
                         <span class="text-slate-400 text-sm">${new Date(internship.date_posted).toLocaleDateString()}</span>
                     </div>
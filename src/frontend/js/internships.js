@@ -62,18 +62,61 @@ document.addEventListener('DOMContentLoaded', async function () {
         });
     }
 
-    // Load internships
-    try {
-        const result = await api.getInternships();
+    // internship id -> status of the student's application, for the card badges
+    const isStudent = isLoggedIn && api.getRole() === 'student';
+    let appliedTo = {};
+
+    async function loadApplied() {
+        if (!isStudent) return;
+        const summary = await api.getApplicationSummary();
+        if (summary.ok) appliedTo = summary.applications || {};
+    }
 
-        if (result.ok) {
-            renderInternships(result.data);
-        } else {
-            internshipsContainer.innerHTML = '<div class="col-span-full text-center p-4 bg-red-50 text-red-600 rounded-lg">Failed to load internships.</div>';
+    const appliedBadgeStyles = {
+        'Approved': 'bg-green-100 text-green-800',
+        'Rejected': 'bg-red-100 text-red-800',
+        'Pending': 'bg-yellow-100 text-yellow-800'
+    };
+
+    function appliedBadge(internship) {
+        const status = appliedTo[internship.id];
+        if (!status) return '';
+        const label = status === 'Pending' ? 'Applied' : status;
+        return `
+                        <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium ${appliedBadgeStyles[status] || 'bg-slate-100 text-slate-800'}">
+                            ${label}
+                        </span>`;
+    }
+
+    // Load internships (all of them, or search results when a query is given)
+    async function loadInternships(query) {
+        try {
+            const [result] = await Promise.all([
+                query ? api.searchInternships(query) : api.getInternships(),
+                loadApplied()
+            ]);
+
+            if (result.ok) {
+                renderInternships(result.data);
+            } else {
+                internshipsContainer.innerHTML = '<div class="col-span-full text-center p-4 bg-red-50 text-red-600 rounded-lg">Failed to load internships.</div>';
+            }
+        } catch (error) {
+            console.error('Error loading internships:', error);
+            internshipsContainer.innerHTML = '<div class="col-span-full text-center p-4 bg-red-50 text-red-600 rounded-lg">Error loading internships. Please try again later.</div>';
         }
-    } catch (error) {
-        console.error('Error loading internships:', error);
-        internshipsContainer.innerHTML = '<div class="col-span-full text-center p-4 bg-red-50 text-red-600 rounded-lg">Error loading internships. Please try again later.</div>';
+    }
+
+    await loadInternships('');
+
+    // Search as the user types, once they pause for a moment
+    const searchInput = document.getElementById('internshipSearch');
+    let searchTimer = null;
+    if (searchInput) {
+        searchInput.addEventListener('input', function () {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => loadInternships(this.value.trim()), 250);
+        });
     }
 
     function renderInternships(internships) {
@@ -95,8 +138,8 @@ document.addEventListener('DOMContentLoaded', async function () {
                             ${internship.duration || 'Flexible'}
                         </span>
                         <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium bg-primary-50 text-primary-700">
-                            ${internship.slots} Slots
-                        </span>
+                            ${internship.remaining ?? internship.slots} of ${internship.slots} Slots left
+                        </span>${appliedBadge(internship)}
                     </div>
                     <h5 class="text-xl font-bold text-slate-900 mb-2 group-hover:text-primary-600 transition-colors">${internship.title}</h5>
                     <h6 class="text-sm font-semibold text-slate-500 mb-4 uppercase tracking-wider">${internship.company}</h6>
@@ -107,8 +150,8 @@ document.addEventListener('DOMContentLoaded', async function () {
                 <div class="px-6 py-4 bg-slate-50 border-t border-slate-100 mt-auto">
                     <button class="w-full inline-flex justify-center items-center px-4 py-2 border border-transparent text-sm font-medium rounded-lg text-white bg-primary-600 hover:bg-primary-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-primary-500 disabled:opacity-50 disabled:cursor-not-allowed transition-all shadow-sm apply-btn"
                             data-id="${internship.id}" 
-                            ${!isLoggedIn || api.getRole() !== 'student' ? 'disabled' : ''}>
-                        ${!isLoggedIn ? 'Login to Apply' : (api.getRole() !== 'student' ? 'Student Only' : 'Apply Now')}
+                            ${!isStudent || appliedTo[internship.id] ? 'disabled' : ''}>
+                        ${!isLoggedIn ? 'Login to Apply' : (!isStudent ? 'Student Only' : (appliedTo[internship.id] ? 'Already Applied' : 'Apply Now'))}
                     </button>
                     ${!isLoggedIn ? `<p class="text-xs text-center text-slate-400 mt-2">You must login as a student to apply</p>` : ''}
                 </div>
@@ -116,8 +159,8 @@ document.addEventListener('DOMContentLoaded', async function () {
         `).join('');
 
         // Add event listeners to apply buttons
-        if (isLoggedIn && api.getRole() === 'student') {
-            document.querySelectorAll('.apply-btn').forEach(btn => {
+        if (isStudent) {
+            document.querySelectorAll('.apply-btn:not([disabled])').forEach(btn => {
                 btn.addEventListener('click', function () {
                     const id = this.getAttribute('data-id');
                     modalInternshipId.value = id;
@@ -13,16 +13,26 @@ document.addEventListener('DOMContentLoaded', async function () {
         });
     }
 
+    let applications = [];
+
     try {
         // Load user info
         const user = await api.getCurrentUser();
         studentNameElement.textContent = user.name || 'Student';
 
+        // Note the feed version first: anything that changes while the list
+        // loads is replayed afterwards (applying a change twice is harmless)
+        const feed = await api.getChanges();
+
         // Load applications
         const result = await api.getApplicationStatus();
 
         if (result.ok) {
-            renderApplications(result.data);
+            applications = result.data || [];
+            renderApplications(applications);
+            if (feed.ok) {
+                api.watchChanges(feed.version, applyChange, () => window.location.reload());
+            }
         } else {
             applicationsContainer.innerHTML = '<div class="p-6 text-center text-red-600 bg-red-50 rounded-lg">Failed to load applications.</div>';
         }
@@ -31,6 +41,20 @@ document.addEventListener('DOMContentLoaded', async function () {
         applicationsContainer.innerHTML = '<div class="p-6 text-center text-red-600 bg-red-50 rounded-lg">Error loading dashboard. Please try again later.</div>';
     }
 
+    // Patch the local list from one change-feed entry instead of re-fetching /status
+    function applyChange(change) {
+        if (change.entity !== 'application') return;
+        const index = applications.findIndex(a => a.id === change.id);
+        if (change.action === 'created' && index === -1) {
+            applications.unshift(change.data);
+        } else if (change.action === 'status' && index !== -1) {
+            applications[index].status = change.data.status;
+        } else {
+            return;
+        }
+        renderApplications(applications);
+    }
+
     function renderApplications(applications) {
         if (!applications || applications.length === 0) {
             applicationsContainer.innerHTML = `
@@ -76,7 +100,7 @@ document.addEventListener('DOMContentLoaded', async function () {
                                     <span class="block text-slate-400 text-xs uppercase tracking-wide font-semibold mb-1">Applied On</span>
                                     <span class="text-slate-700 font-mono">${new Date(app.applied_at).toLocaleDateString()}</span>
                                 </div>
-                                ${app.cv_file ? `
+                                ${app.has_cv ? `
                                 <div>
                                     <span class="block text-slate-400 text-xs uppercase tracking-wide font-semibold mb-1">Documents</span>
                                     <span class="text-primary-600 flex items-center gap-1">